@@ -0,0 +1,4 @@
+"""
+Benchmarks for J.A.R.V.I.S.
+Run individual benchmarks with `python -m benchmarks.<name>`.
+"""
@@ -0,0 +1,48 @@
+"""
+Async dispatch throughput benchmark for J.A.R.V.I.S.
+Compares sequential process_command against concurrent process_command_async
+while the local OpenRouter stub injects latency into every call.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.openrouter_stub import OpenRouterStub
+
+async def run_concurrent(jarvis, count: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(jarvis.process_command_async(f"tell me fact number {i}")
+                           for i in range(count)))
+    elapsed = time.perf_counter() - start
+    await jarvis.conversation_handler.async_client.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark async dispatch throughput")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--sequential", type=int, default=10,
+                        help="Requests to time on the synchronous path")
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with OpenRouterStub(latency=args.latency) as stub:
+        os.environ["OPENROUTER_API_URL"] = stub.url
+        os.environ.setdefault("OPENROUTER_API_KEY", "stub-key")
+        from jarvis import Jarvis
+        jarvis = Jarvis()
+
+        start = time.perf_counter()
+        for i in range(args.sequential):
+            jarvis.process_command(f"tell me fact number {i}")
+        sequential = time.perf_counter() - start
+        print(f"sequential: {args.sequential / sequential:.1f} req/s")
+
+        concurrent = asyncio.run(run_concurrent(jarvis, args.requests))
+        print(f"concurrent: {args.requests / concurrent:.1f} req/s "
+              f"({args.requests} requests in {concurrent:.2f} s, "
+              f"injected latency {args.latency * 1000:.0f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Wake-to-command latency benchmark for J.A.R.V.I.S.
+Runs the streaming endpointer offline over WAV recordings of
+"<wake word> <command>" and compares against the dead time of the old
+fixed-sleep pipeline (1.5 s sleep + 0.5 s noise re-adjustment after the wake word).
+Without paths it runs on the synthetic recordings from benchmarks.fixtures.
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+
+from benchmarks.fixtures import generate
+from commands.audio_capture import wake_to_command_latency
+from commands.wake_word import load_wav
+
+# Dead time the previous listen loop added between wake word and command capture
+LEGACY_DEAD_TIME = 1.5 + 0.5
+LEGACY_PAUSE_THRESHOLD = 0.8
+
+def report(paths):
+    """Print wake-to-command timing for each recording and a summary."""
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "*.wav"))) if os.path.isdir(path) else [path])
+
+    results = []
+    for path in files:
+        timing = wake_to_command_latency(load_wav(path))
+        if timing is None:
+            print(json.dumps({'file': path, 'error': "fewer than two utterances found"}))
+            continue
+        # The old loop only started listening for the command after its dead time
+        legacy_listen_start = timing['wake_end'] - timing['endpoint_delay'] + LEGACY_PAUSE_THRESHOLD + LEGACY_DEAD_TIME
+        timing['legacy_command_lost'] = timing['command_start'] < legacy_listen_start
+        timing['file'] = path
+        results.append(timing)
+        print(json.dumps(timing))
+
+    if results:
+        delays = sorted(r['endpoint_delay'] for r in results)
+        print(json.dumps({
+            'files': len(results),
+            'mean_wake_to_command': sum(r['wake_to_command'] for r in results) / len(results),
+            'max_endpoint_delay': delays[-1],
+            'legacy_commands_lost': sum(r['legacy_command_lost'] for r in results),
+        }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure wake-to-command latency from WAV files")
+    parser.add_argument("paths", nargs="*", help="WAV files or directories of WAV files (default: synthetic)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        report(args.paths or [generate(scratch)])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Context manager benchmark for J.A.R.V.I.S.
+Measures memory and add/get throughput of ContextManager at growing history sizes,
+next to the previous list-of-dicts implementation.
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from commands.context import ContextManager
+
+class LegacyContextManager:
+    """The list-of-dicts implementation ContextManager replaced, for comparison."""
+
+    def __init__(self, max_history: int, context_timeout: int = 300):
+        self.conversation_history = []
+        self.max_history = max_history
+        self.context_timeout = context_timeout
+
+    def add_turn(self, user_input, assistant_response, command_type=None):
+        self.conversation_history.append({
+            'timestamp': datetime.now(),
+            'user_input': user_input,
+            'assistant_response': assistant_response,
+            'command_type': command_type
+        })
+        if len(self.conversation_history) > self.max_history:
+            self.conversation_history.pop(0)
+
+    def get_recent_context(self, n_turns=3):
+        now = datetime.now()
+        self.conversation_history = [
+            turn for turn in self.conversation_history
+            if now - turn['timestamp'] < timedelta(seconds=self.context_timeout)
+        ]
+        return self.conversation_history[-n_turns:]
+
+def measure(factory, turns: int, operations: int):
+    inputs = [f"user input {i}" for i in range(turns)]
+    tracemalloc.start()
+    manager = factory(turns)
+    for text in inputs:
+        manager.add_turn(text, "assistant response", "conversation")
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Steady state: history is full, every add evicts and every turn reads context
+    start = time.perf_counter()
+    for i in range(operations):
+        manager.add_turn(inputs[i % turns], "assistant response", "conversation")
+        manager.get_recent_context()
+    elapsed = time.perf_counter() - start
+    return memory, operations / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ContextManager")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--operations", type=int, default=2000)
+    args = parser.parse_args()
+
+    for turns in args.sizes:
+        for label, factory in (("legacy", LegacyContextManager),
+                               ("ring", lambda n: ContextManager(max_history=n))):
+            memory, throughput = measure(factory, turns, args.operations)
+            print(f"{turns:>7} turns {label:>6}: {memory / 1024:9.1f} KiB, "
+                  f"{throughput:12.0f} add+get/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Dispatch microbenchmark for J.A.R.V.I.S.
+Compares trie longest-prefix matching against the old linear startswith scan.
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, Dict, List
+
+from commands.dispatch import CommandTrie
+
+WORDS = ["open", "close", "play", "stop", "search", "show", "set", "get",
+         "file", "music", "timer", "volume", "weather", "news", "mail", "light"]
+
+def make_commands(count: int, seed: int = 0) -> List[str]:
+    """Generate unique multi-word plugin command names."""
+    rng = random.Random(seed)
+    commands = set()
+    while len(commands) < count:
+        length = rng.randint(1, 3)
+        commands.add(" ".join(rng.choice(WORDS) for _ in range(length)) + f" p{len(commands)}")
+    return sorted(commands)
+
+def linear_dispatch(commands: Dict[str, Callable], text: str):
+    """The original dispatch: exact lookup, then a startswith scan."""
+    if text in commands:
+        return text
+    for command in commands:
+        if text.startswith(command):
+            return command
+    return None
+
+def trie_dispatch(trie: CommandTrie, text: str):
+    """Trie dispatch as used by Jarvis.process_command."""
+    match = trie.longest_prefix(CommandTrie.tokenize(text))
+    return match[0] if match else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark command dispatch")
+    parser.add_argument("--commands", type=int, default=10000)
+    parser.add_argument("--inputs", type=int, default=5000)
+    args = parser.parse_args()
+
+    names = make_commands(args.commands)
+    table = {name: (lambda _: None) for name in names}
+    trie = CommandTrie()
+    for name in names:
+        trie.insert(name, table[name])
+
+    rng = random.Random(1)
+    # Mix of hits with arguments and misses that fall through to conversation
+    inputs = [rng.choice(names) + " some argument" for _ in range(args.inputs // 2)]
+    inputs += ["what is the weather like today"] * (args.inputs - len(inputs))
+
+    for label, dispatch, target in (("linear", linear_dispatch, table), ("trie", trie_dispatch, trie)):
+        start = time.perf_counter()
+        for text in inputs:
+            dispatch(target, text)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>6}: {len(inputs)} dispatches over {len(names)} commands "
+              f"in {elapsed * 1000:.1f} ms ({elapsed / len(inputs) * 1e6:.2f} us/op)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+LLM gateway benchmark for J.A.R.V.I.S.
+Runs the gateway against the fault-injecting OpenRouter stub and checks each
+mechanism: coalescing of identical prompts, retries under injected errors,
+hedging against slow replies, the circuit breaker during an outage, the
+token bucket rate, and that asyncio calls share the rate limit and breaker.
+Exits non-zero if a check fails.
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from typing import Callable, List
+
+from benchmarks.openrouter_stub import FAULT_SLOW, OpenRouterStub
+from benchmarks.suite import percentiles
+from commands.gateway import CircuitBreaker, CircuitOpenError, LLMGateway
+from commands.llm_client import AsyncOpenRouterClient, OpenRouterClient
+
+PAYLOAD = {"model": "stub", "messages": [{"role": "user", "content": "hello"}]}
+
+def gateway_for(stub: OpenRouterStub, **options) -> LLMGateway:
+    client = OpenRouterClient("benchmark", stub.url, timeout=5, pool_size=32)
+    async_client = AsyncOpenRouterClient("benchmark", stub.url, timeout=5)
+    return LLMGateway(client, backoff=0.01, max_backoff=0.05, async_client=async_client, **options)
+
+def in_threads(count: int, target: Callable[[int], None]):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def coalescing(callers: int) -> List[str]:
+    lines = []
+    for streaming in (False, True):
+        with OpenRouterStub(latency=0.2, token_delay=0.01) as stub:
+            gateway = gateway_for(stub)
+            barrier = threading.Barrier(callers)
+            replies = []
+
+            def call(_):
+                barrier.wait()
+                if streaming:
+                    replies.append("".join(gateway.stream(PAYLOAD)))
+                else:
+                    replies.append(gateway.complete(PAYLOAD))
+
+            in_threads(callers, call)
+            ok = stub.request_count == 1 and len(set(replies)) == 1 and len(replies) == callers
+            lines.append(check(ok, f"coalescing ({'stream' if streaming else 'complete'}): "
+                                   f"{callers} identical calls -> {stub.request_count} upstream request(s)"))
+    return lines
+
+def retries(requests: int, error_rate: float) -> List[str]:
+    lines = []
+    successes = {}
+    for attempts in (0, 2):
+        with OpenRouterStub(error_rate=error_rate, seed=1) as stub:
+            gateway = gateway_for(stub, retries=attempts, failure_threshold=10 ** 6)
+            succeeded = 0
+            for _ in range(requests):
+                try:
+                    gateway.complete(PAYLOAD)
+                    succeeded += 1
+                except Exception:
+                    pass
+            successes[attempts] = succeeded / requests
+            lines.append(f"       retries={attempts}: {successes[attempts]:.1%} succeeded "
+                         f"at {error_rate:.0%} injected errors ({stub.request_count} upstream)")
+    lines.append(check(successes[2] > successes[0] and successes[2] >= 0.9, "retries recover transient errors"))
+    return lines
+
+def hedging(requests: int, slow_rate: float) -> List[str]:
+    lines = []
+    tails = {}
+    every = max(1, round(1 / slow_rate))
+    for hedge_after in (None, 0.1):
+        with OpenRouterStub(latency=0.02, slow_latency=1.0) as stub:
+            gateway = gateway_for(stub, hedge_after=hedge_after)
+            latencies = []
+            for i in range(requests):
+                # Every n-th primary request stalls; the hedge behind it does not
+                if i % every == 0:
+                    stub.inject(FAULT_SLOW)
+                # Distinct prompts so coalescing does not hide the slow calls
+                payload = dict(PAYLOAD, messages=[{"role": "user", "content": f"hello {i}"}])
+                start = time.perf_counter()
+                gateway.complete(payload)
+                latencies.append(time.perf_counter() - start)
+            stats = percentiles(latencies)
+            tails[hedge_after] = stats['p99']
+            lines.append(f"       hedge_after={hedge_after}: p50 {stats['p50']:.1f} ms, "
+                         f"p99 {stats['p99']:.1f} ms, {gateway.stats()['hedges']} hedges")
+            gateway.close()
+    lines.append(check(tails[0.1] < tails[None] / 2, "hedging cuts the tail"))
+    return lines
+
+def breaker(requests: int) -> List[str]:
+    with OpenRouterStub(error_rate=1.0) as stub:
+        gateway = gateway_for(stub, retries=0, failure_threshold=5, reset_timeout=0.5)
+        failures = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            try:
+                gateway.complete(PAYLOAD)
+            except Exception:
+                pass
+            failures.append(time.perf_counter() - start)
+        upstream_during_outage = stub.request_count
+        opened = gateway.breaker.state == CircuitBreaker.OPEN
+        fast = percentiles(failures[10:])['p50']
+
+        stub.error_rate = 0.0
+        time.sleep(0.6)
+        recovered = gateway.complete(PAYLOAD) == stub.reply
+        closed = gateway.breaker.state == CircuitBreaker.CLOSED
+
+        # A trial stream the caller stops reading must not leave the breaker half-open
+        stub.error_rate = 1.0
+        for _ in range(5):
+            try:
+                gateway.complete(PAYLOAD)
+            except Exception:
+                pass
+        stub.error_rate = 0.0
+        time.sleep(0.6)
+        trial = gateway.stream(PAYLOAD)
+        next(trial)
+        trial.close()
+        try:
+            unstuck = gateway.complete(PAYLOAD) == stub.reply
+        except Exception:
+            unstuck = False
+    return [
+        f"       outage: {requests} calls sent {upstream_during_outage} upstream, "
+        f"fail-fast p50 {fast:.3f} ms",
+        check(opened and upstream_during_outage == 5, "breaker opens and stops upstream calls"),
+        check(recovered and closed, "breaker closes after a successful trial call"),
+        check(unstuck, "breaker recovers when a trial stream is abandoned"),
+    ]
+
+def rate_limit(rate: float, requests: int) -> List[str]:
+    with OpenRouterStub() as stub:
+        gateway = gateway_for(stub, rate=rate, burst=1, hedge_after=None)
+        per_thread = requests // 8
+        start = time.perf_counter()
+
+        def call(i):
+            for turn in range(per_thread):
+                gateway.complete(dict(PAYLOAD, messages=[{"role": "user", "content": f"{i}-{turn}"}]))
+
+        in_threads(8, call)
+        elapsed = time.perf_counter() - start
+        achieved = (stub.request_count - 1) / elapsed
+    return [
+        f"       rate limit {rate:.0f}/s: {stub.request_count} requests at {achieved:.1f}/s",
+        check(achieved <= rate * 1.1, "token bucket holds the configured rate"),
+    ]
+
+def async_calls(rate: float, callers: int) -> List[str]:
+    async def gather(gateway: LLMGateway, payloads: List[dict]) -> list:
+        return await asyncio.gather(*(gateway.complete_async(payload) for payload in payloads),
+                                    return_exceptions=True)
+
+    with OpenRouterStub(latency=0.2) as stub:
+        gateway = gateway_for(stub)
+        replies = asyncio.run(gather(gateway, [PAYLOAD] * callers))
+        coalesced = stub.request_count == 1 and replies == [stub.reply] * callers
+
+    with OpenRouterStub() as stub:
+        gateway = gateway_for(stub, rate=rate, burst=1)
+        start = time.perf_counter()
+
+        def blocking(i):
+            for turn in range(8):
+                gateway.complete(dict(PAYLOAD, messages=[{"role": "user", "content": f"sync {i}-{turn}"}]))
+
+        # Blocking and async callers at once draw from one bucket
+        threads = threading.Thread(target=in_threads, args=(4, blocking))
+        threads.start()
+        asyncio.run(gather(gateway, [dict(PAYLOAD, messages=[{"role": "user", "content": f"async {i}"}])
+                                     for i in range(32)]))
+        threads.join()
+        achieved = (stub.request_count - 1) / (time.perf_counter() - start)
+
+    with OpenRouterStub(error_rate=1.0) as stub:
+        gateway = gateway_for(stub, retries=0, failure_threshold=5)
+        for _ in range(20):
+            asyncio.run(gather(gateway, [PAYLOAD]))
+        upstream_during_outage = stub.request_count
+        try:
+            gateway.complete(PAYLOAD)
+            shared_breaker = False
+        except CircuitOpenError:
+            shared_breaker = True
+    return [
+        f"       async: {callers} identical calls -> 1 upstream: {coalesced}; mixed callers "
+        f"{achieved:.1f}/s at rate {rate:.0f}/s; outage sent {upstream_during_outage} upstream",
+        check(coalesced and achieved <= rate * 1.1 and upstream_during_outage == 5 and shared_breaker,
+              "async calls coalesce and share the rate limit and breaker"),
+    ]
+
+def check(ok: bool, label: str) -> str:
+    return f"{'PASS' if ok else 'FAIL'}   {label}"
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Exercise the LLM gateway against injected faults")
+    parser.add_argument("--callers", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=20.0)
+    args = parser.parse_args()
+
+    lines = []
+    lines += coalescing(args.callers)
+    lines += retries(args.requests, args.error_rate)
+    lines += hedging(args.requests, args.slow_rate)
+    lines += breaker(50)
+    lines += rate_limit(args.rate, 64)
+    lines += async_calls(args.rate, args.callers)
+    print("\n".join(lines))
+    return 1 if any(line.startswith("FAIL") for line in lines) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
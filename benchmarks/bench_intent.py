@@ -0,0 +1,183 @@
+"""
+Intent matching benchmark for J.A.R.V.I.S.
+Runs a corpus of noisy voice transcripts through command dispatch and reports
+how many reach the right command with the trie alone and with the fuzzy
+intent index at several thresholds, how many conversational inputs are wrongly
+taken for commands, and how long a fuzzy lookup takes.
+"""
+
+import argparse
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+from benchmarks.suite import percentiles
+
+# (transcript, command it should dispatch to, expected argument text); None means conversation
+CORPUS: List[Tuple[str, Optional[str], str]] = [
+    ("open google.com", "open", "google.com"),
+    ("opened google.com", "open", "google.com"),
+    ("opens youtube.com", "open", "youtube.com"),
+    ("Open google.com.", "open", "google.com"),
+    ("please open github", "open", "github"),
+    ("jarvis open wikipedia", "open", "wikipedia"),
+    ("hey jarvis, open the news", "open", "the news"),
+    ("can you open stackoverflow.com please", "open", "stackoverflow.com"),
+    ("could you please open gmail", "open", "gmail"),
+    ("go to github.com", "open", "github.com"),
+    ("goto github.com", "open", "github.com"),
+    ("visit python.org", "open", "python.org"),
+    ("launch spotify.com", "open", "spotify.com"),
+    ("navigate to maps.google.com", "open", "maps.google.com"),
+    ("pull up the weather site", "open", "the weather site"),
+    ("please browse github", "browse", "github"),
+    ("brows github", "browse", "github"),
+    ("browse to bbc.co.uk", "browse", "bbc.co.uk"),
+    ("browser github", "browse", "github"),
+    ("okay browse amazon", "browse", "amazon"),
+    ("speak hello there", "speak", "hello there"),
+    ("stop speaking", "stop speaking", ""),
+    ("stop speaking please", "stop speaking", ""),
+    ("stop talking", "stop speaking", ""),
+    ("jarvis be quiet", "stop speaking", ""),
+    ("stopped speaking", "stop speaking", ""),
+    ("stop listening", "stop listening", ""),
+    ("stop listing", "stop listening", ""),
+    ("start listening", "listen", ""),
+    ("listen", "listen", ""),
+    ("stats", "stats", ""),
+    ("show stats", "stats", ""),
+    ("stat", "stats", ""),
+    ("latency stats please", "stats", ""),
+    ("cache stats", "cache stats", ""),
+    ("cash stats", "cache stats", ""),
+    ("caches stats", "cache stats", ""),
+    ("clear the cache", "clear cache", ""),
+    ("please clear cache", "clear cache", ""),
+    ("clear cash", "clear cache", ""),
+    ("context", "context", ""),
+    ("show context", "context", ""),
+    ("clear the context", "clear context", ""),
+    ("clear contexts", "clear context", ""),
+    ("prompt stats", "prompt stats", ""),
+    ("prompts stats", "prompt stats", ""),
+    ("llm stats", "llm stats", ""),
+    ("lm stats", "llm stats", ""),
+    ("stats save results.json", "stats save", "results.json"),
+    ("hello", None, ""),
+    ("hello jarvis", None, ""),
+    ("what time is it", None, ""),
+    ("tell me a joke", None, ""),
+    ("what can you do", None, ""),
+    ("summarize our conversation", None, ""),
+    ("how are you today", None, ""),
+    ("what's the status of my order", None, ""),
+    ("what is the weather on mars", None, ""),
+    ("who won the game last night", None, ""),
+    ("explain the theory of relativity", None, ""),
+    ("i love listening to music", None, ""),
+    ("play some jazz", None, ""),
+    ("thanks jarvis", None, ""),
+    ("what does context mean", None, ""),
+    ("can you help me write an email", None, ""),
+    ("statistics are interesting", None, ""),
+    ("cash is king", None, ""),
+    ("the clear sky at night", None, ""),
+    ("prompt me for my name", None, ""),
+    ("remind me to call mom", None, ""),
+    ("opening hours of the museum", None, ""),
+    ("speaking of which who won", None, ""),
+    ("browsing is fun", None, ""),
+    ("visiting hours are over", None, ""),
+    ("launching rockets is hard", None, ""),
+    ("clear", None, ""),
+    # Sentences that start like an argument-taking command but are conversation
+    ("I want to visit Paris, what should I see?", None, ""),
+    ("go to bed early tonight is my plan", None, ""),
+    ("pull up a chair and tell me a story", None, ""),
+    ("launch codes for a rocket explained", None, ""),
+    ("surf the web safely tips", None, ""),
+    ("visit my grandmother this weekend", None, ""),
+    # Requests about speech are for the model, not text to read out
+    ("say something nice about me", None, ""),
+    ("say good morning", None, ""),
+    ("read out the news headlines", None, ""),
+]
+
+def evaluate(jarvis, threshold: Optional[float]) -> Tuple[int, int, int, int, int]:
+    """
+    Return (positives sent to the right command, of those with the expected
+    arguments, positives, negatives taken as commands, negatives).
+    """
+    if threshold is None:
+        match_command = jarvis._match_command
+        jarvis._match_command = lambda text: _trie_only(jarvis, text)
+    else:
+        jarvis.intents.threshold = threshold
+    right = exact = positives = false_positives = negatives = 0
+    for transcript, command, args in CORPUS:
+        match = jarvis._match_command(transcript.lower().strip())
+        if command is None:
+            negatives += 1
+            false_positives += match is not None
+            continue
+        positives += 1
+        if match is not None and match[0] is jarvis.commands[command]:
+            right += 1
+            exact += match[1] == args
+    if threshold is None:
+        jarvis._match_command = match_command
+    return right, exact, positives, false_positives, negatives
+
+def _trie_only(jarvis, text: str):
+    tokens = text.split()
+    match = jarvis.command_trie.longest_prefix(tokens)
+    if not match:
+        return None
+    command, handler, consumed = match
+    return handler, " ".join(tokens[consumed:]), "trie"
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure fuzzy intent matching on noisy transcripts")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9, 1.0])
+    parser.add_argument("--repeat", type=int, default=200, help="Timing passes over the corpus")
+    parser.add_argument("--verbose", action="store_true", help="List the transcripts each run gets wrong")
+    args = parser.parse_args()
+
+    os.environ.setdefault('JARVIS_LOG_LEVEL', 'WARNING')
+    from jarvis import Jarvis
+
+    logging.getLogger().setLevel(logging.WARNING)
+    jarvis = Jarvis()
+    default = jarvis.intents.threshold
+
+    for threshold in [None] + args.thresholds:
+        right, exact, positives, false_positives, negatives = evaluate(jarvis, threshold)
+        label = "trie only" if threshold is None else f"threshold {threshold:.2f}"
+        print(f"{label:>15}: {right}/{positives} commands matched ({right / positives:.0%}, "
+              f"{exact} with exact arguments), "
+              f"{false_positives}/{negatives} conversation inputs taken as commands")
+        if args.verbose and threshold is not None:
+            for transcript, command, expected in CORPUS:
+                intent = jarvis.intents.match(transcript)
+                got = (intent.command, intent.args) if intent else None
+                if command is not None and jarvis.command_trie.longest_prefix(transcript.lower().split()):
+                    continue
+                if got != ((command, expected) if command else None):
+                    print(f"                 {transcript!r}: expected {command!r}, got {got}")
+
+    jarvis.intents.threshold = default
+    latencies = []
+    for _ in range(args.repeat):
+        for transcript, _, _ in CORPUS:
+            start = time.perf_counter()
+            jarvis.intents.match(transcript)
+            latencies.append(time.perf_counter() - start)
+    stats = percentiles(latencies)
+    print(f"fuzzy lookup over {len(jarvis.intents)} commands: p50 {stats['p50'] * 1000:.1f} us, "
+          f"p99 {stats['p99'] * 1000:.1f} us")
+    jarvis.close()
+
+if __name__ == "__main__":
+    main()
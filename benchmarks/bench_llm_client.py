@@ -0,0 +1,56 @@
+"""
+LLM client benchmark for J.A.R.V.I.S.
+Reports time-to-first-token and total time per call against the local stub.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import requests
+
+from benchmarks.openrouter_stub import OpenRouterStub
+from commands.llm_client import OpenRouterClient
+
+PAYLOAD = {"model": "stub", "messages": [{"role": "user", "content": "hello"}], "max_tokens": 150}
+
+def summarize(label: str, ttfts, totals):
+    print(f"{label:>10}: ttft p50={statistics.median(ttfts) * 1000:.1f} ms  "
+          f"total p50={statistics.median(totals) * 1000:.1f} ms  (n={len(totals)})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the OpenRouter client")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with OpenRouterStub(latency=args.latency, token_delay=args.token_delay) as stub:
+        # Baseline: a fresh connection for every call, as before pooling
+        totals = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            requests.post(stub.url, json=PAYLOAD, timeout=10).json()
+            totals.append(time.perf_counter() - start)
+        summarize("unpooled", totals, totals)
+
+        client = OpenRouterClient("stub-key", stub.url)
+        for label, call in (("pooled", client.complete),
+                            ("streaming", lambda payload: "".join(client.stream(payload)))):
+            ttfts, totals = [], []
+            for _ in range(args.calls):
+                call(PAYLOAD)
+                ttfts.append(client.last_timing['ttft'])
+                totals.append(client.last_timing['total'])
+            summarize(label, ttfts, totals)
+
+        stub.reply = "Café au lait ☕, naïve señor."
+        streamed = "".join(client.stream(PAYLOAD))
+        print(f"{'unicode':>10}: streamed reply {'intact' if streamed == stub.reply else f'garbled: {streamed!r}'}")
+        client.close()
+        if streamed != stub.reply:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Semantic recall benchmark for J.A.R.V.I.S.
+Measures indexing throughput and top-k lookup latency of SemanticIndex at
+growing history sizes, and checks that a planted turn is found again.
+"""
+
+import argparse
+import random
+import time
+
+from commands.context import Turn
+from commands.recall import HashingEmbedder, SemanticIndex
+
+TOPICS = [
+    "weather forecast rain london tomorrow", "python code refactor function tests",
+    "music playlist jazz evening", "flight booking paris airport", "dinner recipe pasta garlic",
+    "football match score team", "stock market prices shares", "meeting calendar monday agenda",
+    "workout running training plan", "movie recommendation science fiction",
+]
+
+def synthetic_turns(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    for seq in range(1, count + 1):
+        words = rng.choice(TOPICS).split()
+        rng.shuffle(words)
+        yield Turn(f"tell me about {' '.join(words[:3])}", f"Here is what I know about {' '.join(words)}.",
+                   "conversation", seq)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SemanticIndex")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        index = SemanticIndex(HashingEmbedder(dim=args.dim))
+        turns = list(synthetic_turns(size))
+        planted = Turn("my sister's birthday present is a telescope",
+                       "Noted, a telescope for your sister's birthday.", "conversation", size + 1)
+        turns.insert(size // 2, planted)
+
+        start = time.perf_counter()
+        index.add_many(turns)
+        indexed = time.perf_counter() - start
+
+        latencies = []
+        for i in range(args.queries):
+            query = TOPICS[i % len(TOPICS)]
+            start = time.perf_counter()
+            index.search(query, args.k)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        found = [turn for _, turn in index.search("what telescope did I pick for the birthday", args.k)]
+
+        print(f"{size:>7} turns: index {len(turns) / indexed:9.0f} turns/s, "
+              f"top-{args.k} p50 {latencies[len(latencies) // 2] * 1000:6.3f} ms "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.3f} ms, "
+              f"planted turn {'found' if planted in found else 'MISSED'}")
+
+if __name__ == "__main__":
+    main()
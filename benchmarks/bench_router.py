@@ -0,0 +1,99 @@
+"""
+Model routing benchmark for J.A.R.V.I.S.
+Serves several models from the local OpenRouter stub, each with its own
+latency, and sends requests through ConversationHandler. Checks that inputs
+land in the expected tier with that tier's token budget, that traffic moves
+off a model whose latency degrades, and that it returns once the model
+recovers. Exits non-zero if a check fails.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import List
+
+from benchmarks.openrouter_stub import OpenRouterStub
+from benchmarks.suite import percentiles
+
+ROUTES = {
+    "brief": {"models": ["small"], "max_tokens": 60},
+    "standard": {"models": ["primary", "backup"], "max_tokens": 150},
+    "complex": {"models": ["large", "backup"], "max_tokens": 400},
+}
+
+SAMPLES = [
+    ("hello", "brief"),
+    ("thanks jarvis", "brief"),
+    ("what is the capital of france", "standard"),
+    ("tell me something interesting about octopuses", "standard"),
+    ("explain how a transformer works and compare it with an rnn", "complex"),
+    ("what is a black hole? how do they form?", "complex"),
+]
+
+def check(ok: bool, label: str) -> str:
+    return f"{'PASS' if ok else 'FAIL'}   {label}"
+
+def send(handler, stub: OpenRouterStub, requests: int, phase: str):
+    """Send standard-tier requests; return models used and latencies."""
+    before = Counter(stub.model_counts)
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        handler.get_response(f"tell me something interesting about topic {phase} {i}", [])
+        latencies.append(time.perf_counter() - start)
+    used = Counter(stub.model_counts)
+    used.subtract(before)
+    return {model: count for model, count in used.items() if count}, percentiles(latencies)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check adaptive model routing against a multi-model stub")
+    parser.add_argument("--requests", type=int, default=80, help="Requests per phase")
+    parser.add_argument("--horizon", type=float, default=1.5, help="Seconds a latency sample counts")
+    args = parser.parse_args()
+
+    latency = {"small": 0.002, "primary": 0.01, "backup": 0.02, "large": 0.03}
+    lines: List[str] = []
+    with OpenRouterStub(model_latency=latency) as stub:
+        os.environ.update(OPENROUTER_API_URL=stub.url, JARVIS_MODEL_ROUTES=json.dumps(ROUTES))
+        os.environ.setdefault('OPENROUTER_API_KEY', "benchmark")
+        from commands.conversation import ConversationHandler
+        from commands.router import ModelRouter, load_routes
+
+        handler = ConversationHandler()
+        handler.router = ModelRouter(load_routes(os.environ['JARVIS_MODEL_ROUTES']), horizon=args.horizon)
+
+        wrong = []
+        for text, tier in SAMPLES:
+            handler.get_response(text, [])
+            sent = stub.last_request
+            if sent["model"] != ROUTES[tier]["models"][0] or sent["max_tokens"] != ROUTES[tier]["max_tokens"]:
+                wrong.append(f"{text!r} -> {sent['model']}/{sent['max_tokens']}")
+        lines.append(check(not wrong, f"{len(SAMPLES) - len(wrong)}/{len(SAMPLES)} inputs routed to their "
+                                      f"tier's model and budget" + (f" ({'; '.join(wrong)})" if wrong else "")))
+
+        used, stats = send(handler, stub, args.requests, "healthy")
+        lines.append(f"       healthy: {used}, p95 {stats['p95']:.1f} ms")
+        lines.append(check(used.get("primary", 0) >= args.requests * 0.9, "preferred model takes the traffic"))
+
+        stub.model_latency["primary"] = 0.15
+        used, stats = send(handler, stub, args.requests, "degraded")
+        lines.append(f"       primary degraded to {stub.model_latency['primary'] * 1000:.0f} ms: {used}, "
+                     f"p95 {stats['p95']:.1f} ms")
+        lines.append(check(used.get("backup", 0) >= args.requests * 0.75, "traffic moves to the backup model"))
+
+        stub.model_latency["primary"] = latency["primary"]
+        time.sleep(args.horizon)
+        used, stats = send(handler, stub, args.requests, "recovered")
+        lines.append(f"       primary recovered: {used}, p95 {stats['p95']:.1f} ms")
+        lines.append(check(used.get("primary", 0) >= args.requests * 0.75, "traffic returns to the preferred model"))
+        lines.append("\n" + handler.router.get_stats_summary())
+        handler.gateway.close()
+
+    print("\n".join(lines))
+    return 1 if any(line.startswith("FAIL") for line in lines) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
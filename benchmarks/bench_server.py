@@ -0,0 +1,124 @@
+"""
+Server load test for J.A.R.V.I.S.
+Starts `jarvis.py --serve` against the local OpenRouter stub and drives it
+with 1, 10 and 100 concurrent sessions, each sending the benchmark script in
+order, then reports requests per second and tail latency per level. The
+response cache is off unless --cache is given, so every conversation turn
+reaches the stub.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import aiohttp
+
+from benchmarks.openrouter_stub import OpenRouterStub
+from benchmarks.suite import DEFAULT_SCRIPT, percentiles
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def wait_healthy(base: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as client:
+        while time.monotonic() < deadline:
+            try:
+                async with client.get(f"{base}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become healthy")
+
+async def run_level(base: str, sessions: int, turns: int, websocket: bool) -> Dict:
+    latencies: List[float] = []
+    rejected = 0
+    connector = aiohttp.TCPConnector(limit=0)
+
+    async def http_session(client: aiohttp.ClientSession, name: str):
+        nonlocal rejected
+        for turn in range(turns):
+            text = DEFAULT_SCRIPT[turn % len(DEFAULT_SCRIPT)]
+            start = time.perf_counter()
+            async with client.post(f"{base}/v1/command", json={"session": name, "input": text}) as response:
+                await response.read()
+                if response.status == 503:
+                    rejected += 1
+                    continue
+            latencies.append(time.perf_counter() - start)
+
+    async def ws_session(client: aiohttp.ClientSession, name: str):
+        async with client.ws_connect(f"{base}/v1/ws?session={name}") as ws:
+            await ws.receive_json()
+            for turn in range(turns):
+                start = time.perf_counter()
+                await ws.send_str(DEFAULT_SCRIPT[turn % len(DEFAULT_SCRIPT)])
+                while True:
+                    message = await ws.receive_json()
+                    if message["type"] in ("response", "error"):
+                        break
+                latencies.append(time.perf_counter() - start)
+
+    run_session = ws_session if websocket else http_session
+    async with aiohttp.ClientSession(connector=connector) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(client, f"bench-{sessions}-{i}") for i in range(sessions)))
+        elapsed = time.perf_counter() - start
+    return {
+        'sessions': sessions,
+        'requests': len(latencies),
+        'rejected': rejected,
+        'throughput_rps': len(latencies) / elapsed,
+        'latency_ms': percentiles(latencies),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the J.A.R.V.I.S. server")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--turns", type=int, default=20, help="Requests per session")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--max-pending", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub latency before first byte")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Stub delay between tokens")
+    parser.add_argument("--websocket", action="store_true", help="Use the WebSocket endpoint")
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    args = parser.parse_args()
+
+    with OpenRouterStub(latency=args.latency, token_delay=args.token_delay) as stub:
+        port = free_port()
+        env = dict(os.environ, OPENROUTER_API_URL=stub.url, JARVIS_LOG_LEVEL="WARNING")
+        env.setdefault('OPENROUTER_API_KEY', "benchmark")
+        env.pop('JARVIS_CACHE_PATH', None)
+        env.pop('JARVIS_STORE_DIR', None)
+        if not args.cache:
+            env['JARVIS_CACHE_SIZE'] = "0"
+        server = subprocess.Popen(
+            [sys.executable, "jarvis.py", "--serve", "--port", str(port),
+             "--workers", str(args.workers), "--max-pending", str(args.max_pending)],
+            env=env)
+        base = f"http://127.0.0.1:{port}"
+        try:
+            asyncio.run(wait_healthy(base))
+            for sessions in args.sessions:
+                result = asyncio.run(run_level(base, sessions, args.turns, args.websocket))
+                latency = result['latency_ms']
+                print(f"{sessions:>4} sessions: {result['requests']:>5} requests, "
+                      f"{result['throughput_rps']:8.1f} req/s, p50 {latency['p50']:7.2f} ms, "
+                      f"p95 {latency['p95']:7.2f} ms, p99 {latency['p99']:7.2f} ms, "
+                      f"{result['rejected']} rejected")
+            print(f"stub served {sum(stub.model_counts.values())} LLM requests")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
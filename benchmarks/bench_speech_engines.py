@@ -0,0 +1,104 @@
+"""
+Speech engine routing benchmark for J.A.R.V.I.S.
+Drives the engine router with deterministic fake engines of different speeds
+and checks that traffic settles on the fastest engine, falls back when it
+fails, returns once it recovers and moves away when it slows down. With
+--tts or --stt, also measures real engines that are installed.
+Exits non-zero if a check fails.
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from typing import List
+
+from benchmarks.suite import percentiles
+from commands.speech_engines import (EngineRouter, FakeTTSEngine, STT_ENGINES, TTS_ENGINES,
+                                     build_engines)
+
+TEXT = "At your service, sir."
+
+def check(ok: bool, label: str) -> str:
+    return f"{'PASS' if ok else 'FAIL'}   {label}"
+
+def drive(router: EngineRouter, calls: int) -> Counter:
+    used = Counter()
+    for _ in range(calls):
+        used[router.run(lambda engine: (engine.synthesize(TEXT, "en"), engine.name)[1])] += 1
+    return used
+
+def routing(calls: int) -> List[str]:
+    slow = FakeTTSEngine(latency=0.03, name="slow")
+    medium = FakeTTSEngine(latency=0.01, name="medium")
+    fast = FakeTTSEngine(latency=0.002, name="fast")
+    router = EngineRouter("tts", [slow, medium, fast], probe_every=25, reset_timeout=0.3)
+    lines = []
+
+    used = drive(router, calls)
+    lines.append(f"       steady: {dict(used)}")
+    lines.append(check(used["fast"] >= calls * 0.9, "traffic settles on the fastest engine"))
+
+    fast.fail = True
+    used = drive(router, calls)
+    lines.append(f"       fastest failing: {dict(used)}")
+    lines.append(check(used["medium"] >= calls * 0.9 and fast.calls < calls * 1.2,
+                       "calls fall back to the next fastest engine"))
+
+    fast.fail = False
+    time.sleep(0.35)
+    used = drive(router, calls)
+    lines.append(f"       fastest recovered: {dict(used)}")
+    lines.append(check(used["fast"] >= calls * 0.8, "traffic returns after a successful trial call"))
+
+    fast.latency = 0.05
+    used = drive(router, calls)
+    lines.append(f"       fastest slowed down: {dict(used)}")
+    lines.append(check(used["medium"] >= calls * 0.7, "traffic moves away from an engine that slowed"))
+    return lines
+
+def real_engines(kind: str, names: str, calls: int) -> List[str]:
+    if kind == "tts":
+        router = EngineRouter("tts", build_engines(TTS_ENGINES, names.split(",")))
+        operation = lambda engine: engine.synthesize(TEXT, "en")
+    else:
+        import speech_recognition as sr
+        audio = sr.AudioData(b"\0\0" * 16000, 16000, 2)
+        router = EngineRouter("stt", build_engines(STT_ENGINES, names.split(",")))
+        operation = lambda engine: engine.recognize(audio)
+    lines = []
+    for engine in router.engines:
+        single = EngineRouter(kind, [engine])
+        latencies = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            try:
+                single.run(operation)
+            except Exception as e:
+                lines.append(f"       {kind} {engine.name}: failed ({e})")
+                break
+            latencies.append(time.perf_counter() - start)
+        else:
+            stats = percentiles(latencies)
+            lines.append(f"       {kind} {engine.name}: p50 {stats['p50']:.1f} ms, p95 {stats['p95']:.1f} ms")
+    if not router.engines:
+        lines.append(f"       no {kind} engines from {names!r} are installed")
+    return lines
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check latency-aware speech engine routing")
+    parser.add_argument("--calls", type=int, default=100, help="Calls per routing phase")
+    parser.add_argument("--tts", help="Also time these installed TTS engines, e.g. gtts,espeak,pyttsx3")
+    parser.add_argument("--stt", help="Also time these installed STT engines, e.g. google,sphinx")
+    args = parser.parse_args()
+
+    lines = routing(args.calls)
+    if args.tts:
+        lines += real_engines("tts", args.tts, 5)
+    if args.stt:
+        lines += real_engines("stt", args.stt, 5)
+    print("\n".join(lines))
+    return 1 if any(line.startswith("FAIL") for line in lines) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Startup benchmark for J.A.R.V.I.S.
+Launches fresh interpreters and times import plus headless construction of
+Jarvis, which is what a text REPL pays before the first prompt.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROBE = """
+import time
+start = time.perf_counter()
+import logging
+logging.disable(logging.CRITICAL)
+from jarvis import Jarvis
+imported = time.perf_counter()
+Jarvis(headless={headless})
+ready = time.perf_counter()
+import sys
+audio = any(name in sys.modules for name in ("pygame", "speech_recognition", "gtts", "sounddevice"))
+print(imported - start, ready - start, int(audio))
+"""
+
+def run(headless: bool, runs: int):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    imports, totals, processes, audio = [], [], [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", PROBE.format(headless=headless)],
+                                cwd=root, capture_output=True, text=True, check=True).stdout
+        processes.append(time.perf_counter() - start)
+        imported, ready, loaded_audio = output.split()
+        imports.append(float(imported))
+        totals.append(float(ready))
+        audio += int(loaded_audio)
+    return statistics.median(imports), statistics.median(totals), statistics.median(processes), audio
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark J.A.R.V.I.S. startup")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    for headless in (True, False):
+        imported, ready, process, audio = run(headless, args.runs)
+        print(f"headless={headless!s:<5}  import {imported * 1000:6.1f} ms  "
+              f"ready {ready * 1000:6.1f} ms  process {process * 1000:6.1f} ms  "
+              f"audio libraries loaded in {audio}/{args.runs} runs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Conversation store benchmark for J.A.R.V.I.S.
+Measures append throughput (and the cost on the caller's thread) and
+cold-start reload time of the recent window, next to a full scan of the log.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from commands.store import ConversationStore
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ConversationStore")
+    parser.add_argument("--turns", type=int, default=1000000)
+    parser.add_argument("--window", type=int, nargs="+", default=[10, 1000])
+    parser.add_argument("--directory", help="Store directory (default: a temporary directory)")
+    parser.add_argument("--no-fsync", action="store_true", help="Skip fsync on group commit")
+    args = parser.parse_args()
+
+    directory = args.directory or tempfile.mkdtemp(prefix="jarvis-store-")
+    try:
+        store = ConversationStore(directory, session="bench", fsync=not args.no_fsync)
+        turn = ("what is the weather like in london today",
+                "It is 14 degrees and cloudy in London with light rain expected this evening.")
+
+        start = time.perf_counter()
+        for _ in range(args.turns):
+            store.append(turn[0], turn[1], "conversation")
+        queued = time.perf_counter() - start
+        store.flush()
+        durable = time.perf_counter() - start
+        store.close()
+        print(f"append: {args.turns} turns, {queued / args.turns * 1e6:.2f} us/turn on caller, "
+              f"{args.turns / durable:,.0f} turns/s durable")
+
+        session = os.path.join(directory, "bench")
+        size = sum(os.path.getsize(os.path.join(session, name)) for name in os.listdir(session))
+        print(f"on disk: {size / 2**20:.1f} MiB in {len(os.listdir(session)) // 2} segments")
+
+        for window in args.window:
+            start = time.perf_counter()
+            reopened = ConversationStore(directory, session="bench")
+            recent = reopened.load_recent(window)
+            elapsed = time.perf_counter() - start
+            reopened.close()
+            assert len(recent) == min(window, args.turns) and recent[-1][0] == args.turns
+            print(f"cold start + last {window:>5} turns: {elapsed * 1000:8.2f} ms")
+
+        start = time.perf_counter()
+        reopened = ConversationStore(directory, session="bench")
+        everything = reopened.load_recent(args.turns)
+        elapsed = time.perf_counter() - start
+        reopened.close()
+        print(f"full scan of {len(everything)} turns: {elapsed * 1000:8.2f} ms")
+    finally:
+        if not args.directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
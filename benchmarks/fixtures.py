@@ -0,0 +1,114 @@
+"""
+Synthetic WAV fixtures for the J.A.R.V.I.S. voice benchmarks.
+Writes deterministic recordings so the voice stages run on a fresh checkout
+without a microphone, laid out as:
+
+    <dir>/templates/*.wav   enrolled samples of the wake word
+    <dir>/positive/*.wav    the wake word at other pitches, tempos, gains and noise levels
+    <dir>/negative/*.wav    other words, noise and silence
+    <dir>/*.wav             "<wake word> <command>" recordings
+
+The words are sequences of voiced syllables (harmonics of a pitch shaped by two
+formants), not real speech, but they exercise the same endpointing, energy and
+MFCC code as a recording would.
+"""
+
+import argparse
+import os
+import wave
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from commands.wake_word import SAMPLE_RATE
+
+# (pitch, first formant, second formant, seconds) per syllable
+Syllable = Tuple[float, float, float, float]
+
+WAKE_WORD: List[Syllable] = [(130, 700, 1200, 0.22), (120, 350, 2300, 0.18), (110, 500, 900, 0.25)]
+OTHER_WORDS: List[List[Syllable]] = [
+    [(150, 300, 2500, 0.20), (140, 650, 1100, 0.30)],
+    [(115, 250, 2600, 0.15), (125, 300, 2400, 0.15), (120, 280, 2700, 0.20), (110, 260, 2500, 0.20)],
+    [(160, 400, 1000, 0.45)],
+]
+COMMANDS: List[List[Syllable]] = [
+    [(125, 500, 1500, 0.2), (120, 700, 1100, 0.25), (115, 300, 2200, 0.2), (110, 550, 950, 0.3)],
+    [(140, 350, 2000, 0.3), (130, 650, 1200, 0.2), (120, 450, 1700, 0.35)],
+]
+
+def syllable(pitch: float, formant1: float, formant2: float, seconds: float,
+             sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """A voiced syllable: harmonics of pitch weighted by two formants, with a soft attack and decay."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    signal = np.zeros(len(t))
+    for harmonic in range(1, int(4000 / pitch)):
+        frequency = pitch * harmonic
+        weight = (np.exp(-((frequency - formant1) / 150) ** 2)
+                  + 0.6 * np.exp(-((frequency - formant2) / 200) ** 2) + 0.02)
+        signal += weight * np.sin(2 * np.pi * frequency * t)
+    envelope = np.minimum(1.0, np.minimum(t, t[-1] - t) / 0.03)
+    return signal * envelope / np.abs(signal).max()
+
+def word(syllables: Sequence[Syllable], pitch_scale: float = 1.0, tempo: float = 1.0,
+         sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Syllables joined with short gaps; pitch_scale shifts the voice, tempo > 1 speaks faster."""
+    gap = np.zeros(int(0.03 * sample_rate))
+    parts = []
+    for pitch, formant1, formant2, seconds in syllables:
+        parts += [syllable(pitch * pitch_scale, formant1, formant2, seconds / tempo, sample_rate), gap]
+    return np.concatenate(parts[:-1])
+
+def recording(parts: Sequence[np.ndarray], rng: np.random.Generator, gain: float = 8000,
+              noise: float = 30, pause: float = 0.4, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Words separated by pauses in a quiet room, as 16-bit samples."""
+    silence = np.zeros(int(pause * sample_rate))
+    pieces = [silence]
+    for part in parts:
+        pieces += [part * gain, silence]
+    signal = np.concatenate(pieces)
+    signal += rng.normal(0, noise, len(signal))
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int = SAMPLE_RATE):
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(samples.tobytes())
+
+def generate(directory: str, seed: int = 0) -> str:
+    """Write the fixture set into directory and return it."""
+    rng = np.random.default_rng(seed)
+    for sub in ("templates", "positive", "negative"):
+        os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+    for i, (pitch_scale, tempo) in enumerate([(1.0, 1.0), (1.1, 0.95), (0.9, 1.05)]):
+        write_wav(os.path.join(directory, "templates", f"wake_{i}.wav"),
+                  recording([word(WAKE_WORD, pitch_scale, tempo)], rng, pause=0.2))
+
+    for i, (pitch_scale, tempo, gain, noise) in enumerate(
+            [(1.05, 1.0, 8000, 30), (0.95, 0.9, 4000, 30), (1.2, 1.1, 12000, 60),
+             (0.85, 1.0, 6000, 100), (1.0, 0.85, 9000, 30)]):
+        write_wav(os.path.join(directory, "positive", f"wake_{i}.wav"),
+                  recording([word(WAKE_WORD, pitch_scale, tempo)], rng, gain, noise))
+
+    negatives = [recording([word(other, scale)], rng) for other in OTHER_WORDS for scale in (0.9, 1.1)]
+    negatives.append(recording([], rng, pause=1.0))
+    negatives.append(recording([rng.normal(0, 1, SAMPLE_RATE // 2)], rng, gain=2000))
+    for i, samples in enumerate(negatives):
+        write_wav(os.path.join(directory, "negative", f"other_{i}.wav"), samples)
+
+    for i, command in enumerate(COMMANDS):
+        write_wav(os.path.join(directory, f"wake_command_{i}.wav"),
+                  recording([word(WAKE_WORD, 1.0 + 0.05 * i), word(command)], rng, pause=0.8))
+    return directory
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic WAV fixtures for the voice benchmarks")
+    parser.add_argument("directory", help="Where to write templates/, positive/, negative/ and recordings")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate(args.directory, args.seed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Local stand-in for OpenRouter's chat completions endpoint.
+Serves canned replies with configurable latency, per model if needed,
+optionally as an SSE stream, and can inject faults (errors, slow replies, dropped connections) to exercise
+retries, hedging and circuit breaking.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Optional
+
+# Fault kinds for OpenRouterStub.inject and the random fault rates
+FAULT_ERROR = "error"
+FAULT_SLOW = "slow"
+FAULT_DROP = "drop"
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between calls
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY a kept-alive
+    # connection stalls on delayed ACKs and makes pooled clients look slower
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        fault = stub.record_request(body)
+
+        if fault == FAULT_DROP:
+            # Hang up without answering, like a reset connection
+            self.close_connection = True
+            return
+        if fault == FAULT_ERROR:
+            self._send_json(stub.error_status, {"error": {"message": "injected fault"}})
+            return
+        time.sleep(stub.slow_latency if fault == FAULT_SLOW else stub.latency_for(body.get("model")))
+        if body.get("stream"):
+            self._send_stream(stub)
+        else:
+            self._send_json(200, {
+                "id": "stub",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": stub.reply},
+                             "finish_reason": "stop"}]
+            })
+
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if status == 429 or status >= 500:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _send_stream(self, stub: "OpenRouterStub"):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._write_chunk(b": OPENROUTER PROCESSING\n\n")
+        for i, token in enumerate(stub.tokens()):
+            if i:
+                time.sleep(stub.token_delay)
+            event = {"choices": [{"index": 0, "delta": {"content": token}}]}
+            # Raw UTF-8, as real providers send it, so clients must not guess the charset
+            self._write_chunk(b"data: " + json.dumps(event, ensure_ascii=False).encode() + b"\n\n")
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+class _StubServer(ThreadingHTTPServer):
+    # Deep accept backlog so hundreds of concurrent clients are not refused
+    request_queue_size = 1024
+    daemon_threads = True
+
+class OpenRouterStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 token_delay: float = 0.0, reply: str = "At your service, sir.",
+                 error_rate: float = 0.0, error_status: int = 503, slow_rate: float = 0.0,
+                 slow_latency: float = 1.0, drop_rate: float = 0.0, seed: Optional[int] = None,
+                 model_latency: Optional[Dict[str, float]] = None):
+        """
+        Initialize the stub server.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Seconds to wait before the first byte of every response
+            token_delay: Seconds between streamed tokens
+            reply: Assistant message returned for every request
+            error_rate: Fraction of requests answered with error_status
+            error_status: HTTP status for injected errors
+            slow_rate: Fraction of requests delayed by slow_latency instead of latency
+            slow_latency: Delay for slow requests
+            drop_rate: Fraction of requests whose connection is closed without a reply
+            seed: Seed for the fault dice, for reproducible runs
+            model_latency: Latency for specific model names, overriding latency
+        """
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply = reply
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.drop_rate = drop_rate
+        self.model_latency: Dict[str, float] = dict(model_latency or {})
+        self.request_count = 0
+        self.model_counts: Counter = Counter()
+        self.fault_count = 0
+        self.last_request: Optional[dict] = None
+        self._scripted: Deque[Optional[str]] = deque()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _StubServer((host, port), _StubRequestHandler)
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Chat completions URL to use as OPENROUTER_API_URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def tokens(self):
+        """Split the reply into word-sized stream deltas."""
+        words = self.reply.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def latency_for(self, model: Optional[str]) -> float:
+        """Delay before answering a request for model."""
+        return self.model_latency.get(model, self.latency)
+
+    def inject(self, fault: Optional[str], count: int = 1):
+        """Force the next count requests to fail with a fault kind (None forces success)."""
+        with self._lock:
+            self._scripted.extend([fault] * count)
+
+    def record_request(self, body: dict) -> Optional[str]:
+        """Count a request and decide which fault, if any, it gets."""
+        with self._lock:
+            self.request_count += 1
+            self.model_counts[body.get("model")] += 1
+            self.last_request = body
+            if self._scripted:
+                fault = self._scripted.popleft()
+            else:
+                roll = self._random.random()
+                if roll < self.error_rate:
+                    fault = FAULT_ERROR
+                elif roll < self.error_rate + self.drop_rate:
+                    fault = FAULT_DROP
+                elif roll < self.error_rate + self.drop_rate + self.slow_rate:
+                    fault = FAULT_SLOW
+                else:
+                    fault = None
+            if fault is not None:
+                self.fault_count += 1
+            return fault
+
+    def start(self) -> "OpenRouterStub":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenRouter stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="Latency for one model name (repeatable)")
+    args = parser.parse_args()
+    model_latency = {}
+    for item in args.model_latency:
+        model, _, seconds = item.rpartition("=")
+        model_latency[model] = float(seconds)
+
+    stub = OpenRouterStub(port=args.port, latency=args.latency, token_delay=args.token_delay,
+                          error_rate=args.error_rate, error_status=args.error_status,
+                          slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                          drop_rate=args.drop_rate, model_latency=model_latency)
+    print(f"Serving on {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+End-to-end benchmark suite for J.A.R.V.I.S.
+Drives scripted text through Jarvis.process_command against the local
+OpenRouter stub and, with --audio, WAV recordings (synthetic unless a directory
+is given) through VoiceHandler's recognition and synthesis, then reports throughput and latency percentiles as JSON and optionally
+checks them against a baseline run.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.fixtures import generate
+from benchmarks.openrouter_stub import OpenRouterStub
+
+DEFAULT_SCRIPT = [
+    "hello",
+    "what time is it",
+    "context",
+    "tell me a joke",
+    "cache stats",
+    "what can you do",
+    "hello",
+    "clear context",
+    "summarize our conversation",
+    "stats",
+]
+
+# Metrics where a larger value is better; everything else is a latency
+HIGHER_IS_BETTER = ("throughput_rps", "cloud_calls_avoided_ratio")
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """Exact p50/p95/p99 and mean in milliseconds."""
+    if not samples:
+        return {'p50': None, 'p95': None, 'p99': None, 'mean': None}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] * 1000
+
+    return {'p50': pick(50), 'p95': pick(95), 'p99': pick(99),
+            'mean': sum(ordered) / len(ordered) * 1000}
+
+def run_text(script: List[str], repeat: int, stream: bool) -> Dict:
+    """Feed the script through process_command and time each call."""
+    from jarvis import Jarvis
+
+    jarvis = Jarvis(headless=True)
+    # Warm up plugin loading and connections so the first call is not an outlier
+    jarvis.process_command("warm up")
+    jarvis.response_cache.clear()
+
+    on_token = (lambda chunk: None) if stream else None
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for line in script:
+            call_start = time.perf_counter()
+            jarvis.process_command(line, on_token=on_token)
+            latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': len(latencies),
+        'throughput_rps': len(latencies) / elapsed,
+        'latency_ms': percentiles(latencies),
+        'cache': jarvis.response_cache.stats(),
+    }
+
+def run_audio(wav_dir: str, live_stt: bool, stt_latency: float, tts_latency: float) -> Dict:
+    """
+    Run WAV recordings through VoiceHandler the way its streaming listen loop does:
+    endpointing, the wake word pre-filter, recognition of escalated utterances and
+    synthesis of a reply. Fake engines with fixed latencies stand in for the cloud
+    unless live_stt is set.
+    """
+    # VoiceHandler reads its configuration at construction
+    os.environ.setdefault('JARVIS_WAKE_TEMPLATES', os.path.join(wav_dir, "templates"))
+    os.environ['JARVIS_TTS_ENGINES'] = 'fake'
+    if not live_stt:
+        os.environ['JARVIS_STT_ENGINES'] = 'fake'
+    os.environ.pop('JARVIS_TTS_CACHE_DIR', None)
+    # Lets the pygame mixer start on machines without a sound card, and keeps
+    # pygame's import banner out of the JSON report on stdout
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+    from commands.audio_capture import segment_samples
+    from commands.speech_engines import EngineRouter, FakeSTTEngine, FakeTTSEngine
+    from commands.voice import VoiceHandler
+    from commands.wake_word import load_wav
+
+    voice = VoiceHandler()
+    voice.tts = EngineRouter("tts", [FakeTTSEngine(latency=tts_latency)])
+    if not live_stt:
+        voice.stt = EngineRouter("stt", [FakeSTTEngine(default="jarvis", latency=stt_latency)])
+
+    endpoint, prefilter, recognition, synthesis = [], [], [], []
+    utterances = escalated = 0
+    files = sorted(path for path in glob.glob(os.path.join(wav_dir, "**", "*.wav"), recursive=True)
+                   if os.path.basename(os.path.dirname(path)) != "templates")
+    for path in files:
+        samples = load_wav(path)
+        start = time.perf_counter()
+        segments = segment_samples(samples)
+        endpoint.append(time.perf_counter() - start)
+        for begin, end in segments:
+            utterance = samples[begin:end]
+            utterances += 1
+            start = time.perf_counter()
+            likely = voice.wake_word_detector.is_likely(utterance)
+            prefilter.append(time.perf_counter() - start)
+            if not likely:
+                continue
+            escalated += 1
+            start = time.perf_counter()
+            heard = voice._recognize(utterance)
+            recognition.append(time.perf_counter() - start)
+            if heard:
+                start = time.perf_counter()
+                voice.synthesize(f"You said {heard}")
+                synthesis.append(time.perf_counter() - start)
+    if voice.speech_worker is not None:
+        voice.speech_worker.stop()
+
+    return {
+        'files': len(files),
+        'utterances': utterances,
+        'cloud_calls_avoided_ratio': (utterances - escalated) / utterances if utterances else None,
+        'endpoint_ms': percentiles(endpoint),
+        'prefilter_ms': percentiles(prefilter),
+        'stt_ms': percentiles(recognition),
+        'tts_ms': percentiles(synthesis),
+        'audio_cache': voice.audio_cache.stats(),
+    }
+
+def flatten(report: Dict, prefix: str = "") -> Dict[str, float]:
+    """Flatten nested numeric results into dotted metric names."""
+    flat = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """List metrics that regressed by more than threshold (a fraction) against a baseline."""
+    regressions = []
+    now, before = flatten(current['results']), flatten(baseline['results'])
+    for name, old in before.items():
+        new = now.get(name)
+        if new is None or not old or not (name.endswith(HIGHER_IS_BETTER) or "_ms." in name):
+            continue
+        if name.endswith(HIGHER_IS_BETTER):
+            worse = new < old * (1 - threshold)
+        else:
+            worse = new > old * (1 + threshold)
+        if worse:
+            regressions.append(f"{name}: {old:.3f} -> {new:.3f}")
+    return regressions
+
+def build_id() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the J.A.R.V.I.S. benchmark suite")
+    parser.add_argument("--script", help="File with one input per line (default: built-in script)")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the script")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub latency before first byte")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Stub delay between tokens")
+    parser.add_argument("--audio", action="store_true",
+                        help="Also run the voice stages (on synthetic recordings unless --wav-dir is given)")
+    parser.add_argument("--wav-dir", help="Directory of WAV recordings for the voice stages (implies --audio)")
+    parser.add_argument("--live-stt", action="store_true",
+                        help="Send escalated audio to the configured STT engines instead of a fake one")
+    parser.add_argument("--stt-latency", type=float, default=0.3, help="Fake STT delay per utterance")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="Fake TTS delay per uncached phrase")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Allowed relative regression before failing (default 10%%)")
+    args = parser.parse_args(argv)
+
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script) as f:
+            script = [line.strip() for line in f if line.strip()]
+
+    from commands.metrics import METRICS
+
+    results = {}
+    with OpenRouterStub(latency=args.latency, token_delay=args.token_delay) as stub:
+        os.environ['OPENROUTER_API_URL'] = stub.url
+        os.environ.setdefault('OPENROUTER_API_KEY', "benchmark")
+        # Identical inputs would otherwise be answered from a persisted cache
+        os.environ.pop('JARVIS_CACHE_PATH', None)
+        results['text'] = run_text(script, args.repeat, stream=False)
+        results['text_streaming'] = run_text(script, args.repeat, stream=True)
+        if args.audio or args.wav_dir:
+            with tempfile.TemporaryDirectory() as scratch:
+                results['audio'] = run_audio(args.wav_dir or generate(scratch), args.live_stt,
+                                             args.stt_latency, args.tts_latency)
+
+    report = {
+        'build': build_id(),
+        'python': platform.python_version(),
+        'timestamp': time.time(),
+        'config': {'repeat': args.repeat, 'latency': args.latency, 'token_delay': args.token_delay,
+                   'stt_latency': args.stt_latency, 'tts_latency': args.tts_latency},
+        'results': results,
+        'stages': METRICS.snapshot()['stages'],
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}", file=sys.stderr)
+    return 0
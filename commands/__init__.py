@@ -0,0 +1,61 @@
+"""
+Command plugins for J.A.R.V.I.S.
+
+Each manifest entry names a module exposing register_commands(jarvis), the
+commands it registers and any attributes it sets on the assistant. Jarvis
+registers lightweight placeholders from this table and imports a module only
+when one of its commands or attributes is first used. 'arguments' lists the
+commands that take trailing text and 'aliases' the other phrasings the fuzzy
+intent matcher should accept for a command. 'argument_patterns' restricts the
+arguments a fuzzy match may leave, so a sentence that merely starts like a
+command ("visit Paris, what should I see?") stays conversation. 'local_only'
+lists commands that act on the machine J.A.R.V.I.S. runs on, which remote
+clients of the server may not use.
+"""
+
+# A domain, or a well-known site name, optionally "the ... site"
+SITE_ARGUMENT = (
+    r"(?:(?:the|my|a)\s+)?"
+    r"(?:[a-z0-9-]+(?:\.[a-z0-9-]+)+(?:/\S*)?"
+    r"|(?:google|youtube|github|gitlab|wikipedia|gmail|amazon|reddit|twitter|facebook|instagram"
+    r"|linkedin|netflix|spotify|stackoverflow|maps|news|weather|bbc|cnn)"
+    r"(?:\s+(?:site|website|page))?)"
+)
+
+PLUGIN_MANIFEST = [
+    {
+        'module': 'commands.web_browser',
+        'commands': ['open', 'browse'],
+        'arguments': ['open', 'browse'],
+        'aliases': {
+            'open': ['go to', 'goto', 'visit', 'launch', 'navigate to', 'pull up'],
+            'browse': ['browse to', 'surf'],
+        },
+        'argument_patterns': {'open': SITE_ARGUMENT, 'browse': SITE_ARGUMENT},
+        'local_only': ['open', 'browse'],
+        'provides': [],
+        'audio': False,
+    },
+    {
+        'module': 'commands.voice',
+        'commands': ['listen', 'stop listening', 'speak', 'stop speaking', 'speech engines'],
+        'arguments': ['speak'],
+        'aliases': {
+            'listen': ['start listening'],
+            'stop speaking': ['stop talking', 'be quiet', 'shut up'],
+            'speech engines': ['voice engines'],
+        },
+        'local_only': ['listen', 'stop listening', 'speak', 'stop speaking'],
+        'provides': ['voice_handler'],
+        # Pulls in pygame and speech_recognition, builds the speech engines and opens the mixer
+        'audio': True,
+    },
+    {
+        'module': 'commands.conversation',
+        'commands': ['prompt stats', 'llm stats', 'model stats'],
+        'arguments': [],
+        'aliases': {},
+        'provides': ['conversation_handler'],
+        'audio': False,
+    },
+]
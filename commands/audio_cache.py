@@ -0,0 +1,103 @@
+"""
+Synthesized audio cache for J.A.R.V.I.S.
+Keeps encoded TTS audio in memory, bounded by total byte size, with an
+optional on-disk copy so common phrases survive restarts.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AudioKey = Tuple[str, str, str]
+
+class AudioCache:
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, directory: Optional[str] = None):
+        """
+        Initialize the audio cache.
+
+        Args:
+            max_bytes: Maximum total size of audio kept in memory
+            directory: Optional directory where synthesized audio is persisted
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[AudioKey, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(text: str, lang: str, engine: str) -> AudioKey:
+        """Build a cache key; whitespace differences do not change the audio."""
+        return (" ".join(text.split()), lang, engine)
+
+    def _path(self, key: AudioKey) -> str:
+        name = hashlib.sha1("\x00".join(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}.audio")
+
+    def get(self, key: AudioKey) -> Optional[bytes]:
+        """Return cached audio bytes, or None on a miss."""
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return audio
+
+        if self.directory:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    audio = f.read()
+            except OSError:
+                audio = None
+            if audio:
+                with self._lock:
+                    self._insert(key, audio)
+                    self.hits += 1
+                return audio
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: AudioKey, audio: bytes):
+        """Cache synthesized audio."""
+        with self._lock:
+            self._insert(key, audio)
+
+        if self.directory:
+            try:
+                # Write then rename so readers never see a partial file
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(audio)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                logger.error(f"Failed to persist synthesized audio: {e}")
+
+    def _insert(self, key: AudioKey, audio: bytes):
+        """Insert into the in-memory LRU, evicting old entries until under the byte limit."""
+        if len(audio) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = audio
+        self.size += len(audio)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters."""
+        return {'entries': len(self._entries), 'bytes': self.size,
+                'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,272 @@
+"""
+Streaming audio capture for J.A.R.V.I.S.
+Records continuously into a NumPy ring buffer and cuts utterances out of the
+stream with adaptive voice-activity endpointing, including pre-roll, so speech
+that starts right after the wake word is never lost.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from commands.wake_word import SAMPLE_RATE, HOP_LENGTH
+
+logger = logging.getLogger(__name__)
+
+class RingBuffer:
+    def __init__(self, capacity: int):
+        """Fixed-size int16 sample buffer addressed by absolute sample position."""
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self.written = 0
+
+    def write(self, samples: np.ndarray):
+        """Append samples, overwriting the oldest ones when full."""
+        samples = samples[-self.capacity:]
+        start = self.written % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        self._data[:len(samples) - first] = samples[first:]
+        self.written += len(samples)
+
+    def view(self, start: int, end: int) -> np.ndarray:
+        """
+        Return samples [start, end) by absolute position.
+
+        This is a zero-copy view unless the range wraps around the end of the
+        buffer. Views stay valid until the buffer wraps past them.
+        """
+        start = max(start, self.written - self.capacity, 0)
+        end = min(end, self.written)
+        if end <= start:
+            return self._data[:0]
+        offset = start % self.capacity
+        length = end - start
+        if offset + length <= self.capacity:
+            return self._data[offset:offset + length]
+        return np.concatenate((self._data[offset:], self._data[:offset + length - self.capacity]))
+
+class Endpointer:
+    def __init__(self, sample_rate: int = SAMPLE_RATE, start_frames: int = 3,
+                 hangover: float = 0.5, pre_roll: float = 0.3, max_utterance: float = 10.0,
+                 ratio: float = 3.0):
+        """
+        Initialize the voice-activity endpointer.
+
+        Args:
+            sample_rate: Sample rate of the incoming audio
+            start_frames: Consecutive voiced 10 ms frames needed to open an utterance
+            hangover: Seconds of trailing silence that close an utterance
+            pre_roll: Seconds of audio kept before the detected speech onset
+            max_utterance: Utterances are cut at this length
+            ratio: Frame energy relative to the noise floor that counts as speech
+        """
+        self.frame = HOP_LENGTH * sample_rate // SAMPLE_RATE
+        self.start_frames = start_frames
+        self.hangover_frames = int(hangover * sample_rate / self.frame)
+        self.pre_roll = int(pre_roll * sample_rate)
+        self.max_samples = int(max_utterance * sample_rate)
+        self.ratio = ratio
+        self.noise_floor: Optional[float] = None
+        self.position = 0
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._start: Optional[int] = None
+        self._pending = np.zeros(0, dtype=np.int16)
+
+    @property
+    def in_speech(self) -> bool:
+        return self._start is not None
+
+    def process(self, samples: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        Feed new samples and return utterances completed by them.
+
+        Returns:
+            List of (start, end) absolute sample positions
+        """
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        usable = len(samples) - len(samples) % self.frame
+        self._pending = samples[usable:].copy()
+        if not usable:
+            return []
+
+        frames = samples[:usable].reshape(-1, self.frame).astype(np.float32)
+        energy = np.sqrt(np.mean(frames * frames, axis=1))
+        segments = []
+        for value in energy:
+            frame_end = self.position + self.frame
+            if self.noise_floor is None:
+                self.noise_floor = max(float(value), 1.0)
+            voiced = value > self.noise_floor * self.ratio
+            if not voiced:
+                # Adapt to the room only while it is quiet
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * max(float(value), 1.0)
+
+            if self._start is None:
+                self._voiced_run = self._voiced_run + 1 if voiced else 0
+                if self._voiced_run >= self.start_frames:
+                    onset = frame_end - self._voiced_run * self.frame
+                    self._start = max(0, onset - self.pre_roll)
+                    self._silent_run = 0
+            else:
+                self._silent_run = 0 if voiced else self._silent_run + 1
+                if self._silent_run >= self.hangover_frames or frame_end - self._start >= self.max_samples:
+                    end = frame_end - self._silent_run * self.frame
+                    segments.append((self._start, end))
+                    self._start = None
+                    self._voiced_run = 0
+            self.position = frame_end
+        return segments
+
+class StreamingCapture:
+    def __init__(self, sample_rate: int = SAMPLE_RATE, buffer_seconds: float = 30.0,
+                 endpointer: Optional[Endpointer] = None, device=None):
+        """
+        Initialize continuous microphone capture.
+
+        Args:
+            sample_rate: Capture sample rate
+            buffer_seconds: Length of audio history kept in the ring buffer
+            endpointer: Endpointer used to cut utterances out of the stream
+            device: sounddevice input device (None for the default)
+        """
+        self.sample_rate = sample_rate
+        self.ring = RingBuffer(int(buffer_seconds * sample_rate))
+        self.endpointer = endpointer or Endpointer(sample_rate)
+        self.device = device
+        self._processed = 0
+        self._ready: List[Tuple[int, int]] = []
+        self._ignored: Optional[Tuple[int, int]] = None
+        self._condition = threading.Condition()
+        self._stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        """Audio thread callback: copy into the ring buffer and wake the consumer."""
+        if status:
+            logger.debug("Capture status: %s", status)
+        with self._condition:
+            self.ring.write(indata[:, 0])
+            self._condition.notify()
+
+    def start(self):
+        """Open the input stream."""
+        import sounddevice as sd
+
+        self._stream = sd.InputStream(
+            samplerate=self.sample_rate, channels=1, dtype='int16',
+            blocksize=HOP_LENGTH, device=self.device, callback=self._callback)
+        self._stream.start()
+        logger.info("Streaming capture started at %d Hz", self.sample_rate)
+
+    def stop(self):
+        """Close the input stream."""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        with self._condition:
+            self._condition.notify_all()
+
+    @property
+    def position(self) -> int:
+        """Absolute sample position of the newest captured audio."""
+        return self.ring.written
+
+    def ignore(self, start: int, end: int):
+        """Drop future utterances lying entirely within [start, end), e.g. our own spoken prompt."""
+        with self._condition:
+            self._ignored = (start, end)
+
+    def _drain(self):
+        """Run the endpointer over audio captured since the last call. Caller holds the lock."""
+        if self._processed < self.ring.written:
+            fresh = self.ring.view(self._processed, self.ring.written)
+            self._processed = self.ring.written
+            for start, end in self.endpointer.process(fresh):
+                if self._ignored and start >= self._ignored[0] and end <= self._ignored[1]:
+                    continue
+                self._ready.append((start, end))
+
+    def has_pending_speech(self) -> bool:
+        """Whether speech is in progress or an utterance is waiting to be read."""
+        with self._condition:
+            self._drain()
+            return bool(self._ready) or self.endpointer.in_speech
+
+    def next_utterance(self, timeout: Optional[float] = None,
+                       active: Optional[Callable[[], bool]] = None) -> Optional[np.ndarray]:
+        """
+        Block until the next utterance is complete.
+
+        Args:
+            timeout: Seconds to wait in total (None waits until capture stops)
+            active: Checked whenever new audio arrives; stop waiting once it returns False
+
+        Returns:
+            A view of the utterance samples in the ring buffer, or None on timeout
+        """
+        # The callback notifies for every block, so the timeout must bound the whole wait
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                self._drain()
+                if self._ready:
+                    start, end = self._ready.pop(0)
+                    return self.ring.view(start, end)
+                if self._stream is None or (active is not None and not active()):
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+def segment_samples(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                    chunk: int = HOP_LENGTH, endpointer: Optional[Endpointer] = None) -> List[Tuple[int, int]]:
+    """Run the endpointer over recorded audio in callback-sized chunks, as live capture would."""
+    endpointer = endpointer or Endpointer(sample_rate)
+    segments = []
+    for offset in range(0, len(samples), chunk):
+        segments.extend(endpointer.process(samples[offset:offset + chunk]))
+    # Flush trailing speech with silence so the final utterance closes
+    silence = np.zeros(endpointer.hangover_frames * endpointer.frame + endpointer.frame, dtype=np.int16)
+    segments.extend(endpointer.process(silence))
+    return segments
+
+def wake_to_command_latency(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                            endpointer: Optional[Endpointer] = None) -> Optional[Dict[str, float]]:
+    """
+    Measure wake-to-command timing offline for a recording of "<wake word> <command>".
+
+    The first utterance is taken as the wake word and the second as the command.
+    Times are in seconds from the start of the recording.
+
+    Returns:
+        wake_end: when the wake word utterance was endpointed
+        command_start / command_end: bounds of the command utterance (start includes pre-roll)
+        command_ready: when the command was handed to recognition
+        endpoint_delay: command_ready - command_end
+        wake_to_command: command_ready - wake_end
+        or None if fewer than two utterances were found
+    """
+    endpointer = endpointer or Endpointer(sample_rate)
+    segments = segment_samples(samples, sample_rate, endpointer=endpointer)
+    if len(segments) < 2:
+        return None
+
+    hangover = endpointer.hangover_frames * endpointer.frame / sample_rate
+    (_, wake_end), (command_start, command_end) = segments[0], segments[1]
+    wake_ready = wake_end / sample_rate + hangover
+    command_ready = command_end / sample_rate + hangover
+    return {
+        'wake_end': wake_ready,
+        'command_start': command_start / sample_rate,
+        'command_end': command_end / sample_rate,
+        'command_ready': command_ready,
+        'endpoint_delay': command_ready - command_end / sample_rate,
+        'wake_to_command': command_ready - wake_ready,
+    }
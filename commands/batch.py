@@ -0,0 +1,163 @@
+"""
+Batch mode for J.A.R.V.I.S.
+Replays inputs from a file or stdin through process_command. Each line is
+either plain text or a JSON object {"input": ..., "session": ..., "id": ...}.
+Different sessions run concurrently on a bounded worker pool, turns within a
+session run in input order, and one JSONL result per input is written as soon
+as it completes. Reading stops whenever max_pending inputs are unfinished, so
+memory use does not grow with the size of the input.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, NamedTuple, Optional, TextIO
+
+from commands.metrics import METRICS
+from commands.sessions import SESSION_RE
+
+logger = logging.getLogger(__name__)
+
+class BatchItem(NamedTuple):
+    line: int
+    id: Any
+    session: str
+    text: str
+    queued: float
+
+class BatchRunner:
+    def __init__(self, jarvis, workers: int = 8, max_pending: Optional[int] = None,
+                 session: str = "batch"):
+        """
+        Initialize the batch runner.
+
+        Args:
+            jarvis: Jarvis instance whose process_command handles each input
+            workers: Inputs processed at once, which also bounds in-flight LLM calls
+            max_pending: Inputs read but not yet written before reading pauses
+                (defaults to four per worker)
+            session: Session for plain-text lines and JSON lines without one
+
+        Raises:
+            ValueError: If session is not 1-64 letters, digits, '-' or '_'
+        """
+        if not SESSION_RE.fullmatch(session):
+            raise ValueError("session must be 1-64 letters, digits, '-' or '_'")
+        self.jarvis = jarvis
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        self.session = session
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jarvis-batch")
+        self.processed = 0
+        self.errors = 0
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # Session -> inputs waiting behind the one currently running for it
+        self._sessions: Dict[str, Deque[BatchItem]] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._out: Optional[TextIO] = None
+
+    def _parse(self, number: int, line: str) -> BatchItem:
+        text, session, item_id = line, self.session, None
+        if line.startswith("{"):
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("JSON lines must be objects")
+            text = record.get("input")
+            session = record.get("session") or self.session
+            item_id = record.get("id")
+            # Session ids name store directories, so "../x" must not reach the filesystem
+            if not isinstance(session, str) or not SESSION_RE.fullmatch(session):
+                raise ValueError("'session' must be 1-64 letters, digits, '-' or '_'")
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("'input' must be a non-empty string")
+        return BatchItem(number, item_id, session, text, time.perf_counter())
+
+    def _write(self, record: Dict):
+        data = json.dumps(record, ensure_ascii=False)
+        with self._write_lock:
+            self._out.write(data + "\n")
+            self._out.flush()
+
+    def _submit(self, item: BatchItem):
+        """Run an input now, or queue it behind the running input of its session."""
+        with self._lock:
+            waiting = self._sessions.get(item.session)
+            if waiting is not None:
+                waiting.append(item)
+                return
+            self._sessions[item.session] = deque()
+        self.executor.submit(self._execute, item)
+
+    def _execute(self, item: BatchItem):
+        started = time.perf_counter()
+        record = {"line": item.line, "id": item.id, "session": item.session, "input": item.text}
+        try:
+            response = self.jarvis.process_command(item.text, session=item.session)
+            record["response"] = "" if response is None else str(response)
+        except Exception as e:
+            logger.error(f"Batch input on line {item.line} failed: {e}")
+            record["error"] = str(e)
+        finished = time.perf_counter()
+        METRICS.record("batch.item", finished - started)
+        record["queued_ms"] = round((started - item.queued) * 1000, 3)
+        record["elapsed_ms"] = round((finished - started) * 1000, 3)
+        try:
+            self._write(record)
+        finally:
+            self._finish(item.session, "error" in record)
+
+    def _finish(self, session: str, failed: bool):
+        with self._lock:
+            self.processed += 1
+            self.errors += failed
+            waiting = self._sessions[session]
+            following = waiting.popleft() if waiting else None
+            if following is None:
+                del self._sessions[session]
+        if following is not None:
+            self.executor.submit(self._execute, following)
+        self._slots.release()
+
+    def run(self, lines: Iterable[str], out: TextIO) -> Dict[str, Any]:
+        """
+        Process every input and write one JSON result line per input to out.
+
+        Returns:
+            Counts and throughput for the whole run
+        """
+        self._out = out
+        start = time.perf_counter()
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = self._parse(number, line)
+            except ValueError as e:
+                # json.JSONDecodeError is a ValueError too
+                self._write({"line": number, "error": f"invalid input: {e}"})
+                with self._lock:
+                    self.errors += 1
+                continue
+            self._slots.acquire()
+            self._submit(item)
+
+        # Every slot back means every input has been written
+        for _ in range(self.max_pending):
+            self._slots.acquire()
+        for _ in range(self.max_pending):
+            self._slots.release()
+        elapsed = time.perf_counter() - start
+        return {
+            'processed': self.processed,
+            'errors': self.errors,
+            'seconds': round(elapsed, 3),
+            'throughput_per_s': round(self.processed / elapsed, 1) if elapsed else None,
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=True)
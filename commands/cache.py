@@ -0,0 +1,168 @@
+"""
+Response cache for J.A.R.V.I.S.
+Caches conversation responses with LRU eviction, per-entry TTL and an
+optional SQLite backing store so hits survive restarts.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 300, path: Optional[str] = None,
+                 disabled_types: Iterable[str] = ("exact_match", "prefix_match", "fuzzy_match")):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_entries: Maximum number of responses kept in memory
+            ttl: Default time in seconds before a cached response expires
+            path: Optional SQLite database file used as a persistent backing store
+            disabled_types: Command types that are never cached (command handlers
+                usually have side effects, so only conversation is cached by default)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disabled_types = set(disabled_types)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._open_store(path)
+
+    def _open_store(self, path: str):
+        """Open (or create) the SQLite backing store."""
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+            self._db.commit()
+            logger.info("Response cache backed by %s", path)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open response cache store: {e}")
+            self._db = None
+
+    def is_enabled_for(self, command_type: str) -> bool:
+        """Whether responses of the given command type may be cached."""
+        return command_type not in self.disabled_types
+
+    @staticmethod
+    def make_key(input_text: str, context: List[Dict], session: Optional[str] = None,
+                 summary: Sequence[str] = (), recalled: Sequence[Dict] = ()) -> str:
+        """
+        Build a cache key from normalized input and everything the reply depends on.
+
+        Args:
+            input_text: User input
+            context: Recent turns sent verbatim
+            session: Session id, so one session's answers never reach another (None is local)
+            summary: Rolling summary lines of earlier turns
+            recalled: Earlier turns recalled into the prompt
+        """
+        digest = hashlib.sha1()
+        digest.update(" ".join(input_text.lower().split()).encode())
+        for turn in context:
+            digest.update(b"\x00")
+            digest.update(turn['user_input'].encode())
+            digest.update(b"\x01")
+            digest.update(str(turn['assistant_response']).encode())
+        if session is not None:
+            digest.update(b"\x02")
+            digest.update(session.encode())
+        for line in summary:
+            digest.update(b"\x03")
+            digest.update(line.encode())
+        for turn in recalled:
+            digest.update(b"\x04")
+            digest.update(turn['user_input'].encode())
+            digest.update(b"\x01")
+            digest.update(str(turn['assistant_response']).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, expires FROM responses WHERE key = ? AND expires > ?",
+                    (key, now)
+                ).fetchone()
+                if row is not None:
+                    self._insert(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str, ttl: Optional[float] = None):
+        """Cache a response."""
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._insert(key, response, expires)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, response, expires) VALUES (?, ?, ?)",
+                        (key, response, expires)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to persist cached response: {e}")
+
+    def _insert(self, key: str, response: str, expires: float):
+        """Insert into the in-memory LRU, evicting the least recently used entry if full."""
+        self._entries[key] = (response, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every cached response, including the persistent store."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def get_stats_summary(self) -> str:
+        """Get a human-readable summary of the cache counters."""
+        stats = self.stats()
+        return (f"Response cache: {stats['entries']}/{self.max_entries} entries, "
+                f"{stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evictions")
@@ -4,51 +4,167 @@ Handles conversation history and context-aware command processing.
 """
 
 import logging
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Deque, List, Dict, Optional
+from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+class Turn:
+    """A single conversation turn, stored compactly."""
+    __slots__ = ('user_input', 'assistant_response', 'command_type', 'created', 'wall_time',
+                 'seq', 'tokens')
+
+    def __init__(self, user_input: str, assistant_response: str, command_type: Optional[str] = None,
+                 seq: int = 0):
+        self.user_input = user_input
+        self.assistant_response = assistant_response
+        self.command_type = command_type
+        # Increasing id within a session, used to track which turns were summarized
+        self.seq = seq
+        # Prompt token estimate, filled in on first use by the prompt builder
+        self.tokens: Optional[int] = None
+        # Monotonic clock for expiry; wall clock only for display
+        self.created = time.monotonic()
+        self.wall_time = time.time()
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.wall_time)
+
+    def __getitem__(self, key: str):
+        # Dict-style access keeps callers written against the old turn dicts working
+        if key not in ('timestamp', 'user_input', 'assistant_response', 'command_type'):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict:
+        return {
+            'timestamp': self.timestamp,
+            'user_input': self.user_input,
+            'assistant_response': self.assistant_response,
+            'command_type': self.command_type
+        }
+
+    def __repr__(self) -> str:
+        return f"Turn({self.user_input!r} -> {self.assistant_response!r}, {self.command_type!r})"
+
 class ContextManager:
-    def __init__(self, max_history: int = 10, context_timeout: int = 300):
+    def __init__(self, max_history: int = 10, context_timeout: int = 300, store=None):
         """
         Initialize the context manager.
         
         Args:
             max_history: Maximum number of conversation turns to remember
             context_timeout: Time in seconds before context expires
+            store: Optional ConversationStore that persists turns and restores them on startup
         """
-        self.conversation_history: List[Dict] = []
-        self.max_history = max_history
+        # Bounded deque acts as a ring buffer: appends evict the oldest turn in O(1)
+        self.conversation_history: Deque[Turn] = deque(maxlen=max_history)
         self.context_timeout = context_timeout
         self.current_context: Optional[Dict] = None
+        self.store = store
+        self.recall = None
+        self._next_seq = 1
+        # Voice, REPL and server threads share context managers; the lock keeps
+        # sequence numbers, history, recall and the store in step
+        self._lock = threading.RLock()
+        if store is not None:
+            self._restore()
+
+    def _restore(self):
+        """Reload the recent window from the store, keeping each turn's age for expiry."""
+        now_wall, now_monotonic = time.time(), time.monotonic()
+        for seq, wall_time, user_input, assistant_response, command_type in \
+                self.store.load_recent(self.max_history):
+            turn = Turn(user_input, assistant_response, command_type, seq)
+            turn.wall_time = wall_time
+            turn.created = now_monotonic - (now_wall - wall_time)
+            self.conversation_history.append(turn)
+        self._next_seq = self.store.last_seq + 1
+        logger.debug("Restored %d turns from %s", len(self.conversation_history), self.store.directory)
+
+    def enable_recall(self, index, restore: int = 10000):
+        """
+        Index turns for semantic recall from now on.
+
+        Args:
+            index: SemanticIndex that receives every new turn
+            restore: Turns to index up front from the store, beyond the in-memory window
+        """
+        with self._lock:
+            if self.recall is not None:
+                return
+            turns = list(self.conversation_history)
+            if self.store is not None and restore > len(turns):
+                first_seq = turns[0].seq if turns else self._next_seq
+                older = []
+                for seq, wall_time, user_input, assistant_response, command_type in \
+                        self.store.load_recent(restore):
+                    if seq < first_seq:
+                        turn = Turn(user_input, assistant_response, command_type, seq)
+                        turn.wall_time = wall_time
+                        older.append(turn)
+                turns = older + turns
+            index.add_many(turns)
+            self.recall = index
+        logger.debug("Semantic recall enabled over %d turns", len(index))
+
+    @property
+    def max_history(self) -> int:
+        return self.conversation_history.maxlen
+
+    @max_history.setter
+    def max_history(self, value: int):
+        with self._lock:
+            self.conversation_history = deque(self.conversation_history, maxlen=value)
         
     def add_turn(self, user_input: str, assistant_response: str, command_type: str = None):
         """Add a conversation turn to the history."""
-        turn = {
-            'timestamp': datetime.now(),
-            'user_input': user_input,
-            'assistant_response': assistant_response,
-            'command_type': command_type
-        }
-        self.conversation_history.append(turn)
-        
-        # Trim history if it exceeds max_history
-        if len(self.conversation_history) > self.max_history:
-            self.conversation_history.pop(0)
-            
-        logger.debug(f"Added conversation turn: {turn}")
+        with self._lock:
+            turn = Turn(user_input, assistant_response, command_type, self._next_seq)
+            self._next_seq += 1
+            self.conversation_history.append(turn)
+            if self.recall is not None:
+                self.recall.add(turn)
+            if self.store is not None:
+                # Queued for the store's writer thread; never waits on disk
+                self.store.append(user_input, assistant_response, command_type, turn.wall_time)
+        logger.debug("Added conversation turn: %r", turn)
         
-    def get_recent_context(self, n_turns: int = 3) -> List[Dict]:
+    def get_recent_context(self, n_turns: int = 3) -> List[Turn]:
         """Get the most recent conversation turns."""
-        # Filter out expired context
-        self._clean_expired_context()
-        return self.conversation_history[-n_turns:] if self.conversation_history else []
+        if n_turns <= 0:
+            return []
+        with self._lock:
+            # Filter out expired context
+            self._clean_expired_context()
+            recent = list(islice(reversed(self.conversation_history), n_turns))
+        recent.reverse()
+        return recent
+        
+    def get_relevant_context(self, query: str, n_turns: int = 3,
+                             exclude: Optional[List[Turn]] = None) -> List[Turn]:
+        """Get earlier turns most similar to a query, skipping those in exclude."""
+        if self.recall is None or n_turns <= 0:
+            return []
+        skip = [turn.seq for turn in exclude] if exclude else ()
+        return [turn for _, turn in self.recall.search(query, n_turns, skip)]
         
     def set_current_context(self, context: Dict):
         """Set the current context for the conversation."""
-        self.current_context = context
-        logger.debug(f"Set current context: {context}")
+        with self._lock:
+            self.current_context = context
+        logger.debug("Set current context: %s", context)
         
     def get_current_context(self) -> Optional[Dict]:
         """Get the current context."""
@@ -56,16 +172,17 @@ class ContextManager:
         
     def clear_context(self):
         """Clear the current context."""
-        self.current_context = None
+        with self._lock:
+            self.current_context = None
         logger.debug("Cleared current context")
         
     def _clean_expired_context(self):
-        """Remove expired conversation turns."""
-        now = datetime.now()
-        self.conversation_history = [
-            turn for turn in self.conversation_history
-            if now - turn['timestamp'] < timedelta(seconds=self.context_timeout)
-        ]
+        """Remove expired conversation turns from the old end of the buffer. Caller holds the lock."""
+        history = self.conversation_history
+        cutoff = time.monotonic() - self.context_timeout
+        # Turns are in creation order, so expiry stops at the first live turn
+        while history and history[0].created <= cutoff:
+            history.popleft()
         
     def get_context_summary(self) -> str:
         """Get a summary of the current conversation context."""
@@ -81,4 +198,9 @@ class ContextManager:
         if self.current_context:
             summary += f"\nCurrent context: {self.current_context}"
             
-        return summary 
\ No newline at end of file
+        return summary
+
+    def close(self):
+        """Flush and close the persistent store, if any."""
+        if self.store is not None:
+            self.store.close()
@@ -4,14 +4,36 @@ Handles natural language conversations using OpenRouter's API.
 """
 
 import os
+import asyncio
 import logging
+import threading
+import time
 import requests
-import json
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
+from commands.llm_client import OpenRouterClient, AsyncOpenRouterClient, DEFAULT_API_URL
+from commands.gateway import LLMGateway, CircuitOpenError, RateLimitedError
+from commands.prompt import PromptBuilder
+from commands.router import ModelRouter, Route, load_routes
 
 logger = logging.getLogger(__name__)
 
+CONNECTION_ERROR_MESSAGE = "I'm having trouble connecting to my language processing service. Please check your internet connection."
+TIMEOUT_MESSAGE = "The request to my language processing service timed out. Please try again."
+SERVICE_ERROR_MESSAGE = "I'm having trouble connecting to my language processing service."
+PROCESSING_ERROR_MESSAGE = "I apologize, but I'm having trouble processing that request."
+UNAVAILABLE_MESSAGE = "My language processing service is unavailable at the moment. I'll try again shortly."
+BUSY_MESSAGE = "I'm handling too many requests right now. Please try again in a moment."
+
+class StreamInterrupted(Exception):
+    """Raised by stream_response when the reply broke off after some of it was yielded."""
+
 class ConversationHandler:
+    # Canned replies returned on failure; these must never be cached
+    FALLBACK_MESSAGES = frozenset({
+        CONNECTION_ERROR_MESSAGE, TIMEOUT_MESSAGE, SERVICE_ERROR_MESSAGE, PROCESSING_ERROR_MESSAGE,
+        UNAVAILABLE_MESSAGE, BUSY_MESSAGE
+    })
+
     def __init__(self):
         """Initialize the conversation handler."""
         self.api_key = os.getenv('OPENROUTER_API_KEY')
@@ -19,67 +41,175 @@ class ConversationHandler:
             logger.error("OPENROUTER_API_KEY not found in environment variables")
             raise ValueError("OPENROUTER_API_KEY not found")
             
-        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.api_url = os.getenv('OPENROUTER_API_URL', DEFAULT_API_URL)
+        self.streaming = os.getenv('JARVIS_STREAM', '1') != '0'
+        timeout = float(os.getenv('JARVIS_LLM_TIMEOUT', '10'))
+        # Keep-alive connections for the blocking client; raise it when many threads share the handler
+        self.client = OpenRouterClient(self.api_key, self.api_url, timeout=timeout,
+                                       pool_size=int(os.getenv('JARVIS_LLM_POOL_SIZE', '4')))
+        # Model and max_tokens per request tier; a failed request counts as a full timeout
+        self.router = ModelRouter(load_routes(os.getenv('JARVIS_MODEL_ROUTES')), failure_penalty=timeout)
+        self.async_client = AsyncOpenRouterClient(self.api_key, self.api_url, timeout=timeout)
+        hedge_ms = float(os.getenv('JARVIS_LLM_HEDGE_MS', '0'))
+        # Both clients go through one gateway so they share the rate limit and the breaker
+        self.gateway = LLMGateway(
+            self.client,
+            rate=float(os.getenv('JARVIS_LLM_RATE', '0')),
+            burst=float(os.getenv('JARVIS_LLM_BURST')) if os.getenv('JARVIS_LLM_BURST') else None,
+            retries=int(os.getenv('JARVIS_LLM_RETRIES', '2')),
+            hedge_after=hedge_ms / 1000 if hedge_ms > 0 else None,
+            failure_threshold=int(os.getenv('JARVIS_LLM_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.getenv('JARVIS_LLM_BREAKER_RESET', '30')),
+            async_client=self.async_client
+        )
+        self.prompt_budget = int(os.getenv('JARVIS_PROMPT_BUDGET', '1024'))
+        self.prompt_builder = PromptBuilder(budget=self.prompt_budget)
+        # Rolling summaries describe one conversation, so each remote session gets its own
+        self._session_builders: Dict[str, PromptBuilder] = {}
+        self._builders_lock = threading.Lock()
         self.system_prompt = """You are J.A.R.V.I.S., a sophisticated AI assistant inspired by Iron Man's AI.
 Your responses should be helpful, direct, and slightly witty - similar to the J.A.R.V.I.S. from Iron Man.
 You can engage in natural conversation while also helping with tasks."""
-        
-    def get_response(self, user_input: str, conversation_history: List[Dict]) -> str:
-        """Get a response from OpenRouter using conversation context."""
-        try:
-            # Convert conversation history to messages format
-            messages = [{"role": "system", "content": self.system_prompt}]
-            
-            # Add conversation history
-            for turn in conversation_history:
-                messages.append({"role": "user", "content": turn['user_input']})
-                messages.append({"role": "assistant", "content": turn['assistant_response']})
-            
-            # Add current user input
-            messages.append({"role": "user", "content": user_input})
-            
-            # Prepare the request
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://github.com/hsynrsd/jarvis-ai-assistantv2",  # Update with your repo URL
-                "X-Title": "J.A.R.V.I.S. AI Assistant",
-                "User-Agent": "J.A.R.V.I.S. AI Assistant/1.0"
-            }
-            
-            data = {
-                "model": "deepseek/deepseek-v3-base:free",
-                "messages": messages,
-                "max_tokens": 150,
-                "temperature": 0.7
-            }
-            
-            # Make request to OpenRouter API
-            logger.debug(f"Attempting to connect to OpenRouter API")
-            response = requests.post(self.api_url, headers=headers, json=data, timeout=10)
-            response.raise_for_status()
-            
-            # Parse response
-            result = response.json()
-            return result['choices'][0]['message']['content']
-            
-        except requests.exceptions.RequestException as e:
+
+    def prompt_builder_for(self, session: Optional[str] = None) -> PromptBuilder:
+        """Prompt builder for a session id (None is the local session)."""
+        if session is None:
+            return self.prompt_builder
+        with self._builders_lock:
+            builder = self._session_builders.get(session)
+            if builder is None:
+                builder = self._session_builders[session] = PromptBuilder(budget=self.prompt_budget)
+            return builder
+
+    def drop_session(self, session: str):
+        """Forget a session's rolling summary."""
+        with self._builders_lock:
+            self._session_builders.pop(session, None)
+
+    def _build_payload(self, user_input: str, conversation_history: List[Dict], route: Route,
+                       recalled: Optional[List[Dict]] = None, session: Optional[str] = None) -> Dict:
+        """Prepare the request body for OpenRouter, merging recalled earlier turns into the prompt."""
+        builder = self.prompt_builder_for(session)
+        return {
+            "model": route.model,
+            "messages": builder.build(self.system_prompt, conversation_history, user_input, recalled),
+            "max_tokens": route.max_tokens,
+            "temperature": 0.7
+        }
+
+    def _record(self, route: Route, start: float, error: Optional[Exception] = None):
+        """Feed a request's latency back to the router; skipped calls say nothing about the model."""
+        if isinstance(error, (CircuitOpenError, RateLimitedError)):
+            return
+        self.router.record(route, time.perf_counter() - start, ok=error is None)
+
+    def _error_message(self, e: Exception) -> str:
+        """Map a request failure to a user-facing message."""
+        if isinstance(e, CircuitOpenError):
+            logger.warning("LLM request skipped: circuit open")
+            return UNAVAILABLE_MESSAGE
+        if isinstance(e, RateLimitedError):
+            logger.warning("LLM request skipped: rate limit")
+            return BUSY_MESSAGE
+        if isinstance(e, requests.exceptions.RequestException):
             logger.error(f"API request error: {e}")
             if isinstance(e, requests.exceptions.ConnectionError):
-                return "I'm having trouble connecting to my language processing service. Please check your internet connection."
+                return CONNECTION_ERROR_MESSAGE
             elif isinstance(e, requests.exceptions.Timeout):
-                return "The request to my language processing service timed out. Please try again."
+                return TIMEOUT_MESSAGE
             else:
-                return "I'm having trouble connecting to my language processing service."
+                return SERVICE_ERROR_MESSAGE
+        logger.error(f"Error in conversation handler: {e}")
+        return PROCESSING_ERROR_MESSAGE
+        
+    def get_response(self, user_input: str, conversation_history: List[Dict],
+                     recalled: Optional[List[Dict]] = None, session: Optional[str] = None) -> str:
+        """Get a response from OpenRouter using conversation context."""
+        route = self.router.route(user_input, conversation_history)
+        start = time.perf_counter()
+        try:
+            logger.debug("Attempting to connect to OpenRouter API (%s, %s)", route.tier, route.model)
+            response = self.gateway.complete(
+                self._build_payload(user_input, conversation_history, route, recalled, session))
+        except Exception as e:
+            self._record(route, start, e)
+            return self._error_message(e)
+        self._record(route, start)
+        return response
+
+    def stream_response(self, user_input: str, conversation_history: List[Dict],
+                        recalled: Optional[List[Dict]] = None, session: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield response text from OpenRouter as it is generated.
+
+        Raises:
+            StreamInterrupted: If the stream failed after text was yielded, so the
+                caller knows the reply is truncated
+        """
+        produced = False
+        route = self.router.route(user_input, conversation_history)
+        start = time.perf_counter()
+        try:
+            logger.debug("Attempting to stream from OpenRouter API (%s, %s)", route.tier, route.model)
+            payload = self._build_payload(user_input, conversation_history, route, recalled, session)
+            for chunk in self.gateway.stream(payload):
+                produced = True
+                yield chunk
         except Exception as e:
-            logger.error(f"Error in conversation handler: {e}")
-            return "I apologize, but I'm having trouble processing that request."
+            self._record(route, start, e)
+            # Keep whatever was already shown; only fall back to an error if nothing arrived
+            message = self._error_message(e)
+            if produced:
+                raise StreamInterrupted(message) from e
+            yield message
+            return
+        self._record(route, start)
+
+    def _async_error_message(self, e: Exception) -> str:
+        """Map an async request failure to a user-facing message."""
+        import aiohttp
+
+        if isinstance(e, asyncio.TimeoutError):
+            logger.error("API request timed out")
+            return TIMEOUT_MESSAGE
+        if isinstance(e, aiohttp.ClientConnectionError):
+            logger.error(f"API request error: {e}")
+            return CONNECTION_ERROR_MESSAGE
+        if isinstance(e, aiohttp.ClientError):
+            logger.error(f"API request error: {e}")
+            return SERVICE_ERROR_MESSAGE
+        return self._error_message(e)
+
+    async def get_response_async(self, user_input: str, conversation_history: List[Dict],
+                                 recalled: Optional[List[Dict]] = None, session: Optional[str] = None) -> str:
+        """Get a response from OpenRouter without blocking the event loop."""
+        route = self.router.route(user_input, conversation_history)
+        start = time.perf_counter()
+        try:
+            response = await self.gateway.complete_async(
+                self._build_payload(user_input, conversation_history, route, recalled, session))
+        except Exception as e:
+            self._record(route, start, e)
+            return self._async_error_message(e)
+        self._record(route, start)
+        return response
+
+    def close(self):
+        """Close pooled connections of both clients and the gateway's hedge pool."""
+        self.gateway.close()
+        self.client.close()
+        self.async_client.close_idle()
             
 def register_commands(jarvis):
     """Register conversation-related commands with J.A.R.V.I.S."""
     try:
         conversation_handler = ConversationHandler()
         jarvis.conversation_handler = conversation_handler
+        jarvis.register_command(
+            "prompt stats",
+            lambda _: conversation_handler.prompt_builder_for(jarvis.current_session()).get_stats_summary())
+        jarvis.register_command("llm stats", lambda _: conversation_handler.gateway.get_stats_summary())
+        jarvis.register_command("model stats", lambda _: conversation_handler.router.get_stats_summary())
         logger.info("Conversation handler registered with OpenRouter")
     except Exception as e:
         logger.error(f"Failed to register conversation handler: {e}") 
\ No newline at end of file
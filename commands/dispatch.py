@@ -0,0 +1,100 @@
+"""
+Command dispatch module for J.A.R.V.I.S.
+Provides a token-level trie for longest-prefix command matching.
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class _TrieNode:
+    __slots__ = ('children', 'command', 'handler')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.command: Optional[str] = None
+        self.handler: Optional[Callable] = None
+
+class CommandTrie:
+    def __init__(self):
+        """Initialize an empty command trie."""
+        self._root = _TrieNode()
+        self._size = 0
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Split text into the tokens used as trie edges."""
+        return text.lower().split()
+
+    def insert(self, command: str, handler: Callable):
+        """Insert or replace a command handler."""
+        tokens = self.tokenize(command)
+        if not tokens:
+            raise ValueError("Command must contain at least one token")
+
+        node = self._root
+        for token in tokens:
+            child = node.children.get(token)
+            if child is None:
+                child = node.children[token] = _TrieNode()
+            node = child
+
+        if node.handler is None:
+            self._size += 1
+        node.command = " ".join(tokens)
+        node.handler = handler
+
+    def remove(self, command: str) -> bool:
+        """Remove a command, pruning empty branches. Returns True if it existed."""
+        tokens = self.tokenize(command)
+        path = [self._root]
+        node = self._root
+        for token in tokens:
+            node = node.children.get(token)
+            if node is None:
+                return False
+            path.append(node)
+
+        if node.handler is None:
+            return False
+
+        node.handler = None
+        node.command = None
+        self._size -= 1
+
+        # Prune nodes that no longer lead to any command
+        for depth in range(len(tokens), 0, -1):
+            child = path[depth]
+            if child.handler is not None or child.children:
+                break
+            del path[depth - 1].children[tokens[depth - 1]]
+        return True
+
+    def longest_prefix(self, tokens: List[str]) -> Optional[Tuple[str, Callable, int]]:
+        """
+        Find the longest registered command that prefixes the given tokens.
+
+        Returns:
+            (command, handler, number of tokens consumed), or None if nothing matches
+        """
+        node = self._root
+        best = None
+        for depth, token in enumerate(tokens, 1):
+            node = node.children.get(token)
+            if node is None:
+                break
+            if node.handler is not None:
+                best = (node.command, node.handler, depth)
+        return best
+
+    def __contains__(self, command: str) -> bool:
+        node = self._root
+        for token in self.tokenize(command):
+            node = node.children.get(token)
+            if node is None:
+                return False
+        return node.handler is not None
+
+    def __len__(self) -> int:
+        return self._size
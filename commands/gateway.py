@@ -0,0 +1,536 @@
+"""
+Resilient LLM gateway for J.A.R.V.I.S.
+Sits between the conversation handler and the OpenRouter client:
+identical in-flight prompts share one upstream call, a token bucket keeps
+request rates within the provider's quota, transient failures are retried
+with jittered backoff (optionally hedging slow calls), and a circuit breaker
+fails fast while the upstream is unhealthy. Blocking and asyncio callers
+share one rate limit and one breaker.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from commands.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+class GatewayError(Exception):
+    """Base class for requests the gateway refused to send."""
+
+class CircuitOpenError(GatewayError):
+    """The upstream has been failing; calls are rejected until the breaker's cool-down ends."""
+
+class RateLimitedError(GatewayError):
+    """No rate limit token became available in time."""
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize a token bucket.
+
+        Args:
+            rate: Tokens added per second (0 disables limiting)
+            burst: Bucket size, i.e. requests allowed back to back (default max(1, rate))
+        """
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available. Returns 0 on success, else seconds until one will be."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a token is available. Returns False if timeout passes first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining < delay:
+                    return False
+            time.sleep(delay)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """acquire() for event loop callers; waits without blocking the loop."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining < delay:
+                    return False
+            await asyncio.sleep(delay)
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize a circuit breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to stay open before letting one trial call through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now. In half-open state only one trial call is allowed."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def release(self):
+        """Give back a call slot that was allowed but never sent."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuit closed: upstream recovered")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("Circuit opened after %d failures", self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+class _Flight:
+    __slots__ = ('chunks', 'done', 'error', 'condition')
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.condition = threading.Condition()
+
+class SingleFlight:
+    def __init__(self):
+        """Share one in-progress call among concurrent callers with the same key."""
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def stream(self, key: str, produce: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Yield the chunks of produce(); callers that join while it runs replay
+        what was already produced and then follow along live.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if leader:
+            return self._lead(key, flight, produce)
+        return self._follow(flight)
+
+    def _lead(self, key: str, flight: _Flight, produce: Callable[[], Iterator[str]]) -> Iterator[str]:
+        chunks = None
+        try:
+            chunks = produce()
+            for chunk in chunks:
+                with flight.condition:
+                    flight.chunks.append(chunk)
+                    flight.condition.notify_all()
+                yield chunk
+        except GeneratorExit:
+            # The leader's caller stopped reading; followers cannot get the rest
+            flight.error = GatewayError("shared request was abandoned")
+            raise
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # Close the upstream generator now, not whenever it is garbage collected
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+            with self._lock:
+                self._flights.pop(key, None)
+            with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    @staticmethod
+    def _follow(flight: _Flight) -> Iterator[str]:
+        position = 0
+        while True:
+            with flight.condition:
+                while position == len(flight.chunks) and not flight.done:
+                    flight.condition.wait()
+                chunks = flight.chunks[position:]
+                finished = flight.done
+                error = flight.error
+            for chunk in chunks:
+                yield chunk
+            position += len(chunks)
+            if finished and position == len(flight.chunks):
+                if error is not None:
+                    raise error
+                return
+
+    def call(self, key: str, produce: Callable[[], str]) -> str:
+        """Return produce(), sharing the result with concurrent callers of the same key."""
+        return "".join(self.stream(key, lambda: iter((produce(),))))
+
+def retryable(error: BaseException) -> bool:
+    """Connection problems, timeouts, rate limiting and server errors are worth retrying."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          asyncio.TimeoutError)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    # Only the async client loads aiohttp, so its errors are checked without importing it
+    aiohttp = sys.modules.get('aiohttp')
+    if aiohttp is not None:
+        if isinstance(error, aiohttp.ClientConnectionError):
+            return True
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status == 429 or error.status >= 500
+    return False
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait, from a Retry-After header."""
+    response = getattr(error, 'response', None)
+    # requests errors carry the response; aiohttp errors carry its headers
+    headers = response.headers if response is not None else getattr(error, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+class LLMGateway:
+    def __init__(self, client, rate: float = 0.0, burst: Optional[float] = None,
+                 retries: int = 2, backoff: float = 0.2, max_backoff: float = 2.0,
+                 hedge_after: Optional[float] = None, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0, queue_timeout: float = 5.0, async_client=None):
+        """
+        Initialize the gateway.
+
+        Args:
+            client: OpenRouterClient (or anything with complete/stream taking a payload)
+            rate: Upstream requests per second allowed (0 for no limit)
+            burst: Requests allowed back to back (default max(1, rate))
+            retries: Extra attempts after a retryable failure
+            backoff: Base of the exponential backoff in seconds; each wait is drawn
+                uniformly from [0, min(max_backoff, backoff * 2**attempt)]
+            max_backoff: Upper bound for a single backoff wait
+            hedge_after: Seconds without a reply before a duplicate request is sent and the
+                first answer wins (None disables hedging; only non-streaming calls hedge)
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial call
+            queue_timeout: Longest wait for a rate limit token before giving up
+            async_client: AsyncOpenRouterClient (or anything with a coroutine complete
+                taking a payload) used by complete_async
+        """
+        self.client = client
+        self.async_client = async_client
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.flights = SingleFlight()
+        # Shared calls of complete_async, per event loop since tasks cannot cross loops
+        self._async_flights: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.queue_timeout = queue_timeout
+        # Threads start on first submit, so the pool costs nothing when hedging is off
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+        self._counts = {'requests': 0, 'upstream': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0,
+                        'failures': 0, 'rejected_open': 0, 'rate_limited': 0, 'coalesced': 0}
+        self._counts_lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._counts_lock:
+            self._counts[name] += amount
+
+    @staticmethod
+    def payload_key(payload: Dict) -> str:
+        return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self._count('rejected_open')
+            raise CircuitOpenError("upstream circuit is open")
+
+    def _rate_limited(self):
+        self._count('rate_limited')
+        # This may have been the breaker's trial call; it never went out
+        self.breaker.release()
+        raise RateLimitedError("rate limit wait exceeded")
+
+    def _admit(self):
+        """Check the breaker and take a rate limit token, or raise."""
+        self._check_breaker()
+        if not self.limiter.acquire(self.queue_timeout):
+            self._rate_limited()
+        self._count('upstream')
+
+    async def _admit_async(self):
+        """_admit() for event loop callers."""
+        self._check_breaker()
+        if not await self.limiter.acquire_async(self.queue_timeout):
+            self._rate_limited()
+        self._count('upstream')
+
+    def _record_failure(self, error: BaseException):
+        self._count('failures')
+        if retryable(error):
+            self.breaker.record_failure()
+        else:
+            # A 4xx means the upstream is answering; the request itself was bad
+            self.breaker.record_success()
+
+    def _retry_delay(self, attempt: int, error: BaseException) -> float:
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        requested = retry_after(error)
+        if requested is not None:
+            delay = max(delay, min(requested, self.max_backoff))
+        self._count('retries')
+        logger.info("Retrying LLM request in %.2fs after: %s", delay, error)
+        return delay
+
+    def _wait_before_retry(self, attempt: int, error: BaseException):
+        time.sleep(self._retry_delay(attempt, error))
+
+    def _attempt_complete(self, payload: Dict) -> str:
+        self._admit()
+        try:
+            with METRICS.span("gateway.attempt"):
+                result = self.client.complete(payload)
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _hedged_complete(self, payload: Dict) -> str:
+        """Send one request, and a second if the first is slower than hedge_after."""
+        primary = self._hedge_pool.submit(self._attempt_complete, payload)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+        self._count('hedges')
+        try:
+            hedge = self._hedge_pool.submit(self._attempt_complete, payload)
+        except RuntimeError:
+            return primary.result()
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _complete(self, payload: Dict) -> str:
+        attempt = 0
+        while True:
+            try:
+                if self.hedge_after is not None:
+                    return self._hedged_complete(payload)
+                return self._attempt_complete(payload)
+            except GatewayError:
+                raise
+            except Exception as e:
+                if attempt >= self.retries or not retryable(e):
+                    raise
+                self._wait_before_retry(attempt, e)
+                attempt += 1
+
+    def complete(self, payload: Dict) -> str:
+        """Non-streaming completion through coalescing, rate limiting, retries and the breaker."""
+        self._count('requests')
+        return self.flights.call("complete:" + self.payload_key(payload), lambda: self._complete(payload))
+
+    async def _attempt_complete_async(self, payload: Dict) -> str:
+        await self._admit_async()
+        try:
+            with METRICS.span("gateway.attempt"):
+                result = await self.async_client.complete(payload)
+        except asyncio.CancelledError:
+            # A hedge lost or the caller gave up; the reply says nothing about the upstream
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _hedged_complete_async(self, payload: Dict) -> str:
+        """_hedged_complete() for event loop callers; the losing request is cancelled."""
+        primary = asyncio.ensure_future(self._attempt_complete_async(payload))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+            if done:
+                return primary.result()
+            self._count('hedges')
+            hedge = asyncio.ensure_future(self._attempt_complete_async(payload))
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count('hedge_wins')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _complete_async(self, payload: Dict) -> str:
+        attempt = 0
+        while True:
+            try:
+                if self.hedge_after is not None:
+                    return await self._hedged_complete_async(payload)
+                return await self._attempt_complete_async(payload)
+            except GatewayError:
+                raise
+            except Exception as e:
+                if attempt >= self.retries or not retryable(e):
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt, e))
+                attempt += 1
+
+    async def complete_async(self, payload: Dict) -> str:
+        """complete() for event loop callers, through the same rate limit, breaker and retry policy."""
+        self._count('requests')
+        key = (asyncio.get_running_loop(), "complete:" + self.payload_key(payload))
+        flight = self._async_flights.get(key)
+        if flight is None:
+            flight = self._async_flights[key] = asyncio.ensure_future(self._complete_async(payload))
+            flight.add_done_callback(lambda _: self._async_flights.pop(key, None))
+        else:
+            self._count('coalesced')
+        # A caller that is cancelled must not cancel the call others are waiting on
+        return await asyncio.shield(flight)
+
+    def _stream(self, payload: Dict) -> Iterator[str]:
+        attempt = 0
+        while True:
+            produced = False
+            self._admit()
+            try:
+                for chunk in self.client.stream(payload):
+                    produced = True
+                    yield chunk
+                self.breaker.record_success()
+                return
+            except GatewayError:
+                raise
+            except Exception as e:
+                self._record_failure(e)
+                # Once text has been shown it cannot be taken back, so only retry silent failures
+                if produced or attempt >= self.retries or not retryable(e):
+                    raise
+                self._wait_before_retry(attempt, e)
+                attempt += 1
+            except BaseException:
+                # The consumer stopped reading (closed stream, Ctrl-C). Tokens mean the upstream
+                # answered; otherwise hand back the slot, which may be the breaker's only trial
+                if produced:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.release()
+                raise
+
+    def stream(self, payload: Dict) -> Iterator[str]:
+        """Streaming completion; identical concurrent prompts share one upstream stream."""
+        self._count('requests')
+        return self.flights.stream("stream:" + self.payload_key(payload), lambda: self._stream(payload))
+
+    def stats(self) -> Dict:
+        with self._counts_lock:
+            counts = dict(self._counts)
+        counts['coalesced'] += self.flights.coalesced
+        counts['circuit'] = self.breaker.state
+        return counts
+
+    def get_stats_summary(self) -> str:
+        """Get a human-readable summary of gateway activity."""
+        stats = self.stats()
+        return (f"LLM gateway: {stats['requests']} requests, {stats['upstream']} sent upstream, "
+                f"{stats['coalesced']} coalesced, {stats['retries']} retries, "
+                f"{stats['hedges']} hedges ({stats['hedge_wins']} won), {stats['failures']} failures, "
+                f"{stats['rejected_open']} rejected while open, {stats['rate_limited']} rate limited. "
+                f"Circuit {stats['circuit']}")
+
+    def close(self):
+        self._hedge_pool.shutdown(wait=False)
@@ -0,0 +1,202 @@
+"""
+Fuzzy intent matching for J.A.R.V.I.S.
+Matches inputs that miss the command trie, typically voice transcripts such as
+"opened google.com" or "please browse github", against a character-trigram
+index of the registered commands and their aliases. Leading filler words are
+dropped and inflections are stemmed, so most near misses score highly without
+a round trip to the language model.
+"""
+
+import logging
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Politeness and wake phrases that precede the actual command, longest first
+LEADING_FILLERS = tuple(tuple(phrase.split()) for phrase in sorted("""
+hey jarvis|ok jarvis|okay jarvis|jarvis|please|can you|could you|would you|will you|can you please|
+could you please|i want to|i'd like to|i would like to|let's|lets|just|hey|ok|okay|now|go ahead and
+""".replace("\n", "").split("|"), key=lambda phrase: -len(phrase.split())) if phrase)
+
+TRAILING_FILLERS = frozenset(("please", "thanks", "now", "jarvis"))
+
+# Ignored when comparing a prefix with a command ("clear the cache" -> "clear cache")
+ARTICLES = frozenset(("the", "a", "an", "my", "some"))
+
+# Stripped from token edges; dots inside tokens are kept for domains like github.com
+PUNCTUATION = ".,!?;:'\"()[]"
+
+@lru_cache(maxsize=16384)
+def _stem(word: str) -> str:
+    """Crude suffix stripping so "opened" and "opens" both become "open"."""
+    if "." in word or not word.isalpha():
+        return word
+    # "-ing" is left alone: recognizers rarely produce it for a command, while
+    # "opening hours" or "speaking of which" are ordinary conversation
+    for suffix in ("ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            if suffix == "ed" and word[-1] == word[-2] and word[-1] not in "ls":
+                # "stopped" -> "stop"
+                word = word[:-1]
+            break
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+def _grams(text: str) -> Set[str]:
+    # Only the start is padded: transcription errors mostly garble word endings
+    # ("brows", "browser"), so shared beginnings should count for more
+    padded = f"#{text}"
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+class IntentMatch(NamedTuple):
+    command: str
+    args: str
+    score: float
+    phrase: str
+
+class IntentIndex:
+    def __init__(self, threshold: float = 0.8):
+        """
+        Initialize an empty intent index.
+
+        Args:
+            threshold: Minimum Dice similarity of trigram sets for a fuzzy match
+                (1.0 still allows filler removal, stemming and aliases)
+        """
+        self.threshold = threshold
+        # Stemmed phrase -> (command, number of distinct trigrams)
+        self._phrases: Dict[str, Tuple[str, int]] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._commands: Dict[str, List[str]] = {}
+        self._takes_args: Dict[str, bool] = {}
+        self._arg_patterns: Dict[str, "re.Pattern"] = {}
+        self._max_words = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: str) -> List[str]:
+        """Lowercase, strip edge punctuation and drop leading/trailing filler words."""
+        tokens = [token.strip(PUNCTUATION) for token in text.lower().split()]
+        tokens = [token for token in tokens if token]
+        start = 0
+        stripped = True
+        while stripped:
+            stripped = False
+            for filler in LEADING_FILLERS:
+                if tuple(tokens[start:start + len(filler)]) == filler and start + len(filler) < len(tokens):
+                    start += len(filler)
+                    stripped = True
+                    break
+        end = len(tokens)
+        while end - start > 1 and tokens[end - 1] in TRAILING_FILLERS:
+            end -= 1
+        return tokens[start:end]
+
+    @staticmethod
+    def _key(tokens: Iterable[str]) -> str:
+        return " ".join(_stem(token) for token in tokens if token not in ARTICLES)
+
+    def add(self, command: str, aliases: Iterable[str] = (), takes_args: bool = False,
+            argument_pattern: Optional[str] = None):
+        """
+        Index a command and its aliases.
+
+        Adding a command again merges the aliases; it takes arguments if any
+        registration said so. A fuzzy match leaving arguments must fully match
+        argument_pattern, when one is given.
+        """
+        with self._lock:
+            phrases = self._commands.setdefault(command, [])
+            self._takes_args[command] = self._takes_args.get(command, False) or takes_args
+            if argument_pattern is not None:
+                self._arg_patterns[command] = re.compile(argument_pattern)
+            for phrase in (command, *aliases):
+                words = self.normalize(phrase)
+                key = self._key(words)
+                if not key or key in self._phrases:
+                    continue
+                grams = _grams(key)
+                self._phrases[key] = (command, len(grams))
+                for gram in grams:
+                    self._postings[gram].add(key)
+                phrases.append(key)
+                self._max_words = max(self._max_words, len(words))
+
+    def remove(self, command: str) -> bool:
+        """Forget a command and its aliases. Returns True if it was indexed."""
+        with self._lock:
+            phrases = self._commands.pop(command, None)
+            if phrases is None:
+                return False
+            self._takes_args.pop(command, None)
+            self._arg_patterns.pop(command, None)
+            for key in phrases:
+                del self._phrases[key]
+                for gram in _grams(key):
+                    postings = self._postings.get(gram)
+                    if postings is not None:
+                        postings.discard(key)
+                        if not postings:
+                            del self._postings[gram]
+            return True
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """
+        Find the command an input most likely means.
+
+        Every leading run of words is scored against the index; the rest of the
+        input becomes the argument text, which is only allowed for commands that
+        take arguments.
+
+        Returns:
+            The best match scoring at least the threshold, or None
+        """
+        tokens = self.normalize(text)
+        if not tokens:
+            return None
+        with self._lock:
+            best = self._best(tokens)
+        if best is None or best.score < self.threshold:
+            return None
+        return best
+
+    def _best(self, tokens: List[str]) -> Optional[IntentMatch]:
+        best: Optional[IntentMatch] = None
+        # Articles do not count towards a phrase's length
+        longest = min(len(tokens), self._max_words + 2)
+        for size in range(1, longest + 1):
+            if tokens[size - 1] in ARTICLES:
+                # "open the news" opens "the news", not "news"
+                continue
+            key = self._key(tokens[:size])
+            grams = _grams(key)
+            overlap: Dict[str, int] = defaultdict(int)
+            for gram in grams:
+                for phrase in self._postings.get(gram, ()):
+                    overlap[phrase] += 1
+            args = " ".join(tokens[size:])
+            for phrase, shared in overlap.items():
+                command, phrase_grams = self._phrases[phrase]
+                if args:
+                    if not self._takes_args[command]:
+                        continue
+                    pattern = self._arg_patterns.get(command)
+                    if pattern is not None and not pattern.fullmatch(args):
+                        continue
+                score = 2 * shared / (len(grams) + phrase_grams)
+                # Ties go to the longer prefix, which leaves less in the arguments
+                if best is None or score >= best.score:
+                    best = IntentMatch(command, args, score, phrase)
+        return best
+
+    def __contains__(self, command: str) -> bool:
+        return command in self._commands
+
+    def __len__(self) -> int:
+        return len(self._commands)
@@ -0,0 +1,186 @@
+"""
+OpenRouter client for J.A.R.V.I.S.
+Keeps a pooled keep-alive session and supports server-sent-event streaming.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from commands.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+def default_headers(api_key: str) -> Dict[str, str]:
+    """Headers sent with every OpenRouter request."""
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "https://github.com/hsynrsd/jarvis-ai-assistantv2",
+        "X-Title": "J.A.R.V.I.S. AI Assistant",
+        "User-Agent": "J.A.R.V.I.S. AI Assistant/1.0"
+    }
+
+def parse_sse_line(line: str) -> Optional[str]:
+    """
+    Extract the content delta from one server-sent-event line.
+
+    Returns:
+        The delta text, "" for lines without content, or None once the stream is done
+    """
+    # SSE comments (": keep-alive") and blank separators carry no data
+    if not line or not line.startswith("data:"):
+        return ""
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return None
+    choices = json.loads(data).get('choices') or []
+    if not choices:
+        return ""
+    return choices[0].get('delta', {}).get('content') or ""
+
+class OpenRouterClient:
+    def __init__(self, api_key: str, api_url: str = DEFAULT_API_URL,
+                 timeout: float = 10, pool_size: int = 4):
+        """
+        Initialize the client.
+
+        Args:
+            api_key: OpenRouter API key
+            api_url: Chat completions endpoint (point at a local stub for testing)
+            timeout: Request timeout in seconds
+            pool_size: Maximum number of pooled keep-alive connections
+        """
+        self.api_url = api_url
+        self.timeout = timeout
+        self.last_timing: Dict[str, Optional[float]] = {'ttft': None, 'total': None}
+
+        # One session for the lifetime of the client so TCP/TLS handshakes are reused
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(default_headers(api_key))
+
+    def _record_timing(self, start: float, first_token: Optional[float]):
+        """Store and log time-to-first-token and total time for a call."""
+        end = time.perf_counter()
+        self.last_timing = {
+            'ttft': (first_token - start) if first_token is not None else None,
+            'total': end - start
+        }
+        METRICS.record("llm.request", self.last_timing['total'])
+        if first_token is not None:
+            METRICS.record("llm.ttft", self.last_timing['ttft'])
+        if first_token is None:
+            logger.info("OpenRouter call: no tokens, total=%.3fs", self.last_timing['total'])
+        else:
+            logger.info("OpenRouter call: ttft=%.3fs total=%.3fs",
+                        self.last_timing['ttft'], self.last_timing['total'])
+
+    def complete(self, payload: Dict) -> str:
+        """Send a non-streaming completion request and return the message text."""
+        start = time.perf_counter()
+        response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        # Without streaming the first token arrives with the whole body
+        self._record_timing(start, time.perf_counter())
+        return result['choices'][0]['message']['content']
+
+    def stream(self, payload: Dict) -> Iterator[str]:
+        """Send a streaming completion request and yield content deltas as they arrive."""
+        start = time.perf_counter()
+        first_token = None
+        payload = dict(payload, stream=True)
+        with self.session.post(self.api_url, json=payload, timeout=self.timeout,
+                               stream=True) as response:
+            response.raise_for_status()
+            # SSE is always UTF-8; without a charset requests would decode it as ISO-8859-1
+            response.encoding = 'utf-8'
+            for line in response.iter_lines(decode_unicode=True):
+                delta = parse_sse_line(line)
+                if delta is None:
+                    break
+                if delta:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    yield delta
+        self._record_timing(start, first_token)
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+class AsyncOpenRouterClient:
+    def __init__(self, api_key: str, api_url: str = DEFAULT_API_URL,
+                 timeout: float = 10, pool_size: int = 100):
+        """
+        Initialize the asyncio client.
+
+        Args:
+            api_key: OpenRouter API key
+            api_url: Chat completions endpoint (point at a local stub for testing)
+            timeout: Request timeout in seconds
+            pool_size: Maximum number of concurrent pooled connections
+        """
+        self.api_key = api_key
+        self.api_url = api_url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        # aiohttp sessions are bound to the loop they were created in, so keep one per loop
+        self._sessions: Dict[asyncio.AbstractEventLoop, Tuple[object, AsyncIterator]] = {}
+
+    async def _get_session(self):
+        """Return the running loop's aiohttp session, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(loop)
+        if entry is None or entry[0].closed:
+            import aiohttp
+            session = aiohttp.ClientSession(
+                headers=default_headers(self.api_key),
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            # asyncio.run() finalizes open async generators before closing its loop,
+            # so this closes the session while its connections' loop is still alive
+            lifetime = self._lifetime(loop, session)
+            await lifetime.__anext__()
+            entry = self._sessions[loop] = (session, lifetime)
+        return entry[0]
+
+    async def _lifetime(self, loop: asyncio.AbstractEventLoop, session) -> AsyncIterator[None]:
+        try:
+            yield
+        finally:
+            if self._sessions.get(loop, (None,))[0] is session:
+                del self._sessions[loop]
+            await session.close()
+
+    async def complete(self, payload: Dict) -> str:
+        """Send a non-streaming completion request and return the message text."""
+        with METRICS.span("llm.request"):
+            session = await self._get_session()
+            async with session.post(self.api_url, json=payload) as response:
+                response.raise_for_status()
+                result = await response.json()
+        return result['choices'][0]['message']['content']
+
+    async def close(self):
+        """Close the running loop's pooled connections."""
+        entry = self._sessions.get(asyncio.get_running_loop())
+        if entry is not None:
+            await entry[1].aclose()
+
+    def close_idle(self):
+        """Close sessions of loops that are not running, from outside any event loop."""
+        for loop, (_, lifetime) in list(self._sessions.items()):
+            if not loop.is_closed() and not loop.is_running():
+                loop.run_until_complete(lifetime.aclose())
@@ -0,0 +1,142 @@
+"""
+Latency instrumentation for J.A.R.V.I.S.
+Records timing spans into fixed-memory log-bucketed histograms and reports
+p50/p95/p99 per stage.
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    # Buckets grow by 5% from 1 us; 400 buckets reach well past 5 minutes
+    MIN_VALUE = 1e-6
+    GROWTH = 1.05
+    BUCKETS = 400
+
+    __slots__ = ('counts', 'count', 'total', 'minimum', 'maximum')
+
+    def __init__(self):
+        """Fixed-size histogram of durations in seconds."""
+        self.counts: List[int] = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = 0.0
+
+    @classmethod
+    def _bucket(cls, value: float) -> int:
+        if value <= cls.MIN_VALUE:
+            return 0
+        index = int(math.log(value / cls.MIN_VALUE, cls.GROWTH)) + 1
+        return min(index, cls.BUCKETS - 1)
+
+    def record(self, value: float):
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Approximate percentile (0-100); accurate to within one bucket (5%)."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                upper = self.MIN_VALUE * self.GROWTH ** index
+                return min(max(upper, self.minimum), self.maximum)
+        return self.maximum
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.minimum if self.count else None,
+            'max': self.maximum if self.count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+class Span:
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry: 'MetricsRegistry', name: str):
+        """Times a `with` block and records it under name."""
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class MetricsRegistry:
+    def __init__(self):
+        """Initialize an empty set of stage histograms."""
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def span(self, name: str) -> Span:
+        """Context manager that records the duration of a stage."""
+        return Span(self, name)
+
+    def record(self, name: str, seconds: float):
+        """Record one duration sample for a stage."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.record(seconds)
+
+    def get(self, name: str) -> Optional[Histogram]:
+        return self._histograms.get(name)
+
+    def snapshot(self) -> Dict:
+        """Return all stage statistics as plain data."""
+        with self._lock:
+            stages = {name: histogram.snapshot() for name, histogram in sorted(self._histograms.items())}
+        return {'started': self.started, 'taken': time.time(), 'stages': stages}
+
+    def write_snapshot(self, path: str):
+        """Write a JSON metrics snapshot to a file."""
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        logger.info("Wrote metrics snapshot to %s", path)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self.started = time.time()
+
+    def get_summary(self) -> str:
+        """Get a human-readable table of per-stage latencies."""
+        stages = self.snapshot()['stages']
+        if not stages:
+            return "No timings recorded yet."
+
+        def ms(value):
+            return f"{value * 1000:9.3f}" if value is not None else f"{'-':>9}"
+
+        lines = [f"{'stage':<20}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for name, stats in stages.items():
+            lines.append(f"{name:<20}{stats['count']:>7} {ms(stats['p50'])} {ms(stats['p95'])} {ms(stats['p99'])}")
+        return "\n".join(lines)
+
+# Process-wide registry used by all stages
+METRICS = MetricsRegistry()
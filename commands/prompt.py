@@ -0,0 +1,203 @@
+"""
+Prompt assembly for J.A.R.V.I.S.
+Builds chat messages within a token budget. Turns that no longer fit, or
+that slide out of the caller's history window, are folded into a rolling
+summary in batches, so the message prefix stays stable between requests and
+provider-side prompt caching can hit.
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Every chat message carries a few tokens of role/formatting overhead
+MESSAGE_OVERHEAD = 4
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token for English)."""
+    return MESSAGE_OVERHEAD + (len(text) + 3) // 4
+
+def turn_tokens(turn) -> int:
+    """Token estimate for a user/assistant turn, cached on the turn record."""
+    tokens = getattr(turn, 'tokens', None)
+    if tokens is None:
+        tokens = estimate_tokens(turn['user_input']) + estimate_tokens(str(turn['assistant_response']))
+        if hasattr(turn, 'tokens'):
+            turn.tokens = tokens
+    return tokens
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+class PromptBuilder:
+    def __init__(self, budget: int = 1024, summary_budget: Optional[int] = None,
+                 refill: float = 0.6):
+        """
+        Initialize the prompt builder.
+
+        Args:
+            budget: Maximum estimated prompt tokens per request
+            summary_budget: Maximum tokens spent on the rolling summary (default a quarter of budget)
+            refill: When history overflows the budget or the window, fold old turns until it
+                fills this fraction of the space (or window) left, so several following
+                requests share the same prefix
+        """
+        self.budget = budget
+        self.summary_budget = summary_budget if summary_budget is not None else budget // 4
+        self.refill = refill
+        self._summary: Deque[str] = deque()
+        # (seq, verbatim tokens) of the turn behind each summary line
+        self._summary_sources: Deque = deque()
+        self._summary_tokens = 0
+        self._folded_through = 0
+        # Unfolded turns from the last request, to fold once they leave the window
+        self._pending: Deque = deque()
+        self._lock = threading.Lock()
+        self.last_stats: Dict[str, int] = {}
+        self.requests = 0
+        self.tokens_saved = 0
+
+    def reset(self):
+        """Forget the rolling summary."""
+        with self._lock:
+            self._summary.clear()
+            self._summary_sources.clear()
+            self._summary_tokens = 0
+            self._folded_through = 0
+            self._pending.clear()
+
+    def summary_lines(self) -> Tuple[str, ...]:
+        """Current rolling summary, one line per folded turn."""
+        with self._lock:
+            return tuple(self._summary)
+
+    def _fold(self, turn):
+        """Append one turn to the rolling summary, trimming the oldest lines past its budget."""
+        line = (f"- User: {_shorten(turn['user_input'], 80)} | "
+                f"Assistant: {_shorten(turn['assistant_response'], 120)}")
+        self._summary.append(line)
+        self._summary_sources.append((getattr(turn, 'seq', 0), turn_tokens(turn)))
+        self._summary_tokens += estimate_tokens(line)
+        while self._summary_tokens > self.summary_budget and len(self._summary) > 1:
+            self._summary_tokens -= estimate_tokens(self._summary.popleft())
+            self._summary_sources.popleft()
+        self._folded_through = max(self._folded_through, getattr(turn, 'seq', 0))
+
+    def _summary_message(self) -> Optional[Dict]:
+        if not self._summary:
+            return None
+        return {"role": "system",
+                "content": "Summary of earlier conversation:\n" + "\n".join(self._summary)}
+
+    def _recall_message(self, recalled: List, room: int) -> Optional[Dict]:
+        """Format recalled turns, best first, dropping those that do not fit in room tokens."""
+        header = "Relevant earlier exchanges:"
+        lines, used = [], estimate_tokens(header)
+        for turn in recalled:
+            line = (f"- User: {_shorten(turn['user_input'], 80)} | "
+                    f"Assistant: {_shorten(turn['assistant_response'], 120)}")
+            cost = (len(line) + 4) // 4
+            if used + cost > room:
+                break
+            lines.append(line)
+            used += cost
+        if not lines:
+            return None
+        return {"role": "system", "content": "\n".join([header] + lines)}
+
+    def build(self, system_prompt: str, history: List, user_input: str,
+              recalled: Optional[List] = None) -> List[Dict]:
+        """
+        Assemble messages for a request within the token budget.
+
+        Recalled turns go just before the new input, after the verbatim history,
+        so they change without disturbing the cached prefix. They only use
+        budget the history left over.
+        """
+        with self._lock:
+            if not history:
+                # Context expired or was cleared; start over
+                self._summary.clear()
+                self._summary_sources.clear()
+                self._summary_tokens = 0
+                self._pending.clear()
+
+            live = [turn for turn in history if getattr(turn, 'seq', 0) > self._folded_through
+                    or not hasattr(turn, 'seq')]
+            fixed = estimate_tokens(system_prompt) + estimate_tokens(user_input)
+            used = sum(turn_tokens(turn) for turn in live)
+
+            oldest = getattr(history[0], 'seq', None) if history else None
+            if oldest is not None and self._pending and self._pending[0].seq < oldest:
+                # Turns slid out of the window unsummarized; fold them and a batch of
+                # the oldest live turns so the window has room for a few more requests
+                for turn in self._pending:
+                    if self._folded_through < turn.seq < oldest:
+                        self._fold(turn)
+                keep = int(len(history) * self.refill)
+                while len(live) > keep:
+                    turn = live.pop(0)
+                    used -= turn_tokens(turn)
+                    self._fold(turn)
+                logger.debug("Folded turns that left the window; %d turns kept verbatim", len(live))
+
+            if fixed + self._summary_tokens + used > self.budget:
+                # Fold a batch, not just one turn, so the next requests keep this prefix
+                target = (self.budget - fixed - self.summary_budget) * self.refill
+                while live and (used > target or fixed + self._summary_tokens + used > self.budget):
+                    turn = live.pop(0)
+                    used -= turn_tokens(turn)
+                    self._fold(turn)
+                logger.debug("Folded history into summary; %d turns kept verbatim", len(live))
+
+            self._pending = deque(turn for turn in live if hasattr(turn, 'seq'))
+
+            messages = [{"role": "system", "content": system_prompt}]
+            summary = self._summary_message()
+            if summary:
+                messages.append(summary)
+            for turn in live:
+                messages.append({"role": "user", "content": turn['user_input']})
+                messages.append({"role": "assistant", "content": turn['assistant_response']})
+
+            prompt_tokens = fixed + used + (estimate_tokens(summary['content']) if summary else 0)
+            naive_tokens = fixed + sum(turn_tokens(turn) for turn in history)
+            if oldest is not None:
+                # Summarized turns from outside the window would otherwise be sent verbatim
+                naive_tokens += sum(tokens for seq, tokens in self._summary_sources if seq < oldest)
+            recall = self._recall_message(recalled, self.budget - prompt_tokens) if recalled else None
+            if recall:
+                messages.append(recall)
+                # Recall is extra context, not history; count it on both sides of the savings
+                prompt_tokens += estimate_tokens(recall['content'])
+                naive_tokens += estimate_tokens(recall['content'])
+            messages.append({"role": "user", "content": user_input})
+
+            self.requests += 1
+            self.tokens_saved += naive_tokens - prompt_tokens
+            self.last_stats = {
+                'prompt_tokens': prompt_tokens,
+                'naive_tokens': naive_tokens,
+                'tokens_saved': naive_tokens - prompt_tokens,
+                'verbatim_turns': len(live),
+                'summarized_turns': len(self._summary),
+                'recalled_turns': recall['content'].count("\n") if recall else 0,
+            }
+        logger.debug("Prompt tokens: %(prompt_tokens)d (saved %(tokens_saved)d)", self.last_stats)
+        return messages
+
+    def get_stats_summary(self) -> str:
+        """Get a human-readable summary of prompt sizes and savings."""
+        if not self.requests:
+            return "No prompts built yet."
+        stats = self.last_stats
+        return (f"Last prompt: {stats['prompt_tokens']} tokens "
+                f"({stats['verbatim_turns']} turns verbatim, {stats['summarized_turns']} summarized, "
+                f"{stats['recalled_turns']} recalled), "
+                f"saved {stats['tokens_saved']}. "
+                f"Total saved over {self.requests} requests: {self.tokens_saved} tokens "
+                f"(budget {self.budget})")
@@ -0,0 +1,179 @@
+"""
+Semantic recall for J.A.R.V.I.S.
+Embeds conversation turns with a hashing vectorizer and finds the turns most
+relevant to a new input with one matrix-vector product over a contiguous
+float32 matrix, so earlier exchanges can be offered to the model.
+"""
+
+import logging
+import re
+import threading
+import zlib
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Words that carry no topic; they would otherwise dominate short utterances
+STOPWORDS = frozenset("""
+a about all also am an and any are as at be but by can could did do does for from get got had
+has have he her his how i if in is it its just know like me might more my need no not of on or
+our please shall she should so some tell than that the their them then there these they this
+to up us very want was we were what when where which who why will with would you your
+""".split())
+
+@lru_cache(maxsize=65536)
+def _hash(feature: str) -> int:
+    # crc32 is stable across processes, unlike the salted built-in hash
+    return zlib.crc32(feature.encode('utf-8'))
+
+class HashingEmbedder:
+    BIGRAM_WEIGHT = 0.5
+
+    def __init__(self, dim: int = 128, bigrams: bool = True):
+        """
+        Hash words (and adjacent word pairs) into a fixed number of signed buckets.
+
+        Args:
+            dim: Embedding width; lookup cost grows linearly with it
+            bigrams: Also hash adjacent word pairs, which captures some word order
+        """
+        self.dim = dim
+        self.bigrams = bigrams
+
+    def features(self, text: str) -> Tuple[List[str], List[str]]:
+        """Content words and adjacent content-word pairs of a text."""
+        words = [word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS]
+        pairs = [f"{first} {second}" for first, second in zip(words, words[1:])] if self.bigrams else []
+        return words, pairs
+
+    def embed(self, text: str) -> np.ndarray:
+        """Return a unit-length float32 vector (all zeros for text with no content words)."""
+        words, pairs = self.features(text)
+        hashes = np.fromiter((_hash(feature) for feature in words + pairs), dtype=np.uint32)
+        # Low bits pick the bucket, the top bit picks the sign so collisions tend to cancel.
+        # Pairs count half, so a shared word still matters when the phrasing differs.
+        signs = np.where(hashes & 0x80000000, 1.0, -1.0)
+        signs[len(words):] *= self.BIGRAM_WEIGHT
+        vector = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+class SemanticIndex:
+    def __init__(self, embedder: Optional[HashingEmbedder] = None, chunk: int = 4096,
+                 min_score: float = 0.3, max_turns: Optional[int] = None):
+        """
+        Initialize an empty index of conversation turns.
+
+        Args:
+            embedder: Text encoder (default a 128-wide HashingEmbedder)
+            chunk: Rows added to the embedding matrix whenever it fills up
+            min_score: Cosine similarity below which a turn is never returned
+            max_turns: Turns kept before the oldest are overwritten (None keeps all)
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.chunk = chunk
+        self.min_score = min_score
+        self.max_turns = max_turns or None
+        self._matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._turns: List = []
+        # Row the next turn replaces once max_turns is reached
+        self._oldest = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def _grow(self, needed: int):
+        """Reallocate the matrix in whole chunks, at least half again its size, so copies stay rare."""
+        capacity = len(self._matrix)
+        if needed <= capacity:
+            return
+        target = max(needed, capacity + capacity // 2)
+        target = -(-target // self.chunk) * self.chunk
+        if self.max_turns is not None:
+            target = min(target, self.max_turns)
+        matrix = np.zeros((target, self.embedder.dim), dtype=np.float32)
+        matrix[:len(self._turns)] = self._matrix[:len(self._turns)]
+        self._matrix = matrix
+
+    @staticmethod
+    def _text(turn) -> str:
+        return f"{turn['user_input']} {turn['assistant_response']}"
+
+    def _replace_oldest(self, vector: np.ndarray, turn):
+        row = self._oldest
+        self._matrix[row] = vector
+        self._turns[row] = turn
+        self._oldest = (row + 1) % self.max_turns
+
+    def add(self, turn):
+        """Index one turn."""
+        vector = self.embedder.embed(self._text(turn))
+        with self._lock:
+            if self.max_turns is not None and len(self._turns) >= self.max_turns:
+                self._replace_oldest(vector, turn)
+                return
+            self._grow(len(self._turns) + 1)
+            self._matrix[len(self._turns)] = vector
+            self._turns.append(turn)
+
+    def add_many(self, turns: Iterable):
+        """Index several turns with a single reallocation."""
+        turns = list(turns)
+        if self.max_turns is not None:
+            turns = turns[-self.max_turns:]
+        if not turns:
+            return
+        vectors = np.stack([self.embedder.embed(self._text(turn)) for turn in turns])
+        with self._lock:
+            start = len(self._turns)
+            fits = len(turns) if self.max_turns is None else min(len(turns), self.max_turns - start)
+            self._grow(start + fits)
+            self._matrix[start:start + fits] = vectors[:fits]
+            self._turns.extend(turns[:fits])
+            for vector, turn in zip(vectors[fits:], turns[fits:]):
+                self._replace_oldest(vector, turn)
+
+    def search(self, query: str, k: int = 3, exclude: Sequence[int] = ()) -> List[Tuple[float, object]]:
+        """
+        Find the turns most similar to a query.
+
+        Args:
+            query: Text to match, usually the new user input
+            k: Maximum number of turns to return
+            exclude: Turn seq numbers to skip, e.g. those already in the prompt verbatim
+
+        Returns:
+            (score, turn) pairs, best first
+        """
+        vector = self.embedder.embed(query)
+        if k <= 0 or not vector.any():
+            return []
+        excluded = set(exclude)
+        with self._lock:
+            count = len(self._turns)
+            if not count:
+                return []
+            scores = self._matrix[:count] @ vector
+            # Thresholding first leaves far fewer rows to partition
+            candidates = np.flatnonzero(scores >= self.min_score)
+            wanted = min(len(candidates), k + len(excluded))
+            if not wanted:
+                return []
+            top = candidates[np.argpartition(scores[candidates], len(candidates) - wanted)[-wanted:]]
+            top = top[np.argsort(scores[top])[::-1]]
+            results = []
+            for row in top:
+                score = float(scores[row])
+                turn = self._turns[row]
+                if getattr(turn, 'seq', None) in excluded:
+                    continue
+                results.append((score, turn))
+                if len(results) == k:
+                    break
+        return results
@@ -0,0 +1,255 @@
+"""
+Model routing for J.A.R.V.I.S.
+Classifies each conversation request from cheap local features (length,
+question complexity and the type of the previous turn) into a tier, then
+picks a model and generation budget for that tier from a configurable table.
+Observed latency is kept per model over a sliding window, and a model whose
+p95 has degraded well past its own recent best or a faster alternative stops
+getting traffic until periodic probes show it has recovered.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from commands.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "deepseek/deepseek-v3-base:free"
+
+BRIEF = "brief"
+STANDARD = "standard"
+COMPLEX = "complex"
+TIERS = (BRIEF, STANDARD, COMPLEX)
+
+# Tier -> candidate models in preference order and the max_tokens budget
+DEFAULT_ROUTES = {
+    BRIEF: {'models': [DEFAULT_MODEL], 'max_tokens': 60},
+    STANDARD: {'models': [DEFAULT_MODEL], 'max_tokens': 150},
+    COMPLEX: {'models': [DEFAULT_MODEL], 'max_tokens': 400},
+}
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Words that signal an explanation, a comparison or a multi-step answer
+COMPLEX_MARKERS = frozenset("""
+explain why how compare comparison difference differences analyze analyse plan design write code
+steps step summarize summarise describe pros cons versus vs calculate derive prove outline detail
+detailed elaborate walk
+""".split())
+
+# Connectives that chain several asks into one request
+MULTI_STEP_RE = re.compile(r"\b(and then|after that|first|second|finally|also)\b")
+
+COMMAND_TYPES = ("exact_match", "prefix_match", "fuzzy_match")
+
+class Route(NamedTuple):
+    tier: str
+    model: str
+    max_tokens: int
+
+def load_routes(spec: Optional[str]) -> Dict[str, Dict]:
+    """
+    Read a routing table from JSON text or a path to a JSON file.
+
+    Tiers missing from the table keep their defaults; JARVIS_MODEL replaces
+    the default model everywhere.
+    """
+    default_model = os.getenv('JARVIS_MODEL', DEFAULT_MODEL)
+    routes = {tier: {'models': [default_model], 'max_tokens': route['max_tokens']}
+              for tier, route in DEFAULT_ROUTES.items()}
+    if not spec:
+        return routes
+    try:
+        if spec.lstrip().startswith("{"):
+            table = json.loads(spec)
+        else:
+            with open(spec) as f:
+                table = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Could not read model routes ({e}); using defaults")
+        return routes
+    for tier, route in table.items():
+        if tier not in routes:
+            logger.warning("Ignoring unknown routing tier %r", tier)
+            continue
+        models = route.get('models') or ([route['model']] if route.get('model') else None)
+        if models:
+            routes[tier]['models'] = list(models)
+        if route.get('max_tokens'):
+            routes[tier]['max_tokens'] = int(route['max_tokens'])
+    return routes
+
+class LatencyWindow:
+    __slots__ = ('samples', 'horizon', 'updated', 'baseline', 'baseline_at')
+
+    def __init__(self, size: int, horizon: float):
+        """Most recent latency samples, limited by count and age, and the best recent p95."""
+        self.samples: Deque[Tuple[float, float]] = deque(maxlen=size)
+        self.horizon = horizon
+        self.updated = 0.0
+        self.baseline: Optional[float] = None
+        self.baseline_at = 0.0
+
+    def add(self, seconds: float, now: float, min_samples: int):
+        while self.samples and now - self.samples[0][0] > self.horizon:
+            self.samples.popleft()
+        self.samples.append((now, seconds))
+        self.updated = now
+        p95 = self.p95(now, min_samples)
+        # The lowest p95 within the last horizon; an older one gives way to the current p95,
+        # so a short fast burst does not tighten the threshold for good
+        if p95 is not None and (self.baseline is None or p95 <= self.baseline
+                                or now - self.baseline_at > self.horizon):
+            self.baseline = p95
+            self.baseline_at = now
+
+    def p95(self, now: float, min_samples: int) -> Optional[float]:
+        """p95 of the samples within the horizon, or None with fewer than min_samples."""
+        recent = sorted(seconds for at, seconds in self.samples if now - at <= self.horizon)
+        if len(recent) < min_samples:
+            return None
+        return recent[min(len(recent) - 1, int(0.95 * len(recent)))]
+
+    def current_baseline(self, now: float) -> Optional[float]:
+        if self.baseline is None or now - self.baseline_at > self.horizon:
+            return None
+        return self.baseline
+
+class ModelRouter:
+    def __init__(self, routes: Optional[Dict[str, Dict]] = None, window: int = 100,
+                 horizon: float = 300.0, min_samples: int = 5, degrade_factor: float = 1.5,
+                 probe_every: int = 20, failure_penalty: float = 10.0):
+        """
+        Initialize the router.
+
+        Args:
+            routes: Tier -> {'models': [...], 'max_tokens': n} (defaults to DEFAULT_ROUTES)
+            window: Latency samples kept per tier and model
+            horizon: Seconds after which a sample no longer counts
+            min_samples: Samples needed before a model's p95 is trusted
+            degrade_factor: How far a model's p95 may exceed its best p95 within the horizon
+                or another candidate's before traffic moves to the next model
+            probe_every: Requests per tier between probes of a skipped model (0 disables)
+            failure_penalty: Latency recorded for a failed request
+        """
+        self.routes = routes or DEFAULT_ROUTES
+        self.window = window
+        self.horizon = horizon
+        self.min_samples = min_samples
+        self.degrade_factor = degrade_factor
+        self.probe_every = probe_every
+        self.failure_penalty = failure_penalty
+        self._windows: Dict[Tuple[str, str], LatencyWindow] = {}
+        self._requests: Dict[str, int] = {tier: 0 for tier in self.routes}
+        self._sent: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def classify(user_input: str, conversation_history: Sequence = ()) -> str:
+        """Pick a tier from the input's length and complexity and the previous turn's type."""
+        text = user_input.lower()
+        words = WORD_RE.findall(text)
+        markers = sum(word in COMPLEX_MARKERS for word in words)
+        questions = text.count("?")
+        steps = len(MULTI_STEP_RE.findall(text))
+
+        if len(words) >= 30 or markers >= 2 or questions >= 2 or steps >= 2 or \
+                (markers and len(words) >= 12):
+            return COMPLEX
+        if len(words) <= 4 and not markers:
+            return BRIEF
+        # A short follow-up to a command ("thanks, that worked") needs no long answer
+        previous = conversation_history[-1].get('command_type') if conversation_history else None
+        if previous in COMMAND_TYPES and len(words) <= 8 and not markers:
+            return BRIEF
+        return STANDARD
+
+    def _choose(self, tier: str, now: float) -> str:
+        models = self.routes[tier]['models']
+        if len(models) == 1:
+            return models[0]
+        windows = [self._windows.get((tier, model)) for model in models]
+        p95s = [window.p95(now, self.min_samples) if window else None for window in windows]
+        chosen = None
+        for index, p95 in enumerate(p95s):
+            if p95 is None:
+                # Not enough recent samples: try it, which also measures it
+                chosen = models[index]
+                break
+            others = p95s[:index] + p95s[index + 1:]
+            known = [other for other in others if other is not None]
+            # Degraded means well past its own recent best or past a healthy alternative
+            baseline = windows[index].current_baseline(now)
+            reference = min(known + [p95 if baseline is None else baseline])
+            degraded = p95 > reference * self.degrade_factor
+            # Only worth skipping if another model is untried or currently faster
+            if degraded and any(other is None or other < p95 for other in others):
+                continue
+            chosen = models[index]
+            break
+        if chosen is None:
+            chosen = models[min(range(len(models)), key=lambda index: p95s[index])]
+
+        self._requests[tier] += 1
+        if self.probe_every and self._requests[tier] % self.probe_every == 0:
+            # Refresh the model heard from least recently so a recovery is noticed
+            others = [(window.updated if window else 0.0, index)
+                      for index, window in enumerate(windows) if models[index] != chosen]
+            if others:
+                return models[min(others)[1]]
+        return chosen
+
+    def route(self, user_input: str, conversation_history: Sequence = ()) -> Route:
+        """Classify a request and pick its model and generation budget."""
+        tier = self.classify(user_input, conversation_history)
+        with self._lock:
+            model = self._choose(tier, time.monotonic())
+            key = (tier, model)
+            self._sent[key] = self._sent.get(key, 0) + 1
+        return Route(tier, model, self.routes[tier]['max_tokens'])
+
+    def record(self, route: Route, seconds: float, ok: bool = True):
+        """Record how long a routed request took (failures count as failure_penalty)."""
+        if not ok:
+            seconds = max(seconds, self.failure_penalty)
+        now = time.monotonic()
+        with self._lock:
+            key = (route.tier, route.model)
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = LatencyWindow(self.window, self.horizon)
+            window.add(seconds, now, self.min_samples)
+        METRICS.record(f"llm.model.{route.model}", seconds)
+
+    def stats(self) -> List[Dict]:
+        now = time.monotonic()
+        rows = []
+        with self._lock:
+            for tier, route in self.routes.items():
+                for model in route['models']:
+                    window = self._windows.get((tier, model))
+                    p95 = window.p95(now, 1) if window else None
+                    rows.append({
+                        'tier': tier,
+                        'model': model,
+                        'max_tokens': route['max_tokens'],
+                        'requests': self._sent.get((tier, model), 0),
+                        'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+                    })
+        return rows
+
+    def get_stats_summary(self) -> str:
+        """Get a human-readable summary of traffic and latency per tier and model."""
+        lines = []
+        for row in self.stats():
+            p95 = f"p95 {row['p95_ms']:.0f} ms" if row['p95_ms'] is not None else "no samples"
+            lines.append(f"{row['tier']:<9} {row['model']} ({row['max_tokens']} tokens): "
+                         f"{row['requests']} requests, {p95}")
+        return "\n".join(lines)
@@ -0,0 +1,236 @@
+"""
+HTTP and WebSocket server for J.A.R.V.I.S.
+Exposes process_command to many clients at once. Each session has its own
+context, turns within a session run in order, and requests execute on a
+bounded worker pool. Once too many requests are waiting, new ones are
+rejected with 503 instead of queueing without limit.
+
+Endpoints:
+    POST   /v1/command          {"input": "...", "session": "..."} -> {"session", "response", "elapsed_ms"}
+    GET    /v1/ws?session=...   WebSocket; send text, receive token and response messages
+    DELETE /v1/sessions/{id}    Forget a session
+    GET    /v1/stats            Stage latencies and server counters
+    GET    /health
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from aiohttp import web, WSMsgType
+
+from commands.metrics import METRICS
+from commands.sessions import SESSION_RE
+
+logger = logging.getLogger(__name__)
+
+class Overloaded(Exception):
+    """Raised when the server already holds its maximum number of pending requests."""
+
+class JarvisServer:
+    def __init__(self, jarvis, host: str = "127.0.0.1", port: int = 8080,
+                 workers: int = 16, max_pending: int = 256):
+        """
+        Initialize the server.
+
+        Args:
+            jarvis: Jarvis instance whose process_command serves requests
+            host: Interface to listen on
+            port: Port to listen on
+            workers: Threads running process_command concurrently
+            max_pending: Requests allowed to be running or waiting before new ones get 503
+        """
+        self.jarvis = jarvis
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jarvis-server")
+        # Only touched from the event loop thread, so no locking is needed
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._session_locks: Dict[str, list] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post("/v1/command", self._handle_command),
+            web.get("/v1/ws", self._handle_websocket),
+            web.delete("/v1/sessions/{session}", self._handle_drop_session),
+            web.get("/v1/stats", self._handle_stats),
+            web.get("/health", self._handle_health),
+        ])
+        return app
+
+    async def _run(self, session: str, text: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Run one input on the worker pool after earlier inputs from the same session."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded()
+        self.pending += 1
+        entry = self._session_locks.setdefault(session, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(
+                    self.executor, self._process, session, text, on_token)
+            self.completed += 1
+            return response
+        finally:
+            self.pending -= 1
+            entry[1] -= 1
+            if not entry[1]:
+                del self._session_locks[session]
+
+    def _process(self, session: str, text: str, on_token: Optional[Callable[[str], None]]) -> str:
+        # Clients are remote: commands that act on this machine (files, browser, audio) are refused
+        response = self.jarvis.process_command(text, on_token=on_token, session=session, remote=True)
+        return "" if response is None else str(response)
+
+    @staticmethod
+    def _session_id(value: object) -> str:
+        if value is None:
+            return uuid.uuid4().hex
+        # JSON bodies can carry any type here, not just strings
+        if not isinstance(value, str) or not SESSION_RE.fullmatch(value):
+            raise web.HTTPBadRequest(text="session must be 1-64 letters, digits, '-' or '_'")
+        return value
+
+    def _overloaded(self) -> web.Response:
+        return web.json_response({"error": "overloaded", "pending": self.pending},
+                                 status=503, headers={"Retry-After": "1"})
+
+    async def _handle_command(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text="body must be JSON")
+        text = body.get("input") if isinstance(body, dict) else None
+        if not isinstance(text, str) or not text.strip():
+            raise web.HTTPBadRequest(text="'input' must be a non-empty string")
+        session = self._session_id(body.get("session") or request.headers.get("X-Session-Id"))
+
+        start = time.perf_counter()
+        try:
+            response = await self._run(session, text)
+        except Overloaded:
+            return self._overloaded()
+        elapsed = time.perf_counter() - start
+        METRICS.record("server.request", elapsed)
+        return web.json_response({"session": session, "response": response,
+                                  "elapsed_ms": round(elapsed * 1000, 3)})
+
+    async def _handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        session = self._session_id(request.query.get("session"))
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"type": "session", "session": session})
+        loop = asyncio.get_running_loop()
+
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            text = message.data
+            if text.startswith("{"):
+                try:
+                    text = json.loads(text).get("input", "")
+                except (json.JSONDecodeError, AttributeError):
+                    text = ""
+            if not isinstance(text, str) or not text.strip():
+                await ws.send_json({"type": "error", "error": "empty input"})
+                continue
+
+            # Tokens arrive on a worker thread; hand them to the loop in order
+            tokens: asyncio.Queue = asyncio.Queue()
+
+            def on_token(chunk: str):
+                loop.call_soon_threadsafe(tokens.put_nowait, chunk)
+
+            async def forward():
+                while True:
+                    chunk = await tokens.get()
+                    if chunk is None:
+                        return
+                    await ws.send_json({"type": "token", "text": chunk})
+
+            forwarder = asyncio.ensure_future(forward())
+            start = time.perf_counter()
+            try:
+                response = await self._run(session, text, on_token)
+            except Overloaded:
+                tokens.put_nowait(None)
+                await forwarder
+                await ws.send_json({"type": "error", "error": "overloaded"})
+                continue
+            # Queued after every token callback, so the forwarder drains them first
+            loop.call_soon_threadsafe(tokens.put_nowait, None)
+            await forwarder
+            elapsed = time.perf_counter() - start
+            METRICS.record("server.request", elapsed)
+            await ws.send_json({"type": "response", "text": response,
+                                "elapsed_ms": round(elapsed * 1000, 3)})
+        return ws
+
+    async def _handle_drop_session(self, request: web.Request) -> web.Response:
+        session = self._session_id(request.match_info["session"])
+        if not self.jarvis.sessions.drop(session):
+            raise web.HTTPNotFound(text="unknown session")
+        return web.json_response({"session": session, "dropped": True})
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "server": self.stats(),
+            "stages": METRICS.snapshot()["stages"],
+        })
+
+    async def _handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "pending": self.pending})
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "sessions": len(self.jarvis.sessions),
+        }
+
+    async def start(self):
+        """Start listening without blocking (for embedding in another event loop)."""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info("J.A.R.V.I.S. server listening on http://%s:%d (%d workers, %d pending max)",
+                    self.host, self.port, self.workers, self.max_pending)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        self.executor.shutdown(wait=False)
+        handler = self.jarvis.__dict__.get('conversation_handler')
+        if handler is not None:
+            await handler.async_client.close()
+
+    def serve_forever(self):
+        """Run the server until interrupted."""
+        async def main():
+            await self.start()
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await self.stop()
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
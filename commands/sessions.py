@@ -0,0 +1,91 @@
+"""
+Session registry for J.A.R.V.I.S.
+Keeps one context manager per session id for multi-user front ends, evicting
+the least recently used and long-idle sessions.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from commands.context import ContextManager
+
+logger = logging.getLogger(__name__)
+
+# Session ids name store directories, so front ends keep them to a safe alphabet
+SESSION_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+class SessionRegistry:
+    def __init__(self, factory: Callable[[str], ContextManager], max_sessions: int = 1000,
+                 idle_timeout: float = 3600, on_evict: Optional[Callable[[str, ContextManager], None]] = None):
+        """
+        Initialize the session registry.
+
+        Args:
+            factory: Creates the context manager for a new session id
+            max_sessions: Sessions kept before the least recently used is evicted
+            idle_timeout: Seconds without a request before a session is evicted
+            on_evict: Called with (session id, context manager) after eviction or drop
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.on_evict = on_evict
+        # session id -> (context manager, monotonic time of last use), oldest first
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions)
+
+    def get(self, session_id: str) -> ContextManager:
+        """Return the session's context manager, creating it on first use."""
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry[1] = now
+                self._sessions.move_to_end(session_id)
+                return entry[0]
+            # Only the oldest entries can be idle, so stop at the first live one
+            while self._sessions:
+                oldest_id, (_, last_used) = next(iter(self._sessions.items()))
+                if len(self._sessions) < self.max_sessions and now - last_used < self.idle_timeout:
+                    break
+                evicted.append((oldest_id, self._sessions.popitem(last=False)[1][0]))
+            context = self.factory(session_id)
+            self._sessions[session_id] = [context, now]
+        for evicted_id, evicted_context in evicted:
+            self._evicted(evicted_id, evicted_context)
+        logger.debug("Created session %s (%d active)", session_id, len(self._sessions))
+        return context
+
+    def drop(self, session_id: str) -> bool:
+        """Forget a session. Returns True if it existed."""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return False
+        self._evicted(session_id, entry[0])
+        return True
+
+    def close(self):
+        """Drop every session."""
+        for session_id in self.ids():
+            self.drop(session_id)
+
+    def _evicted(self, session_id: str, context: ContextManager):
+        logger.debug("Evicting session %s", session_id)
+        if self.on_evict is not None:
+            self.on_evict(session_id, context)
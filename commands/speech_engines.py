@@ -0,0 +1,347 @@
+"""
+Speech engines for J.A.R.V.I.S.
+Text-to-speech and speech-to-text backends behind one interface, a registry
+that builds them by name, and a router that measures each engine's latency as
+it runs, prefers the fastest healthy one and falls back to the next when an
+engine fails. Local backends (espeak, pyttsx3, CMU Sphinx) work offline, and
+the fake engines are deterministic for tests and benchmarks.
+"""
+
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, TypeVar
+
+from commands.gateway import CircuitBreaker
+from commands.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+class SpeechEngineError(Exception):
+    """Raised when no engine could handle a request."""
+
+class TTSEngine(ABC):
+    """Turns text into encoded audio that pygame can play."""
+    name = "tts"
+
+    @abstractmethod
+    def synthesize(self, text: str, lang: str) -> bytes:
+        ...
+
+class STTEngine(ABC):
+    """Turns a speech_recognition AudioData into text (None if nothing was understood)."""
+    name = "stt"
+
+    @abstractmethod
+    def recognize(self, audio) -> Optional[str]:
+        ...
+
+class GTTSEngine(TTSEngine):
+    name = "gtts"
+
+    def __init__(self):
+        # Imported here so offline setups without gTTS can still use other engines
+        from gtts import gTTS
+        self._gtts = gTTS
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        buffer = io.BytesIO()
+        self._gtts(text=text, lang=lang).write_to_fp(buffer)
+        return buffer.getvalue()
+
+class EspeakEngine(TTSEngine):
+    name = "espeak"
+
+    def __init__(self, timeout: float = 10.0):
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+        if self.binary is None:
+            raise RuntimeError("espeak-ng or espeak is not installed")
+        self.timeout = timeout
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        # Text on stdin, so text starting with "-" is never parsed as an option
+        result = subprocess.run([self.binary, "--stdout", "-v", lang, "--stdin"], input=text.encode('utf-8'),
+                                capture_output=True, timeout=self.timeout, check=True)
+        return result.stdout
+
+class Pyttsx3Engine(TTSEngine):
+    name = "pyttsx3"
+
+    def __init__(self):
+        import pyttsx3
+        self._engine = pyttsx3.init()
+        # pyttsx3 drivers are not thread-safe
+        self._lock = threading.Lock()
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "speech.wav")
+            with self._lock:
+                self._engine.save_to_file(text, path)
+                self._engine.runAndWait()
+            with open(path, 'rb') as f:
+                return f.read()
+
+class _RecognizerEngine(STTEngine):
+    method = ""
+
+    def __init__(self, recognizer=None):
+        import speech_recognition as sr
+        self._unknown = sr.UnknownValueError
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def recognize(self, audio) -> Optional[str]:
+        try:
+            return getattr(self.recognizer, self.method)(audio).lower()
+        except self._unknown:
+            return None
+
+class GoogleSTTEngine(_RecognizerEngine):
+    name = "google"
+    method = "recognize_google"
+
+class SphinxSTTEngine(_RecognizerEngine):
+    name = "sphinx"
+    method = "recognize_sphinx"
+
+    def __init__(self, recognizer=None):
+        # Fail at construction, not on the first utterance, when the model is missing
+        import pocketsphinx  # noqa: F401
+        super().__init__(recognizer)
+
+class FakeTTSEngine(TTSEngine):
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, fail: bool = False, name: Optional[str] = None,
+                 sample_rate: int = 16000, seconds_per_char: float = 0.01):
+        """
+        Deterministic TTS for tests: silent WAV audio whose length follows the text.
+
+        Args:
+            latency: Seconds each call takes
+            fail: Raise on every call (can be toggled later)
+            name: Engine name, to register several fakes side by side
+        """
+        self.latency = latency
+        self.fail = fail
+        if name:
+            self.name = name
+        self.sample_rate = sample_rate
+        self.seconds_per_char = seconds_per_char
+        self.calls = 0
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        frames = int(len(text) * self.seconds_per_char * self.sample_rate)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(self.sample_rate)
+            out.writeframes(b"\0\0" * frames)
+        return buffer.getvalue()
+
+class FakeSTTEngine(STTEngine):
+    name = "fake"
+
+    def __init__(self, transcripts: Iterable[Optional[str]] = (), default: Optional[str] = None,
+                 latency: float = 0.0, fail: bool = False, name: Optional[str] = None):
+        """
+        Deterministic STT for tests: returns scripted transcripts in order, then default.
+
+        Args:
+            transcripts: Results for the next calls (None means nothing understood)
+            default: Result once the script runs out
+            latency: Seconds each call takes
+            fail: Raise on every call (can be toggled later)
+            name: Engine name, to register several fakes side by side
+        """
+        self.transcripts: Deque[Optional[str]] = deque(transcripts)
+        self.default = default
+        self.latency = latency
+        self.fail = fail
+        if name:
+            self.name = name
+        self.calls = 0
+
+    def recognize(self, audio) -> Optional[str]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        return self.transcripts.popleft() if self.transcripts else self.default
+
+# Engine name -> factory; STT factories receive the shared speech_recognition Recognizer
+TTS_ENGINES: Dict[str, Callable[[], TTSEngine]] = {
+    'gtts': GTTSEngine,
+    'espeak': EspeakEngine,
+    'pyttsx3': Pyttsx3Engine,
+    'fake': FakeTTSEngine,
+}
+STT_ENGINES: Dict[str, Callable[..., STTEngine]] = {
+    'google': GoogleSTTEngine,
+    'sphinx': SphinxSTTEngine,
+    'fake': lambda recognizer=None: FakeSTTEngine(),
+}
+
+def build_engines(registry: Dict[str, Callable], names: Iterable[str], *args) -> List:
+    """Instantiate the named engines, skipping any whose dependencies are missing."""
+    engines = []
+    for name in names:
+        name = name.strip().lower()
+        if not name:
+            continue
+        factory = registry.get(name)
+        if factory is None:
+            logger.warning("Unknown speech engine %r", name)
+            continue
+        try:
+            engines.append(factory(*args))
+        except Exception as e:
+            logger.info("Speech engine %s unavailable: %s", name, e)
+    return engines
+
+class _EngineState:
+    __slots__ = ('engine', 'breaker', 'latency', 'measured_at', 'calls', 'failures')
+
+    def __init__(self, engine, breaker: CircuitBreaker):
+        self.engine = engine
+        self.breaker = breaker
+        self.latency: Optional[float] = None
+        self.measured_at = 0.0
+        self.calls = 0
+        self.failures = 0
+
+class EngineRouter:
+    def __init__(self, kind: str, engines: Iterable, alpha: float = 0.3, probe_every: int = 50,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0):
+        """
+        Route calls to the fastest healthy engine.
+
+        Engines are tried in order of their smoothed latency; ones not measured
+        yet go first, in the order given, so every engine gets measured. An
+        engine that keeps failing is skipped until its breaker lets a trial call
+        through. Every probe_every calls the engine measured longest ago goes
+        first instead, so a slow engine that has become fast is noticed.
+
+        Args:
+            kind: Metric prefix, e.g. "tts" or "stt"
+            engines: Engines in preference order
+            alpha: Weight of the newest sample in the latency average
+            probe_every: Calls between re-measurements of stale engines (0 disables)
+            failure_threshold: Consecutive failures before an engine is skipped
+            reset_timeout: Seconds before a skipped engine is tried again
+        """
+        self.kind = kind
+        self.alpha = alpha
+        self.probe_every = probe_every
+        self._states = [_EngineState(engine, CircuitBreaker(failure_threshold, reset_timeout))
+                        for engine in engines]
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    @property
+    def engines(self) -> List:
+        return [state.engine for state in self._states]
+
+    def _ranked(self) -> List[_EngineState]:
+        """Unmeasured engines in the order given, then measured ones fastest first."""
+        measured = sorted((state for state in self._states if state.latency is not None),
+                          key=lambda state: state.latency)
+        return [state for state in self._states if state.latency is None] + measured
+
+    def _order(self) -> List[_EngineState]:
+        with self._lock:
+            self._calls += 1
+            probe = self.probe_every and self._calls % self.probe_every == 0
+            order = self._ranked()
+            measured = [state for state in order if state.latency is not None]
+            if probe and measured:
+                stalest = min(measured, key=lambda state: state.measured_at)
+                order.remove(stalest)
+                order.insert(0, stalest)
+            return order
+
+    def _record(self, state: _EngineState, seconds: float):
+        with self._lock:
+            state.calls += 1
+            state.latency = seconds if state.latency is None else \
+                self.alpha * seconds + (1 - self.alpha) * state.latency
+            state.measured_at = time.monotonic()
+        METRICS.record(f"{self.kind}.{state.engine.name}", seconds)
+
+    def preferred(self):
+        """The engine the next call would normally go to, or None if every engine is being skipped."""
+        with self._lock:
+            ranked = self._ranked()
+        for state in ranked:
+            if state.breaker.state != CircuitBreaker.OPEN:
+                return state.engine
+        return None
+
+    def run(self, operation: Callable[[object], T]) -> T:
+        """
+        Call operation(engine) on the best available engine, falling back on errors.
+
+        Raises:
+            SpeechEngineError: If every engine failed or is being skipped
+        """
+        error: Optional[BaseException] = None
+        for state in self._order():
+            if not state.breaker.allow():
+                continue
+            start = time.perf_counter()
+            try:
+                result = operation(state.engine)
+            except Exception as e:
+                with self._lock:
+                    state.failures += 1
+                state.breaker.record_failure()
+                logger.warning("%s engine %s failed, trying the next one: %s",
+                               self.kind.upper(), state.engine.name, e)
+                error = e
+                continue
+            self._record(state, time.perf_counter() - start)
+            state.breaker.record_success()
+            return result
+        raise SpeechEngineError(f"no {self.kind} engine available" +
+                                (f" (last error: {error})" if error else ""))
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            return [{
+                'engine': state.engine.name,
+                'state': state.breaker.state,
+                'latency_ms': round(state.latency * 1000, 3) if state.latency is not None else None,
+                'calls': state.calls,
+                'failures': state.failures,
+            } for state in self._states]
+
+    def get_stats_summary(self) -> str:
+        """Get a human-readable summary of engine latency and health."""
+        if not self._states:
+            return f"No {self.kind.upper()} engines available."
+        parts = []
+        for stats in self.stats():
+            latency = f"{stats['latency_ms']:.0f} ms" if stats['latency_ms'] is not None else "unmeasured"
+            parts.append(f"{stats['engine']} {latency}, {stats['calls']} calls, "
+                         f"{stats['failures']} failures ({stats['state']})")
+        return f"{self.kind.upper()} engines: " + "; ".join(parts)
@@ -0,0 +1,146 @@
+"""
+Speech output queue for J.A.R.V.I.S.
+Plays utterances on background threads, synthesizing the next sentence
+while the current one plays, with priorities and barge-in interruption.
+"""
+
+import itertools
+import logging
+import queue
+import re
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+
+_SENTENCE_END = re.compile(r'(?<=[.!?;:])\s+')
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences so the first one can start playing early."""
+    return [sentence for sentence in _SENTENCE_END.split(text.strip()) if sentence]
+
+class Utterance:
+    def __init__(self, text: str, priority: int, generation: int):
+        """A queued piece of speech with a completion event."""
+        self.text = text
+        self.priority = priority
+        self.generation = generation
+        self.done = threading.Event()
+        self.cancelled = False
+        self.error: Optional[Exception] = None
+
+    def cancel(self):
+        """Drop this utterance; playback stops at the next sentence boundary."""
+        self.cancelled = True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the utterance has finished or been cancelled."""
+        return self.done.wait(timeout)
+
+class SpeechWorker:
+    def __init__(self, synthesize: Callable[[str], bytes],
+                 play: Callable[[bytes, threading.Event], None], lookahead: int = 1):
+        """
+        Initialize the speech worker.
+
+        Args:
+            synthesize: Turns a sentence into encoded audio
+            play: Plays audio, returning early once the given event is set
+            lookahead: Number of synthesized sentences buffered ahead of playback
+        """
+        self._synthesize = synthesize
+        self._play = play
+        self._requests: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._audio: "queue.Queue" = queue.Queue(maxsize=max(1, lookahead))
+        self._sequence = itertools.count()
+        self._generation = 0
+        self._interrupted = threading.Event()
+        self._lock = threading.Lock()
+        self._running = True
+        self.current: Optional[Utterance] = None
+
+        self._synth_thread = threading.Thread(target=self._synth_loop, name="speech-synth", daemon=True)
+        self._play_thread = threading.Thread(target=self._play_loop, name="speech-play", daemon=True)
+        self._synth_thread.start()
+        self._play_thread.start()
+
+    def say(self, text: str, priority: int = PRIORITY_NORMAL) -> Utterance:
+        """Queue text for speaking and return immediately."""
+        with self._lock:
+            utterance = Utterance(text, priority, self._generation)
+        self._requests.put((priority, next(self._sequence), utterance))
+        return utterance
+
+    def interrupt(self):
+        """Barge-in: stop current playback and drop everything queued."""
+        with self._lock:
+            self._generation += 1
+            self._interrupted.set()
+        # Drain pending requests so they complete instead of playing
+        while True:
+            try:
+                _, _, utterance = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            utterance.cancel()
+            utterance.done.set()
+
+    def _is_stale(self, utterance: Utterance) -> bool:
+        return utterance.cancelled or utterance.generation != self._generation
+
+    def _synth_loop(self):
+        """Synthesize queued utterances sentence by sentence."""
+        while self._running:
+            _, _, utterance = self._requests.get()
+            if utterance is None:
+                self._audio.put(None)
+                break
+
+            sentences = split_sentences(utterance.text) or [utterance.text]
+            for index, sentence in enumerate(sentences):
+                if self._is_stale(utterance):
+                    break
+                try:
+                    audio = self._synthesize(sentence)
+                except Exception as e:
+                    logger.error(f"TTS Error: {e}")
+                    utterance.error = e
+                    break
+                # Blocks while playback is `lookahead` sentences behind
+                self._audio.put((utterance, audio, index == len(sentences) - 1))
+            else:
+                continue
+            # Stopped early: let the player finish the utterance
+            self._audio.put((utterance, None, True))
+
+    def _play_loop(self):
+        """Play synthesized sentences in order."""
+        while self._running:
+            item = self._audio.get()
+            if item is None:
+                break
+
+            utterance, audio, last = item
+            self.current = utterance
+            if audio is not None and not self._is_stale(utterance):
+                with self._lock:
+                    self._interrupted.clear()
+                    stale = self._is_stale(utterance)
+                if not stale:
+                    try:
+                        self._play(audio, self._interrupted)
+                    except Exception as e:
+                        logger.error(f"Playback error: {e}")
+                        utterance.error = e
+            if last:
+                self.current = None
+                utterance.done.set()
+
+    def stop(self):
+        """Stop the worker threads."""
+        self.interrupt()
+        self._running = False
+        self._requests.put((-1, next(self._sequence), None))
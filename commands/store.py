@@ -0,0 +1,399 @@
+"""
+Persistent conversation store for J.A.R.V.I.S.
+Appends turns to per-session segment logs from a background writer with
+group-commit fsync. Many sessions can share one writer thread; their files are
+then only open while a batch is written. Each segment has a sparse offset index, so startup only
+memory-maps and parses the tail needed for the recent window. Old segments
+are merged in the background.
+
+Layout: <directory>/<session>/<first seq>.log plus a matching .idx file.
+Log record: <u32 body length><u32 crc32(body)><body>
+Body:       <u64 seq><f64 wall time><u32 len><u32 len><u16 len> user, response, command type (UTF-8)
+Index:      <u64 seq><u64 offset> for every INDEX_STRIDE-th record of the segment
+"""
+
+import glob
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX = struct.Struct('<II')
+HEADER = struct.Struct('<QdIIH')
+INDEX_ENTRY = struct.Struct('<QQ')
+
+# (seq, wall_time, user_input, assistant_response, command_type)
+StoredTurn = Tuple[int, float, str, str, Optional[str]]
+
+def encode_record(seq: int, wall_time: float, user_input: str, response: str,
+                  command_type: Optional[str]) -> bytes:
+    user = user_input.encode('utf-8')
+    reply = str(response).encode('utf-8')
+    kind = (command_type or "").encode('utf-8')
+    body = HEADER.pack(seq, wall_time, len(user), len(reply), len(kind)) + user + reply + kind
+    return PREFIX.pack(len(body), zlib.crc32(body)) + body
+
+def decode_records(buffer, offset: int = 0) -> Tuple[List[StoredTurn], int]:
+    """
+    Decode records from a buffer until its end or the first torn/corrupt record.
+
+    Returns:
+        (records, offset just past the last valid record)
+    """
+    records = []
+    end = len(buffer)
+    while offset + PREFIX.size <= end:
+        length, crc = PREFIX.unpack_from(buffer, offset)
+        start = offset + PREFIX.size
+        if start + length > end or length < HEADER.size:
+            break
+        body = buffer[start:start + length]
+        if zlib.crc32(body) != crc:
+            break
+        seq, wall_time, user_len, reply_len, kind_len = HEADER.unpack_from(body)
+        position = HEADER.size
+        user = bytes(body[position:position + user_len]).decode('utf-8')
+        position += user_len
+        reply = bytes(body[position:position + reply_len]).decode('utf-8')
+        position += reply_len
+        kind = bytes(body[position:position + kind_len]).decode('utf-8') or None
+        records.append((seq, wall_time, user, reply, kind))
+        offset = start + length
+    return records, offset
+
+class _Segment:
+    __slots__ = ('first_seq', 'log_path', 'index_path')
+
+    def __init__(self, directory: str, first_seq: int):
+        self.first_seq = first_seq
+        self.log_path = os.path.join(directory, f"{first_seq:020d}.log")
+        self.index_path = os.path.join(directory, f"{first_seq:020d}.idx")
+
+    def read_index(self) -> List[Tuple[int, int]]:
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return []
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        return [INDEX_ENTRY.unpack_from(data, i) for i in range(0, usable, INDEX_ENTRY.size)]
+
+    def read_from(self, offset: int) -> Tuple[List[StoredTurn], int]:
+        """Memory-map the log and decode records from an offset."""
+        size = os.path.getsize(self.log_path)
+        if size <= offset:
+            return [], offset
+        with open(self.log_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    return decode_records(view, offset)
+                finally:
+                    view.release()
+
+class StoreWriter:
+    def __init__(self, max_batch: int = 8192):
+        """One background thread that group-commits appended turns for any number of stores."""
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name="store-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, store: "ConversationStore", record: StoredTurn):
+        self._queue.put((store, record))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            # Group commit: everything queued while the last fsync ran goes in one batch
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            by_store: Dict[ConversationStore, List[StoredTurn]] = {}
+            for store, record in batch:
+                by_store.setdefault(store, []).append(record)
+            for store, records in by_store.items():
+                store._persist(records)
+            if stop:
+                break
+
+    def close(self):
+        """Write everything submitted so far and stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+class ConversationStore:
+    SEGMENT_RECORDS = 65536
+    INDEX_STRIDE = 256
+
+    def __init__(self, directory: str, session: str = "default", max_segments: int = 8,
+                 retain: Optional[int] = None, fsync: bool = True,
+                 writer: Optional[StoreWriter] = None):
+        """
+        Open (or create) a session's store.
+
+        Args:
+            directory: Root directory for all sessions
+            session: Session name; each session has its own log
+            max_segments: Sealed segments allowed before a background merge
+            retain: Keep only this many most recent turns when compacting (None keeps all)
+            fsync: fsync after every group commit (disable only for benchmarks)
+            writer: Shared writer thread; without one the store starts its own and keeps
+                its files open
+
+        Raises:
+            ValueError: If session is not a single path component
+        """
+        if session in ("", ".", "..") or os.path.basename(session) != session or \
+                (os.path.altsep and os.path.altsep in session):
+            raise ValueError(f"session name {session!r} must be a single path component")
+        self.directory = os.path.join(directory, session)
+        self.max_segments = max_segments
+        self.retain = retain
+        self.fsync = fsync
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._durable = threading.Condition()
+        self._owns_writer = writer is None
+        self._log = self._index = None
+        self._segments: List[_Segment] = []
+        self._compacting = False
+        self._compactor: Optional[threading.Thread] = None
+        self.last_seq = 0
+        self.durable_seq = 0
+        self._recover()
+        if not self._owns_writer:
+            self._release_files()
+        self._writer = writer or StoreWriter()
+
+    def _recover(self):
+        """Find segments and position the writer after the last valid record."""
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.log"))):
+            self._segments.append(_Segment(self.directory, int(os.path.basename(path)[:-4])))
+        if not self._segments:
+            self._open_segment(1)
+            return
+
+        active = self._segments[-1]
+        size = os.path.getsize(active.log_path)
+        # The index can run ahead of the log if the machine died before the log reached disk
+        index = [entry for entry in active.read_index() if entry[1] < size]
+        while True:
+            start_offset = index[-1][1] if index else 0
+            tail, end = active.read_from(start_offset)
+            if tail or not index:
+                break
+            index.pop()
+        # Drop a torn tail left by a crash mid-write
+        if end < size:
+            logger.warning("Truncating torn records in %s", active.log_path)
+            with open(active.log_path, 'r+b') as f:
+                f.truncate(end)
+
+        self.last_seq = tail[-1][0] if tail else active.first_seq - 1
+        self.durable_seq = self.last_seq
+        self._active_count = max(len(index) - 1, 0) * self.INDEX_STRIDE + len(tail)
+        self._active_offset = end
+        self._log = open(active.log_path, 'ab')
+        # Rewrite the index from the entries we trust, adding any the crash lost
+        self._index = open(active.index_path, 'wb')
+        self._index.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in index))
+        offset = start_offset
+        for position, record in enumerate(tail, max(len(index) - 1, 0) * self.INDEX_STRIDE):
+            if position >= len(index) * self.INDEX_STRIDE and position % self.INDEX_STRIDE == 0:
+                self._index.write(INDEX_ENTRY.pack(record[0], offset))
+            offset += len(encode_record(*record))
+        self._index.flush()
+
+    def _open_segment(self, first_seq: int):
+        segment = _Segment(self.directory, first_seq)
+        with self._lock:
+            self._segments.append(segment)
+        self._log = open(segment.log_path, 'ab')
+        self._index = open(segment.index_path, 'ab')
+        self._active_count = 0
+        self._active_offset = 0
+
+    def _release_files(self):
+        if self._log is not None:
+            self._log.close()
+            self._index.close()
+            self._log = self._index = None
+
+    def append(self, user_input: str, response: str, command_type: Optional[str] = None,
+               wall_time: Optional[float] = None) -> int:
+        """Queue a turn for writing without waiting for disk. Returns its sequence number."""
+        with self._lock:
+            self.last_seq += 1
+            seq = self.last_seq
+        self._writer.submit(self, (seq, wall_time if wall_time is not None else time.time(),
+                                   user_input, response, command_type))
+        return seq
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything appended so far is durable."""
+        target = self.last_seq
+        with self._durable:
+            return self._durable.wait_for(lambda: self.durable_seq >= target, timeout)
+
+    def _persist(self, batch: List[StoredTurn]):
+        """Write a batch on the writer thread and wake flush() callers."""
+        try:
+            self._write_batch(batch)
+        except OSError as e:
+            logger.error(f"Failed to persist conversation turns: {e}")
+            return
+        finally:
+            if not self._owns_writer:
+                # Shared writers serve many sessions; do not hold their files open
+                self._release_files()
+        with self._durable:
+            self.durable_seq = batch[-1][0]
+            self._durable.notify_all()
+
+    def _write_batch(self, batch: List[StoredTurn]):
+        if self._log is None:
+            active = self._segments[-1]
+            self._log = open(active.log_path, 'ab')
+            self._index = open(active.index_path, 'ab')
+        chunks = []
+        index_entries = []
+        for record in batch:
+            if self._active_count >= self.SEGMENT_RECORDS:
+                self._commit(chunks, index_entries)
+                chunks, index_entries = [], []
+                self._seal_active()
+                self._open_segment(record[0])
+            encoded = encode_record(*record)
+            if self._active_count % self.INDEX_STRIDE == 0:
+                index_entries.append(INDEX_ENTRY.pack(record[0], self._active_offset))
+            chunks.append(encoded)
+            self._active_offset += len(encoded)
+            self._active_count += 1
+        self._commit(chunks, index_entries)
+
+    def _commit(self, chunks: List[bytes], index_entries: List[bytes]):
+        if chunks:
+            self._log.write(b"".join(chunks))
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+        if index_entries:
+            # The index is a hint rebuilt on recovery, so it does not need its own fsync
+            self._index.write(b"".join(index_entries))
+            self._index.flush()
+
+    def _seal_active(self):
+        self._log.close()
+        self._index.close()
+        sealed = len(self._segments)
+        if sealed > self.max_segments and not self._compacting:
+            self._compacting = True
+            self._compactor = threading.Thread(target=self.compact, name="store-compactor", daemon=True)
+            self._compactor.start()
+
+    def compact(self):
+        """Merge the oldest sealed segments into one, dropping turns beyond retention."""
+        try:
+            with self._lock:
+                sealed = self._segments[:-1]
+            if len(sealed) < 2:
+                return
+            victims = sealed[:len(sealed) - self.max_segments // 2 + 1]
+            records: List[StoredTurn] = []
+            for segment in victims:
+                records.extend(segment.read_from(0)[0])
+            if self.retain is not None:
+                cutoff = self.last_seq - self.retain
+                records = [record for record in records if record[0] > cutoff]
+
+            merged = _Segment(self.directory, victims[0].first_seq)
+            tmp_log, tmp_index = merged.log_path + ".tmp", merged.index_path + ".tmp"
+            offset = 0
+            with open(tmp_log, 'wb') as log, open(tmp_index, 'wb') as index:
+                for position, record in enumerate(records):
+                    encoded = encode_record(*record)
+                    if position % self.INDEX_STRIDE == 0:
+                        index.write(INDEX_ENTRY.pack(record[0], offset))
+                    log.write(encoded)
+                    offset += len(encoded)
+                log.flush()
+                os.fsync(log.fileno())
+
+            with self._lock:
+                # Install the merged segment before deleting its sources: a crash in between
+                # leaves duplicate old turns rather than lost ones
+                os.replace(tmp_index, merged.index_path)
+                os.replace(tmp_log, merged.log_path)
+                for segment in victims[1:]:
+                    os.remove(segment.log_path)
+                    os.remove(segment.index_path)
+                self._segments = [merged] + self._segments[len(victims):]
+            logger.info("Compacted %d segments into %s (%d turns)",
+                        len(victims), merged.log_path, len(records))
+        except OSError as e:
+            logger.error(f"Conversation store compaction failed: {e}")
+        finally:
+            self._compacting = False
+
+    def load_recent(self, count: int) -> List[StoredTurn]:
+        """Load the most recent turns, reading only the segment tails they live in."""
+        with self._lock:
+            # Held throughout so a finishing compaction cannot delete a segment mid-read
+            return self._load_recent(count)
+
+    def _load_recent(self, count: int) -> List[StoredTurn]:
+        collected: List[StoredTurn] = []
+        for segment in reversed(self._segments):
+            needed = count - len(collected)
+            if needed <= 0:
+                break
+            index = segment.read_index()
+            if not index:
+                records = segment.read_from(0)[0]
+            else:
+                # Parse from the last index entry to learn how many records the segment holds
+                tail = segment.read_from(index[-1][1])[0]
+                total = (len(index) - 1) * self.INDEX_STRIDE + len(tail)
+                if len(tail) >= needed:
+                    records = tail
+                else:
+                    entry = max(0, (total - needed) // self.INDEX_STRIDE)
+                    records = segment.read_from(index[entry][1])[0]
+            collected = records[-needed:] + collected
+        return collected
+
+    def close(self):
+        """
+        Flush pending turns and wait for any running compaction.
+
+        A store with its own writer stops it. With a shared writer, turns appended
+        after close (e.g. by a request still in flight) are still written.
+        """
+        if self._owns_writer:
+            self._writer.close()
+        elif not self.flush(timeout=30):
+            logger.warning("Conversation store %s closed with turns not yet on disk", self.directory)
+        if self._compactor is not None:
+            self._compactor.join()
+        if self._owns_writer:
+            self._release_files()
@@ -1,25 +1,48 @@
 """
 Voice command module for J.A.R.V.I.S.
-Handles speech recognition and text-to-speech functionality.
+Handles speech recognition and text-to-speech functionality through
+pluggable engines, routed to the fastest healthy one.
 """
 
+import io
 import logging
 import threading
 import time
 import os
-import tempfile
-from gtts import gTTS
 import speech_recognition as sr
 import pygame
+import numpy as np
+from commands.audio_cache import AudioCache
+from commands.wake_word import WakeWordDetector, SAMPLE_RATE
+from commands.audio_capture import StreamingCapture
+from commands.metrics import METRICS
+from commands.speech_engines import EngineRouter, STT_ENGINES, TTS_ENGINES, build_engines
+from commands.speech_queue import SpeechWorker, Utterance, PRIORITY_HIGH, PRIORITY_NORMAL
 
 logger = logging.getLogger(__name__)
 
+# Phrases the listen loop says constantly; synthesized once at startup
+FIXED_PHRASES = ("Yes?", "I didn't hear a command", "I didn't understand that command")
+
 class VoiceHandler:
     def __init__(self):
         """Initialize voice recognition and text-to-speech engines."""
         self.voice_enabled = False
         self.is_listening = False
         self.voice_thread = None
+        self.speech_worker = None
+        self.lang = 'en'
+        self.tts = EngineRouter("tts", build_engines(
+            TTS_ENGINES, os.getenv('JARVIS_TTS_ENGINES', 'gtts,espeak,pyttsx3').split(',')))
+        self.stt = None
+        self.wake_word_detector = WakeWordDetector(
+            templates_dir=os.getenv('JARVIS_WAKE_TEMPLATES'),
+            threshold=float(os.getenv('JARVIS_WAKE_THRESHOLD', '0.35'))
+        )
+        self.audio_cache = AudioCache(
+            max_bytes=int(os.getenv('JARVIS_TTS_CACHE_BYTES', str(16 * 1024 * 1024))),
+            directory=os.getenv('JARVIS_TTS_CACHE_DIR')
+        )
         
         try:
             # Initialize speech recognition
@@ -27,43 +50,89 @@ class VoiceHandler:
             self.recognizer.energy_threshold = 300
             self.recognizer.dynamic_energy_threshold = True
             self.recognizer.pause_threshold = 0.8
+            self.stt = EngineRouter("stt", build_engines(
+                STT_ENGINES, os.getenv('JARVIS_STT_ENGINES', 'google,sphinx').split(','), self.recognizer))
             
             # Initialize pygame for audio playback
             pygame.mixer.init()
+            self.speech_worker = SpeechWorker(self.synthesize, self._play_audio)
             
             self.voice_enabled = True
             logger.info("Voice handler initialized successfully")
+            
+            # Pre-warm the cache off the startup path
+            threading.Thread(target=self._prewarm, daemon=True).start()
         except Exception as e:
             logger.error(f"Failed to initialize voice handler: {e}")
     
-    def speak(self, text: str):
-        """Convert text to speech using gTTS."""
+    def _prewarm(self):
+        """Synthesize fixed phrases ahead of time."""
+        for phrase in FIXED_PHRASES:
+            try:
+                self.synthesize(phrase)
+            except Exception as e:
+                logger.warning(f"Could not pre-warm phrase {phrase!r}: {e}")
+                return
+        logger.debug("Pre-warmed %d fixed phrases", len(FIXED_PHRASES))
+    
+    def synthesize(self, text: str) -> bytes:
+        """Return encoded audio for text, using the cache when possible."""
+        # Engines differ in voice and format (gTTS returns MP3, the others WAV), so cached
+        # audio is keyed by engine and only reused while that engine is the one in use
+        preferred = self.tts.preferred()
+        if preferred is not None:
+            audio = self.audio_cache.get(AudioCache.make_key(text, self.lang, preferred.name))
+            if audio is not None:
+                return audio
+        with METRICS.span("tts.synthesis"):
+            engine, audio = self.tts.run(lambda engine: (engine, engine.synthesize(text, self.lang)))
+        self.audio_cache.put(AudioCache.make_key(text, self.lang, engine.name), audio)
+        return audio
+    
+    def transcribe(self, audio: sr.AudioData):
+        """Recognize audio with the fastest healthy STT engine; None if nothing was understood."""
+        with METRICS.span("stt.recognize"):
+            return self.stt.run(lambda engine: engine.recognize(audio))
+    
+    def engine_stats(self) -> str:
+        """Summarize latency and health of the speech engines."""
+        if self.stt is None:
+            return self.tts.get_stats_summary()
+        return f"{self.tts.get_stats_summary()}\n{self.stt.get_stats_summary()}"
+    
+    def _play_audio(self, audio: bytes, interrupted: threading.Event):
+        """Play encoded audio from memory until it ends or playback is interrupted."""
+        with METRICS.span("tts.playback"):
+            sound = pygame.mixer.Sound(file=io.BytesIO(audio))
+            channel = sound.play()
+            # Wait on the interrupt event for the clip's duration instead of polling the mixer
+            if interrupted.wait(sound.get_length()) and channel is not None:
+                channel.stop()
+    
+    def say(self, text: str, priority: int = PRIORITY_NORMAL) -> Utterance:
+        """Queue text for speaking; the returned utterance signals completion."""
+        logger.debug("Queueing speech: %s", text)
+        return self.speech_worker.say(text, priority)
+    
+    def interrupt(self) -> str:
+        """Stop speaking and drop any queued speech."""
+        if not self.voice_enabled:
+            return "Voice features are not available"
+        self.speech_worker.interrupt()
+        return "Speech stopped"
+    
+    def speak(self, text: str, wait: bool = False):
+        """Convert text to speech without blocking the caller unless asked to."""
         if not self.voice_enabled:
             return "Voice features are not available"
             
         try:
-            logger.debug(f"Speaking: {text}")
-            
-            # Create a temporary file for the audio
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_file:
-                temp_filename = temp_file.name
-            
-            # Generate speech using gTTS
-            tts = gTTS(text=text, lang='en')
-            tts.save(temp_filename)
-            
-            # Play the audio
-            pygame.mixer.music.load(temp_filename)
-            pygame.mixer.music.play()
-            
-            # Wait for the audio to finish playing
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-            
-            # Clean up
-            pygame.mixer.music.unload()
-            os.unlink(temp_filename)
-            
+            utterance = self.say(text)
+            if not wait:
+                return f"Speaking: {text}"
+            utterance.wait()
+            if utterance.error:
+                raise utterance.error
             return f"Said: {text}"
         except Exception as e:
             logger.error(f"TTS Error: {e}")
@@ -74,13 +143,20 @@ class VoiceHandler:
         try:
             logger.debug("Listening for wake word...")
             audio = self.recognizer.listen(source, timeout=3, phrase_time_limit=3)
-            text = self.recognizer.recognize_google(audio).lower()
-            logger.info(f"Heard: {text}")
-            return "jarvis" in text
+            
+            # Only pay for a cloud round trip when the local pre-filter thinks it is likely
+            samples = np.frombuffer(
+                audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2), dtype=np.int16)
+            with METRICS.span("wake.prefilter"):
+                likely = self.wake_word_detector.is_likely(samples)
+            if not likely:
+                return False
+            
+            text = self.transcribe(audio)
+            logger.info("Heard: %s", text)
+            return text is not None and "jarvis" in text
         except sr.WaitTimeoutError:
             return False
-        except sr.UnknownValueError:
-            return False
         except Exception as e:
             logger.error(f"Error listening for wake word: {e}")
             return False
@@ -91,15 +167,15 @@ class VoiceHandler:
             logger.debug("Starting command capture...")
             audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=5)
             logger.debug("Audio captured, attempting recognition...")
-            command = self.recognizer.recognize_google(audio).lower()
-            logger.info(f"Command recognized: {command}")
+            command = self.transcribe(audio)
+            if command is None:
+                logger.warning("Could not understand command")
+                return None
+            logger.info("Command recognized: %s", command)
             return command
         except sr.WaitTimeoutError:
             logger.warning("Timeout waiting for command")
             return None
-        except sr.UnknownValueError:
-            logger.warning("Could not understand command")
-            return None
         except Exception as e:
             logger.error(f"Error listening for command: {e}")
             return None
@@ -130,10 +206,86 @@ class VoiceHandler:
             return "Voice recognition deactivated"
         return "Not currently listening"
     
+    def _handle_command(self, jarvis, command):
+        """Run a recognized command and speak the outcome."""
+        if command:
+            logger.info("Processing command: %s", command)
+            response = jarvis.process_command(command)
+            if response:
+                logger.info("Command response: %s", response)
+                self.speak(response)
+            else:
+                logger.warning("No response from command processing")
+                self.speak("I didn't understand that command")
+        else:
+            logger.warning("No command detected")
+            self.speak("I didn't hear a command")
+    
+    def _recognize(self, samples: np.ndarray):
+        """Recognize captured samples with the speech engines."""
+        try:
+            return self.transcribe(sr.AudioData(samples.tobytes(), SAMPLE_RATE, 2))
+        except Exception as e:
+            logger.error(f"Error recognizing speech: {e}")
+            return None
+    
     def _listen_loop(self, jarvis):
         """Main voice recognition loop."""
         logger.info("Starting voice recognition loop")
+        try:
+            capture = StreamingCapture()
+            capture.start()
+        except Exception as e:
+            logger.warning(f"Streaming capture unavailable ({e}); using the microphone loop")
+            self._microphone_listen_loop(jarvis)
+            return
         
+        try:
+            self._streaming_listen_loop(jarvis, capture)
+        finally:
+            capture.stop()
+    
+    def _streaming_listen_loop(self, jarvis, capture: StreamingCapture):
+        """Voice loop over continuous capture; utterances are cut by VAD endpointing."""
+        while self.is_listening:
+            try:
+                utterance = capture.next_utterance(timeout=0.5, active=lambda: self.is_listening)
+                if utterance is None:
+                    continue
+                with METRICS.span("wake.prefilter"):
+                    likely = self.wake_word_detector.is_likely(utterance)
+                if not likely:
+                    continue
+                heard = self._recognize(utterance)
+                if not heard or "jarvis" not in heard:
+                    continue
+                
+                logger.info("Wake word detected")
+                wake_time = time.perf_counter()
+                # Barge-in: the user talking over a reply cuts it short
+                self.speech_worker.interrupt()
+                
+                # "Jarvis, open google.com" in one breath already carries the command
+                command = heard.split("jarvis", 1)[1].strip(" ,.!?")
+                if not command:
+                    # Only prompt if the user has not already started talking;
+                    # pre-roll keeps the start of a command spoken right away
+                    if not capture.has_pending_speech():
+                        prompt_start = capture.position
+                        self.say("Yes?", PRIORITY_HIGH).wait(timeout=5)
+                        capture.ignore(prompt_start, capture.position + SAMPLE_RATE // 4)
+                    utterance = capture.next_utterance(timeout=8, active=lambda: self.is_listening)
+                    command = self._recognize(utterance) if utterance is not None else None
+                
+                METRICS.record("voice.wake_to_command", time.perf_counter() - wake_time)
+                self._handle_command(jarvis, command)
+                    
+            except Exception as e:
+                logger.error(f"Error in listen loop: {e}")
+                time.sleep(1)  # Prevent tight error loops
+    
+    def _microphone_listen_loop(self, jarvis):
+        """Fallback voice loop using speech_recognition's blocking microphone capture."""
         with sr.Microphone() as source:
             # Initial noise adjustment
             logger.info("Adjusting for ambient noise...")
@@ -144,32 +296,17 @@ class VoiceHandler:
                     # Listen for wake word
                     if self.listen_for_wake_word(source):
                         logger.info("Wake word detected")
-                        self.speak("Yes?")
+                        # Barge-in: the user talking over a reply cuts it short
+                        self.speech_worker.interrupt()
                         
-                        # Wait for TTS to finish and let mic calm down
+                        # Wait for the prompt to finish so the mic does not hear it;
+                        # the dynamic energy threshold already tracks ambient noise
                         logger.debug("Waiting for TTS to finish...")
-                        time.sleep(1.5)
-                        
-                        # Re-adjust for ambient noise before command
-                        logger.info("Adjusting for ambient noise before command...")
-                        self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
+                        self.say("Yes?", PRIORITY_HIGH).wait(timeout=5)
                         
                         # Listen for command
                         logger.info("Listening for command...")
-                        command = self.listen_for_command(source)
-                        
-                        if command:
-                            logger.info(f"Processing command: {command}")
-                            response = jarvis.process_command(command)
-                            if response:
-                                logger.info(f"Command response: {response}")
-                                self.speak(response)
-                            else:
-                                logger.warning("No response from command processing")
-                                self.speak("I didn't understand that command")
-                        else:
-                            logger.warning("No command detected")
-                            self.speak("I didn't hear a command")
+                        self._handle_command(jarvis, self.listen_for_command(source))
                             
                 except Exception as e:
                     logger.error(f"Error in listen loop: {e}")
@@ -184,6 +321,8 @@ def register_commands(jarvis):
         jarvis.register_command("listen", lambda _: voice_handler.start_listening(jarvis))
         jarvis.register_command("stop listening", lambda _: voice_handler.stop_listening())
         jarvis.register_command("speak", lambda text: voice_handler.speak(text))
+        jarvis.register_command("stop speaking", lambda _: voice_handler.interrupt())
+        jarvis.register_command("speech engines", lambda _: voice_handler.engine_stats())
         
         logger.info("Voice commands registered")
     except Exception as e:
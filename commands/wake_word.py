@@ -0,0 +1,212 @@
+"""
+Offline wake word pre-filter for J.A.R.V.I.S.
+Combines energy-based voice activity detection with MFCC template matching
+(subsequence DTW against enrolled samples) so that only audio likely to
+contain the wake word is sent to cloud speech recognition.
+"""
+
+import glob
+import logging
+import os
+import wave
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400  # 25 ms at 16 kHz
+HOP_LENGTH = 160    # 10 ms at 16 kHz
+
+def load_wav(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Read a 16-bit PCM WAV file as mono int16 samples at the given rate."""
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != sample_rate:
+        duration = len(samples) / rate
+        target = np.linspace(0, duration, int(duration * sample_rate), endpoint=False)
+        source = np.arange(len(samples)) / rate
+        samples = np.interp(target, source, samples).astype(np.int16)
+    return samples
+
+def frame_signal(samples: np.ndarray, frame_length: int = FRAME_LENGTH,
+                 hop_length: int = HOP_LENGTH) -> np.ndarray:
+    """Return overlapping frames as a (n_frames, frame_length) view without copying."""
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+    n_frames = 1 + (len(samples) - frame_length) // hop_length
+    stride = samples.strides[0]
+    return np.lib.stride_tricks.as_strided(
+        samples, shape=(n_frames, frame_length), strides=(hop_length * stride, stride), writeable=False)
+
+def frame_energy(samples: np.ndarray, frame_length: int = FRAME_LENGTH,
+                 hop_length: int = HOP_LENGTH) -> np.ndarray:
+    """Root-mean-square energy of each frame."""
+    frames = frame_signal(samples.astype(np.float32), frame_length, hop_length)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+@lru_cache(maxsize=4)
+def _mel_filterbank(n_mels: int, n_fft: int, sample_rate: int) -> np.ndarray:
+    """Triangular mel filterbank of shape (n_mels, n_fft // 2 + 1)."""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+    bank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            bank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            bank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return bank
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n_mfcc: int, n_mels: int) -> np.ndarray:
+    """Orthonormal DCT-II basis of shape (n_mfcc, n_mels)."""
+    n = np.arange(n_mels)
+    basis = np.cos(np.pi / n_mels * (n + 0.5)[None, :] * np.arange(n_mfcc)[:, None])
+    basis *= np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+@lru_cache(maxsize=4)
+def _window(frame_length: int) -> np.ndarray:
+    return np.hamming(frame_length).astype(np.float32)
+
+def mfcc(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, n_mfcc: int = 13,
+         n_mels: int = 26, n_fft: int = 512) -> np.ndarray:
+    """
+    Compute mean-normalized MFCC features.
+
+    Returns:
+        Array of shape (n_frames, n_mfcc - 1); c0 is dropped so loudness does not matter
+    """
+    signal = samples.astype(np.float32)
+    emphasized = np.append(signal[:1], signal[1:] - 0.97 * signal[:-1])
+    frames = frame_signal(emphasized) * _window(FRAME_LENGTH)
+    power = np.abs(np.fft.rfft(frames, n=n_fft)) ** 2 / n_fft
+    mel = np.log(power @ _mel_filterbank(n_mels, n_fft, sample_rate).T + 1e-10)
+    features = mel @ _dct_matrix(n_mfcc, n_mels).T
+    features = features[:, 1:]
+    return features - features.mean(axis=0)
+
+def subsequence_dtw(template: np.ndarray, query: np.ndarray) -> float:
+    """
+    Best alignment cost of a template against any stretch of the query.
+
+    Uses cosine distance between frames and steps (1,1), (1,0) and (1,2), so each
+    template frame depends only on the previous row and rows vectorize. The query
+    may be matched from any starting frame, and the cost is normalized per template frame.
+    """
+    t = template / (np.linalg.norm(template, axis=1, keepdims=True) + 1e-8)
+    q = query / (np.linalg.norm(query, axis=1, keepdims=True) + 1e-8)
+    cost = 1.0 - t @ q.T
+
+    accumulated = cost[0].copy()
+    for i in range(1, len(cost)):
+        best = accumulated.copy()
+        best[1:] = np.minimum(best[1:], accumulated[:-1])
+        best[2:] = np.minimum(best[2:], accumulated[:-2])
+        accumulated = cost[i] + best
+    return float(accumulated.min() / len(cost))
+
+class EnergyVAD:
+    def __init__(self, ratio: float = 3.0, min_speech_frames: int = 15, floor: float = 100.0):
+        """
+        Initialize the energy voice activity detector.
+
+        Args:
+            ratio: Frame energy relative to the noise floor that counts as speech
+            min_speech_frames: Speech frames (10 ms each) needed to call a chunk voiced
+            floor: Initial noise floor estimate (RMS of int16 samples)
+        """
+        self.ratio = ratio
+        self.min_speech_frames = min_speech_frames
+        self.noise_floor = floor
+
+    def speech_frames(self, samples: np.ndarray) -> np.ndarray:
+        """Boolean mask of frames considered speech; adapts the noise floor."""
+        energy = frame_energy(samples)
+        if len(energy):
+            # Quiet frames track the noise floor so the threshold follows the room
+            quiet = np.percentile(energy, 20)
+            self.noise_floor = 0.9 * self.noise_floor + 0.1 * max(quiet, 1.0)
+        return energy > self.noise_floor * self.ratio
+
+    def is_speech(self, samples: np.ndarray) -> bool:
+        """Whether a chunk contains enough voiced frames to be worth recognizing."""
+        return int(self.speech_frames(samples).sum()) >= self.min_speech_frames
+
+class WakeWordDetector:
+    def __init__(self, templates_dir: Optional[str] = None, threshold: float = 0.35,
+                 vad: Optional[EnergyVAD] = None):
+        """
+        Initialize the wake word detector.
+
+        Args:
+            templates_dir: Directory of enrolled WAV samples of the wake word
+            threshold: Maximum normalized DTW cost that counts as a likely match
+            vad: Voice activity detector used to skip silent chunks
+        """
+        self.threshold = threshold
+        self.vad = vad or EnergyVAD()
+        self.templates: List[np.ndarray] = []
+        self.escalated = 0
+        self.rejected = 0
+        if templates_dir:
+            self.load_templates(templates_dir)
+
+    def enroll(self, samples: np.ndarray):
+        """Add a recorded example of the wake word."""
+        voiced = self.vad.speech_frames(samples)
+        features = mfcc(samples)
+        if voiced.any():
+            # Trim leading and trailing silence so templates cover only the word
+            indices = np.flatnonzero(voiced[:len(features)])
+            if len(indices):
+                features = features[indices[0]:indices[-1] + 1]
+        self.templates.append(features)
+
+    def load_templates(self, directory: str):
+        """Enroll every WAV file in a directory."""
+        for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+            try:
+                self.enroll(load_wav(path))
+            except (OSError, ValueError, wave.Error) as e:
+                logger.warning(f"Skipping wake word template {path}: {e}")
+        logger.info("Loaded %d wake word templates from %s", len(self.templates), directory)
+
+    def score(self, samples: np.ndarray) -> float:
+        """Lowest template alignment cost for a chunk (lower is more similar)."""
+        if not self.templates:
+            return 0.0
+        features = mfcc(samples)
+        return min(subsequence_dtw(template, features) for template in self.templates)
+
+    def is_likely(self, samples: np.ndarray) -> bool:
+        """
+        Decide whether a chunk should be escalated to cloud recognition.
+
+        Silent chunks are always rejected. Without enrolled templates every
+        voiced chunk is escalated, so the detector degrades to a pure VAD gate.
+        """
+        likely = self.vad.is_speech(samples) and self.score(samples) <= self.threshold
+        if likely:
+            self.escalated += 1
+        else:
+            self.rejected += 1
+        return likely
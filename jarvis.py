@@ -6,110 +6,524 @@ A personal AI assistant inspired by Iron Man's J.A.R.V.I.S.
 
 import os
 import sys
+import argparse
+import importlib
+import inspect
 import logging
-from typing import Dict, Callable, Any
+import threading
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Callable, Any, Optional, Sequence, Tuple
 from dotenv import load_dotenv
 from commands.context import ContextManager
+from commands.dispatch import CommandTrie
+from commands.intent import IntentIndex
+from commands.cache import ResponseCache
+from commands.sessions import SESSION_RE, SessionRegistry
+from commands.metrics import METRICS
+from commands import PLUGIN_MANIFEST
 
 # Configure logging
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=os.getenv('JARVIS_LOG_LEVEL', 'DEBUG').upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# Session the current request belongs to (None for the local REPL/voice session)
+CURRENT_SESSION: ContextVar[Optional[str]] = ContextVar('jarvis_session', default=None)
+# Input as typed, before lowercasing, for handlers whose arguments are case-sensitive
+CURRENT_INPUT: ContextVar[str] = ContextVar('jarvis_input', default="")
+
+LOCAL_ONLY_MESSAGE = "That command is only available on the machine J.A.R.V.I.S. is running on."
+
 class Jarvis:
-    def __init__(self):
-        """Initialize the J.A.R.V.I.S. assistant."""
+    def __init__(self, headless: Optional[bool] = None):
+        """
+        Initialize the J.A.R.V.I.S. assistant.
+        
+        Args:
+            headless: Never load audio plugins (defaults to the JARVIS_HEADLESS environment variable)
+        """
+        if headless is None:
+            headless = os.getenv('JARVIS_HEADLESS', '0') == '1'
+        self.headless = headless
+        self._loaded_plugins = set()
+        self._plugin_lock = threading.RLock()
         self.commands: Dict[str, Callable] = {}
-        self.context_manager = ContextManager()
+        # Commands that touch the local machine; refused for remote requests
+        self.local_only = set()
+        self.command_trie = CommandTrie()
         self.load_environment()
+        # One writer thread persists every remote session's store
+        self._store_writer = None
+        # Catches near misses ("opened google.com") before they fall through to the LLM
+        self.intents = IntentIndex(threshold=float(os.getenv('JARVIS_INTENT_THRESHOLD', '0.8')))
+        # Local REPL/voice context; remote clients get their own per session
+        self.context_manager = ContextManager(store=self._open_store())
+        self.sessions = SessionRegistry(
+            lambda session: ContextManager(store=self._open_store(session)),
+            max_sessions=int(os.getenv('JARVIS_MAX_SESSIONS', '1000')),
+            idle_timeout=float(os.getenv('JARVIS_SESSION_IDLE', '3600')),
+            on_evict=self._close_session
+        )
+        # History turns offered to the model; the prompt builder keeps them within budget
+        self.context_turns = int(os.getenv('JARVIS_CONTEXT_TURNS', '10'))
+        # Older turns recalled by similarity to the input; 0 disables recall
+        self.recall_turns = int(os.getenv('JARVIS_RECALL_TURNS', '3'))
+        # Turns each session's recall index keeps, so long-running sessions stay bounded
+        self.recall_max_turns = int(os.getenv('JARVIS_RECALL_MAX_TURNS', '10000'))
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv('JARVIS_CACHE_SIZE', '256')),
+            ttl=float(os.getenv('JARVIS_CACHE_TTL', '300')),
+            path=os.getenv('JARVIS_CACHE_PATH')
+        )
+        # Bounded pool for running synchronous handlers from the async dispatch path
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('JARVIS_MAX_WORKERS', '8')),
+            thread_name_prefix="jarvis-handler"
+        )
+        # Event loop thread that runs async handlers for synchronous callers, started on first use
+        self._dispatch_loop = None
+        self._dispatch_thread = None
+        self._dispatch_lock = threading.Lock()
         self.load_commands()
         logger.info("J.A.R.V.I.S. initialized with commands: %s", list(self.commands.keys()))
         
+    def _open_store(self, session: Optional[str] = None):
+        """Open the persistent conversation store if JARVIS_STORE_DIR is set."""
+        directory = os.getenv('JARVIS_STORE_DIR')
+        if not directory:
+            return None
+        from commands.store import ConversationStore, StoreWriter
+        try:
+            if session is None:
+                return ConversationStore(directory, session=os.getenv('JARVIS_SESSION', 'default'))
+            # Session stores are opened under the registry's lock, so this runs once
+            if self._store_writer is None:
+                self._store_writer = StoreWriter()
+            return ConversationStore(directory, session=session, writer=self._store_writer)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not open conversation store at {directory}: {e}")
+            return None
+        
     def load_environment(self):
         """Load environment variables from .env file."""
         load_dotenv()
         # Add your API keys and other configuration here
         
     def load_commands(self):
-        """Load and register commands from all modules in the commands package."""
+        """Register placeholders for plugin commands; modules are imported on first use."""
         try:
             logger.debug("Starting to load commands...")
             
-            # Import command modules directly
-            from commands import web_browser, voice, conversation
-            
-            # Register commands from each module
-            web_browser.register_commands(self)
-            voice.register_commands(self)
-            conversation.register_commands(self)
+            for plugin in PLUGIN_MANIFEST:
+                if plugin['audio'] and self.headless:
+                    logger.debug("Headless mode: skipping %s", plugin['module'])
+                    continue
+                for command in plugin['commands']:
+                    self.register_command(command, self._lazy_handler(plugin, command),
+                                          aliases=plugin.get('aliases', {}).get(command, ()),
+                                          takes_args=command in plugin.get('arguments', ()),
+                                          argument_pattern=plugin.get('argument_patterns', {}).get(command),
+                                          local_only=command in plugin.get('local_only', ()))
             
             # Register context-related commands
-            self.register_command("context", self._show_context)
-            self.register_command("clear context", self._clear_context)
+            self.register_command("context", self._show_context, aliases=["show context"])
+            self.register_command("clear context", self._clear_context, aliases=["forget context"])
+            
+            # Register latency statistics commands
+            self.register_command("stats", lambda _: METRICS.get_summary(),
+                                  aliases=["latency stats", "show stats"])
+            self.register_command("stats save", self._save_stats, takes_args=True, local_only=True)
             
-            logger.info(f"Total commands registered: {len(self.commands)}")
-            logger.debug(f"Registered commands: {list(self.commands.keys())}")
+            # Register response cache commands
+            self.register_command("cache stats", lambda _: self.response_cache.get_stats_summary())
+            # The cache is shared by every session, so only the local user may wipe it
+            self.register_command("clear cache", self._clear_cache, local_only=True)
+            
+            logger.info("Total commands registered: %d", len(self.commands))
             
         except Exception as e:
             logger.error(f"Error in load_commands: {e}")
             logger.exception("Full traceback:")
+    
+    def load_plugin(self, plugin: Dict) -> bool:
+        """Import a plugin module and let it register its real handlers. Returns True on success."""
+        with self._plugin_lock:
+            if plugin['module'] in self._loaded_plugins:
+                return True
+            if plugin['audio'] and self.headless:
+                return False
+            # Mark first so a failing plugin is not retried on every call
+            self._loaded_plugins.add(plugin['module'])
+            try:
+                logger.debug("Loading plugin %s", plugin['module'])
+                importlib.import_module(plugin['module']).register_commands(self)
+                return True
+            except Exception as e:
+                logger.error(f"Failed to load plugin {plugin['module']}: {e}")
+                return False
+    
+    def _lazy_handler(self, plugin: Dict, command: str) -> Callable:
+        """Create a placeholder that loads the plugin and forwards to the real handler."""
+        def handler(args):
+            self.load_plugin(plugin)
+            real_handler = self.commands.get(command)
+            if real_handler is None or real_handler is handler:
+                return f"The '{command}' command is not available right now."
+            return real_handler(args)
+        return handler
+    
+    def __getattr__(self, name: str):
+        # Only reached for missing attributes: load the plugin that provides it
+        for plugin in PLUGIN_MANIFEST:
+            if name in plugin['provides']:
+                if self.load_plugin(plugin) and name in self.__dict__:
+                    return self.__dict__[name]
+                break
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
         
-    def register_command(self, command: str, handler: Callable):
-        """Register a new command handler."""
-        self.commands[command.lower()] = handler
-        logger.debug(f"Registered command: {command}")
+    def register_command(self, command: str, handler: Callable, aliases: Iterable[str] = (),
+                         takes_args: bool = False, argument_pattern: Optional[str] = None,
+                         local_only: bool = False):
+        """
+        Register a new command handler.
+
+        Args:
+            command: Command words matched as a prefix of the input
+            handler: Callable receiving the text after the command
+            aliases: Other phrasings accepted by the fuzzy intent matcher
+            takes_args: Whether a fuzzy match may leave trailing text as arguments
+            argument_pattern: Regular expression those arguments must fully match
+            local_only: Refuse the command for remote requests; stays set when a
+                plugin later registers its real handler
+        """
+        command = " ".join(CommandTrie.tokenize(command))
+        self.command_trie.insert(command, handler)
+        self.commands[command] = handler
+        if local_only:
+            self.local_only.add(command)
+        self.intents.add(command, aliases, takes_args, argument_pattern)
+        logger.debug("Registered command: %s", command)
+
+    def unregister_command(self, command: str) -> bool:
+        """Remove a command handler. Returns True if the command was registered."""
+        command = " ".join(CommandTrie.tokenize(command))
+        self.commands.pop(command, None)
+        self.local_only.discard(command)
+        self.intents.remove(command)
+        removed = self.command_trie.remove(command)
+        if removed:
+            logger.debug("Unregistered command: %s", command)
+        return removed
+
+    def context_for(self, session: Optional[str] = None) -> ContextManager:
+        """Context manager for a session id (None is the local session)."""
+        return self.context_manager if session is None else self.sessions.get(session)
+
+    @staticmethod
+    def current_session() -> Optional[str]:
+        """Session id of the request being processed on this thread or task."""
+        return CURRENT_SESSION.get()
+
+    def _close_session(self, session: str, context: ContextManager):
+        context.close()
+        handler = self.__dict__.get('conversation_handler')
+        if handler is not None:
+            handler.drop_session(session)
         
-    def process_command(self, input_text: str) -> Any:
-        """Process user input and execute the appropriate command with context awareness."""
+    def _match_command(self, input_text: str) -> Optional[Tuple[Callable, str, str]]:
+        """
+        Find the handler for normalized input.
+
+        Returns:
+            (handler, argument text, command type), or None if no command matches
+        """
+        # Longest registered command that prefixes the input wins
+        tokens = CommandTrie.tokenize(input_text)
+        match = self.command_trie.longest_prefix(tokens)
+        if not match:
+            return self._match_intent(input_text)
+
+        command, handler, consumed = match
+        if consumed == len(tokens):
+            logger.debug("Found exact match for command: %s", command)
+            return handler, "", "exact_match"
+
+        logger.debug("Found prefix match for command: %s", command)
+        remaining_text = input_text.split(None, consumed)[consumed].strip()
+        return handler, remaining_text, "prefix_match"
+
+    def _match_intent(self, input_text: str) -> Optional[Tuple[Callable, str, str]]:
+        """Fall back to the fuzzy intent index for input the trie did not match."""
+        with METRICS.span("dispatch.fuzzy"):
+            intent = self.intents.match(input_text)
+        if intent is None:
+            return None
+        handler = self.commands.get(intent.command)
+        if handler is None:
+            return None
+        logger.debug("Found fuzzy match for command: %s (%.2f via %r)",
+                     intent.command, intent.score, intent.phrase)
+        return handler, intent.args, "fuzzy_match"
+
+    def _is_local_only(self, handler: Callable) -> bool:
+        """Whether a matched handler belongs to a command remote requests may not run."""
+        return any(self.commands.get(command) is handler for command in self.local_only)
+
+    def process_command(self, input_text: str, on_token: Optional[Callable[[str], None]] = None,
+                        session: Optional[str] = None, remote: bool = False) -> Any:
+        """
+        Process user input and execute the appropriate command with context awareness.
+
+        Args:
+            input_text: Raw user input
+            on_token: Optional callback receiving conversation output as it streams in
+            session: Session whose context to use (None for the local session)
+            remote: The input came from a network client, so local-only commands are refused
+        """
+        token = CURRENT_SESSION.set(session)
+        input_token = CURRENT_INPUT.set(input_text)
+        try:
+            return self._process_command(input_text, on_token, session, remote)
+        finally:
+            CURRENT_INPUT.reset(input_token)
+            CURRENT_SESSION.reset(token)
+
+    def _process_command(self, input_text: str, on_token: Optional[Callable[[str], None]],
+                         session: Optional[str], remote: bool) -> Any:
         input_text = input_text.lower().strip()
-        logger.debug(f"Processing input: {input_text}")
+        logger.debug("Processing input: %s", input_text)
+        context = self.context_for(session)
         
         # Get recent context
-        recent_context = self.context_manager.get_recent_context()
-        current_context = self.context_manager.get_current_context()
+        with METRICS.span("context.fetch"):
+            recent_context = context.get_recent_context(self.context_turns)
         
-        # First try exact command match
-        if input_text in self.commands:
-            logger.debug(f"Found exact match for command: {input_text}")
-            response = self.commands[input_text]("")
-            self._update_context(input_text, response, "exact_match")
+        with METRICS.span("dispatch.match"):
+            match = self._match_command(input_text)
+        if match:
+            handler, args, command_type = match
+            if remote and self._is_local_only(handler):
+                logger.warning("Refused local-only command from remote session %s: %s", session, input_text)
+                return LOCAL_ONLY_MESSAGE
+            cache_key, cached = self._lookup_cache(input_text, recent_context, command_type, session)
+            if cached is not None:
+                self._update_context(context, input_text, cached, command_type)
+                return cached
+            response = handler(args)
+            if inspect.isawaitable(response):
+                # Async handlers still work from the synchronous path, even inside a running loop
+                response = self._run_async(response)
+            self._store_cache(cache_key, response)
+            self._update_context(context, input_text, response, command_type)
             return response
-            
-        # Then try prefix matching for multi-word commands
-        for command, handler in self.commands.items():
-            if input_text.startswith(command):
-                logger.debug(f"Found prefix match for command: {command}")
-                remaining_text = input_text[len(command):].strip()
-                response = handler(remaining_text)
-                self._update_context(input_text, response, "prefix_match")
-                return response
         
         # If no command matches, treat it as conversation
         logger.debug("No command match found, treating as conversation")
         try:
-            response = self.conversation_handler.get_response(input_text, recent_context)
-            self._update_context(input_text, response, "conversation")
+            handler = self.conversation_handler
+            recalled = self._recall(context, input_text, recent_context)
+            cache_key, cached = self._lookup_cache(
+                input_text, recent_context, "conversation", session, recalled,
+                handler.prompt_builder_for(session).summary_lines())
+            if cached is not None:
+                self._update_context(context, input_text, cached, "conversation")
+                return cached
+            if on_token is not None and handler.streaming:
+                from commands.conversation import StreamInterrupted
+                chunks = []
+                try:
+                    for chunk in handler.stream_response(input_text, recent_context, recalled, session):
+                        on_token(chunk)
+                        chunks.append(chunk)
+                except StreamInterrupted:
+                    # The user has seen the partial reply, but it must not be replayed or built on
+                    return "".join(chunks)
+                response = "".join(chunks)
+            else:
+                response = handler.get_response(input_text, recent_context, recalled, session)
+            self._store_cache(cache_key, response)
+            self._update_context(context, input_text, response, "conversation")
             return response
         except Exception as e:
             logger.error(f"Error in conversation handler: {e}")
             return "I'm having trouble with that. Could you try rephrasing?"
     
-    def _update_context(self, user_input: str, response: str, command_type: str):
+    async def process_command_async(self, input_text: str, session: Optional[str] = None,
+                                    remote: bool = False) -> Any:
+        """
+        Process user input without blocking the event loop.
+
+        Coroutine handlers are awaited directly; synchronous handlers run on the
+        bounded handler executor so many requests can be in flight at once.
+        """
+        token = CURRENT_SESSION.set(session)
+        input_token = CURRENT_INPUT.set(input_text)
+        try:
+            return await self._process_command_async(input_text, session, remote)
+        finally:
+            CURRENT_INPUT.reset(input_token)
+            CURRENT_SESSION.reset(token)
+
+    async def _process_command_async(self, input_text: str, session: Optional[str], remote: bool) -> Any:
+        input_text = input_text.lower().strip()
+        logger.debug("Processing input asynchronously: %s", input_text)
+        context = self.context_for(session)
+        
+        # asyncio is imported here rather than at startup to keep text sessions fast to launch
+        import asyncio
+        
+        with METRICS.span("context.fetch"):
+            recent_context = context.get_recent_context(self.context_turns)
+        loop = asyncio.get_running_loop()
+        
+        with METRICS.span("dispatch.match"):
+            match = self._match_command(input_text)
+        if match:
+            handler, args, command_type = match
+            if remote and self._is_local_only(handler):
+                logger.warning("Refused local-only command from remote session %s: %s", session, input_text)
+                return LOCAL_ONLY_MESSAGE
+            cache_key, cached = self._lookup_cache(input_text, recent_context, command_type, session)
+            if cached is not None:
+                self._update_context(context, input_text, cached, command_type)
+                return cached
+            if inspect.iscoroutinefunction(handler):
+                response = await handler(args)
+            else:
+                # Executor threads do not inherit context variables; carry the session over
+                response = await loop.run_in_executor(self.executor, copy_context().run, handler, args)
+                if inspect.isawaitable(response):
+                    response = await response
+            self._store_cache(cache_key, response)
+            self._update_context(context, input_text, response, command_type)
+            return response
+        
+        logger.debug("No command match found, treating as conversation")
+        try:
+            handler = self.conversation_handler
+            recalled = self._recall(context, input_text, recent_context)
+            cache_key, cached = self._lookup_cache(
+                input_text, recent_context, "conversation", session, recalled,
+                handler.prompt_builder_for(session).summary_lines())
+            if cached is not None:
+                self._update_context(context, input_text, cached, "conversation")
+                return cached
+            if hasattr(handler, 'get_response_async'):
+                response = await handler.get_response_async(input_text, recent_context, recalled, session)
+            else:
+                response = await loop.run_in_executor(
+                    self.executor, handler.get_response, input_text, recent_context, recalled, session)
+            self._store_cache(cache_key, response)
+            self._update_context(context, input_text, response, "conversation")
+            return response
+        except Exception as e:
+            logger.error(f"Error in conversation handler: {e}")
+            return "I'm having trouble with that. Could you try rephrasing?"
+    
+    def _run_async(self, awaitable) -> Any:
+        """Wait for an awaitable on the dispatch loop thread and return its result."""
+        import asyncio
+        
+        with self._dispatch_lock:
+            if self._dispatch_loop is None:
+                self._dispatch_loop = asyncio.new_event_loop()
+                self._dispatch_thread = threading.Thread(
+                    target=self._dispatch_loop.run_forever, name="jarvis-dispatch", daemon=True)
+                self._dispatch_thread.start()
+        return asyncio.run_coroutine_threadsafe(
+            self._in_context(copy_context(), awaitable), self._dispatch_loop).result()
+    
+    @staticmethod
+    async def _in_context(context, awaitable) -> Any:
+        # Tasks start from the loop thread's context; carry the caller's session and input over
+        for variable, value in context.items():
+            variable.set(value)
+        return await awaitable
+    
+    def _stop_dispatch_loop(self):
+        """Stop the dispatch loop, finalizing what its tasks left open (such as HTTP sessions)."""
+        loop = self._dispatch_loop
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        self._dispatch_thread.join()
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+        self._dispatch_loop = self._dispatch_thread = None
+    
+    def _recall(self, context: ContextManager, input_text: str, recent_context: List[Dict]) -> List[Dict]:
+        """Find earlier turns relevant to the input that are not already in recent_context."""
+        if self.recall_turns <= 0:
+            return []
+        with METRICS.span("context.recall"):
+            if context.recall is None:
+                # Only conversations need recall, so NumPy loads on the first one
+                from commands.recall import SemanticIndex
+                context.enable_recall(SemanticIndex(max_turns=self.recall_max_turns),
+                                      restore=self.recall_max_turns or 10000)
+            return context.get_relevant_context(input_text, self.recall_turns, recent_context)
+    
+    def _lookup_cache(self, input_text: str, recent_context: List[Dict], command_type: str,
+                      session: Optional[str] = None, recalled: Sequence[Dict] = (),
+                      summary: Sequence[str] = ()) -> Tuple[Optional[str], Optional[str]]:
+        """Return (cache key, cached response); both are None when the type is not cached."""
+        if not self.response_cache.is_enabled_for(command_type):
+            return None, None
+        cache_key = ResponseCache.make_key(input_text, recent_context, session, summary, recalled)
+        return cache_key, self.response_cache.get(cache_key)
+    
+    def _store_cache(self, cache_key: Optional[str], response: Any):
+        """Cache a successful response under the key from _lookup_cache."""
+        if cache_key is None or not isinstance(response, str) or not response:
+            return
+        # Look up directly so storing a command response never loads the conversation plugin
+        handler = self.__dict__.get('conversation_handler')
+        if response in getattr(handler, 'FALLBACK_MESSAGES', ()):
+            return
+        self.response_cache.put(cache_key, response)
+    
+    def _update_context(self, context: ContextManager, user_input: str, response: str, command_type: str):
         """Update the conversation context with the latest interaction."""
-        self.context_manager.add_turn(user_input, response, command_type)
-        logger.debug(f"Updated context with turn: {user_input} -> {response}")
+        context.add_turn(user_input, response, command_type)
+        logger.debug("Updated context with turn: %s -> %s", user_input, response)
     
     def _show_context(self, _) -> str:
         """Show the current conversation context."""
-        return self.context_manager.get_context_summary()
+        return self.context_for(self.current_session()).get_context_summary()
     
     def _clear_context(self, _) -> str:
         """Clear the current conversation context."""
-        self.context_manager.clear_context()
+        self.context_for(self.current_session()).clear_context()
         return "Conversation context cleared."
     
+    @staticmethod
+    def _original_args(args: str) -> str:
+        """Recover the case of lowercased trailing arguments from the input as typed."""
+        original = CURRENT_INPUT.get().strip()
+        lowered = original.lower()
+        # Lowercasing can change the length of some characters; then offsets do not line up
+        if args and len(lowered) == len(original) and lowered.endswith(args):
+            return original[len(original) - len(args):]
+        return args
+
+    def _save_stats(self, path: str) -> str:
+        """Write a metrics snapshot file."""
+        path = self._original_args(path) or os.getenv('JARVIS_METRICS_PATH', 'jarvis_metrics.json')
+        try:
+            METRICS.write_snapshot(path)
+            return f"Metrics snapshot written to {path}"
+        except OSError as e:
+            logger.error(f"Error writing metrics snapshot: {e}")
+            return "I couldn't write the metrics snapshot."
+    
+    def _clear_cache(self, _) -> str:
+        """Clear all cached responses."""
+        self.response_cache.clear()
+        return "Response cache cleared."
+    
     def run(self):
         """Main application loop."""
         print("J.A.R.V.I.S. initialized. Type 'exit' to quit.")
@@ -125,8 +539,20 @@ class Jarvis:
                     print("Goodbye!")
                     break
                 
-                response = self.process_command(user_input)
-                print(f"J.A.R.V.I.S.: {response}")
+                streamed = []
+
+                def on_token(chunk: str):
+                    # Show partial output as soon as the first token arrives
+                    if not streamed:
+                        print("J.A.R.V.I.S.: ", end="", flush=True)
+                    streamed.append(chunk)
+                    print(chunk, end="", flush=True)
+
+                response = self.process_command(user_input, on_token=on_token)
+                if streamed:
+                    print()
+                else:
+                    print(f"J.A.R.V.I.S.: {response}")
                 
             except KeyboardInterrupt:
                 print("\nGoodbye!")
@@ -135,10 +561,83 @@ class Jarvis:
                 logger.error(f"Error processing command: {e}")
                 print("I encountered an error. Please try again.")
 
+    def close(self):
+        """Flush persisted conversation turns and close LLM connections before exit."""
+        self.sessions.close()
+        if self._store_writer is not None:
+            self._store_writer.close()
+        self.context_manager.close()
+        self._stop_dispatch_loop()
+        # Looked up directly so shutting down never loads the conversation plugin
+        handler = self.__dict__.get('conversation_handler')
+        if handler is not None:
+            handler.close()
+
+def run_batch(args):
+    """Replay inputs from a file or stdin and write one JSON result per line."""
+    import json
+    from commands.batch import BatchRunner
+    
+    os.environ.setdefault('JARVIS_LLM_POOL_SIZE', str(args.workers))
+    jarvis = Jarvis(headless=True)
+    source = sys.stdin if args.batch == "-" else open(args.batch, encoding='utf-8')
+    out = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    runner = BatchRunner(jarvis, args.workers, args.max_pending, args.session)
+    try:
+        summary = runner.run(source, out)
+        print(json.dumps(summary), file=sys.stderr)
+    finally:
+        runner.close()
+        jarvis.close()
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
 def main():
     """Entry point for the application."""
-    jarvis = Jarvis()
-    jarvis.run()
+    parser = argparse.ArgumentParser(description="J.A.R.V.I.S. AI assistant")
+    parser.add_argument("--headless", action="store_true",
+                        help="Text-only mode that never loads audio libraries")
+    parser.add_argument("--serve", action="store_true",
+                        help="Serve many sessions over HTTP and WebSocket instead of the console")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="PATH",
+                        help="Process inputs from a file (or stdin) and write JSONL results")
+    parser.add_argument("--output", default="-", metavar="PATH",
+                        help="Where --batch writes results (default stdout)")
+    parser.add_argument("--session", default="batch",
+                        help="Session for --batch lines that do not name one")
+    parser.add_argument("--host", default=os.getenv('JARVIS_SERVER_HOST', '127.0.0.1'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('JARVIS_SERVER_PORT', '8080')))
+    parser.add_argument("--workers", type=int, default=int(os.getenv('JARVIS_SERVER_WORKERS', '16')),
+                        help="Requests processed concurrently")
+    parser.add_argument("--max-pending", type=int, default=int(os.getenv('JARVIS_SERVER_QUEUE', '256')),
+                        help="Running plus waiting requests before new ones are rejected with 503 "
+                             "(with --batch, before reading pauses)")
+    args = parser.parse_args()
+    
+    if args.batch:
+        if not SESSION_RE.fullmatch(args.session):
+            parser.error("--session must be 1-64 letters, digits, '-' or '_'")
+        run_batch(args)
+        return
+    
+    if args.serve:
+        # A server never speaks through local audio, and every worker may hold an LLM connection
+        os.environ.setdefault('JARVIS_LLM_POOL_SIZE', str(args.workers))
+        from commands.server import JarvisServer
+        jarvis = Jarvis(headless=True)
+        try:
+            JarvisServer(jarvis, args.host, args.port, args.workers, args.max_pending).serve_forever()
+        finally:
+            jarvis.close()
+        return
+    
+    jarvis = Jarvis(headless=args.headless or None)
+    try:
+        jarvis.run()
+    finally:
+        jarvis.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file